@@ -0,0 +1,132 @@
+"""
+Нагрузочный прогон HTTP API (src/api.py): поднимает сервер на временной
+базе и из нескольких потоков проигрывает смесь создания, поиска и
+редактирования заявок. Печатает p50/p99 по каждой операции.
+
+    python benchmarks/api_load.py --clients 8 --ops 200
+    python benchmarks/api_load.py --url http://127.0.0.1:8550 --token ...
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+EQUIPMENT = ["Принтер", "Сканер", "Ноутбук", "Монитор", "МФУ"]
+MIX = [("create", 4), ("search", 4), ("edit", 2)]
+
+
+def start_local():
+    import api
+    import db
+    import storage
+    from sqlmodel import Session, select
+
+    db.engine = storage.make_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api.db')}")
+    db.create_db()
+    api_obj = api.Api(db.engine)
+    api_obj.users.register("admin", "password123")
+    with Session(db.engine) as session:
+        user = session.exec(select(db.User).where(db.User.username == "admin")).one()
+        user.role = "admin"
+        session.add(user)
+        session.commit()
+    server = api.make_server(db.engine)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", None
+
+
+class Client:
+    def __init__(self, url, token):
+        parsed = urlparse(url)
+        self.conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+        self.token = token
+
+    def call(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = json.dumps(body).encode() if body is not None else None
+        self.conn.request(method, path, body=data, headers=headers)
+        response = self.conn.getresponse()
+        payload = json.loads(response.read() or b"{}")
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path}: {response.status} {payload}")
+        return payload
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+
+def main(url, token, clients, ops):
+    if not url:
+        url, token = start_local()
+    if not token:
+        token = Client(url, None).call("POST", "/api/login", {"username": "admin", "password": "password123"})["token"]
+
+    timings = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        client = Client(url, token)
+        created = []
+        ops_list = [name for name, weight in MIX for _ in range(weight)]
+        for _ in range(ops):
+            op = rnd.choice(ops_list) if created else "create"
+            t0 = time.perf_counter()
+            try:
+                if op == "create":
+                    number = client.call("POST", "/api/requests", {
+                        "client": f"Клиент {rnd.randint(1, 500)}",
+                        "equipment": rnd.choice(EQUIPMENT), "fault_type": "не включается",
+                    })["number"]
+                    created.append(number)
+                elif op == "search":
+                    client.call("GET", f"/api/requests?q={quote(rnd.choice(['принтер', 'клиент', 'сканер']))}&limit=50")
+                else:
+                    items = client.call("GET", f"/api/requests?q={rnd.choice(created)}&sort=number&limit=1")["items"]
+                    if items:
+                        client.call("PATCH", f"/api/requests/{items[0]['id']}", {"status": "в работе"})
+            except Exception as ex:
+                errors.append(ex)
+                continue
+            with lock:
+                timings[op].append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total = sum(len(v) for v in timings.values())
+    print(f"clients={clients} ops={total} errors={len(errors)} {total / elapsed:.0f} ops/s")
+    for op, values in sorted(timings.items()):
+        print(f"  {op:7} n={len(values):5} p50={percentile(values, 50):7.2f}ms p99={percentile(values, 99):7.2f}ms")
+    if errors:
+        print(f"first error: {errors[0]}")
+    return not errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="уже запущенный API; по умолчанию — локальный на временной базе")
+    parser.add_argument("--token")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.url, args.token, args.clients, args.ops) else 1)
@@ -0,0 +1,118 @@
+"""
+Архив выполненных заявок (src/archive.py): поиск, прокрутка и размер
+основной базы до и после переноса старых выполненных заявок, те же запросы
+с галочкой «с архивом», время переноса и возврата.
+
+    python benchmarks/archive_bench.py --requests 200000 --days 90
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import archive  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import paging  # noqa: E402
+import storage  # noqa: E402
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def scenarios(engine, with_archive):
+    def first(query, sort, descending=False):
+        def run():
+            pager = paging.RequestPager(engine, query, sort=sort, descending=descending, archive=with_archive)
+            pager.load_next()
+        return run
+
+    def scroll():
+        pager = paging.RequestPager(engine, "", sort="create_at", archive=with_archive)
+        for _ in range(20):
+            pager.load_next()
+
+    return {
+        "поиск «принтер», релевантность": first("принтер", paging.RANK),
+        "поиск «принтер», по номеру": first("принтер", "number"),
+        "поиск «Клиент 1», по дате": first("Клиент 1", "create_at", True),
+        "первая страница по статусу": first("", "status"),
+        "прокрутка 20 страниц по дате": scroll,
+    }
+
+
+def measure(engine, with_archive, repeat):
+    return {name: timed(fn, repeat) for name, fn in scenarios(engine, with_archive).items()}
+
+
+def sizes(engine, path):
+    with engine.connect() as conn:
+        live_rows = conn.execute(text("SELECT count(*) FROM request")).scalar_one()
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    archived = archive.size(engine)["requests"]
+    return live_rows, archived, os.path.getsize(path) / 2 ** 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=archive.ARCHIVE_DAYS)
+    parser.add_argument("--batch", type=int, default=archive.BATCH)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "archive.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    datagen.generate(db.engine, users=200, requests=args.requests, comments=args.comments, log=lambda line: None)
+    with db.engine.begin() as conn:
+        # импорт ставит «в статусе с» на момент импорта; выполненные — через 3 дня после приёма
+        conn.execute(text(
+            "UPDATE request_clock SET status_since = julianday(r.create_at) + 3 "
+            f"FROM request r WHERE r.id = request_clock.request_id AND r.status = '{archive.DONE}'"
+        ))
+
+    before = measure(db.engine, False, args.repeat)
+    live_before, _, size_before = sizes(db.engine, path)
+
+    start = time.perf_counter()
+    moved = archive.archive_closed(db.engine, args.days, args.batch)
+    archive_s = time.perf_counter() - start
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+    after = measure(db.engine, False, args.repeat)
+    both = measure(db.engine, True, args.repeat)
+    live_after, archived, size_after = sizes(db.engine, path)
+
+    with db.engine.connect() as conn:
+        ids = [row[0] for row in conn.execute(text(f"SELECT id FROM {archive.ARCHIVE}.request LIMIT 100"))]
+    start = time.perf_counter()
+    restored = archive.restore(db.engine, ids)
+    restore_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'запрос':34} {'до':>9} {'после':>9} {'с архивом':>10}")
+    for name in before:
+        print(f"{name:34} {before[name]:7.2f}мс {after[name]:7.2f}мс {both[name]:8.2f}мс")
+    print(f"заявок в основной базе: {live_before} -> {live_after}, в архиве {archived}")
+    print(f"файл основной базы: {size_before:.1f} -> {size_after:.1f} МБ, "
+          f"архив {os.path.getsize(storage.archive_path(str(db.engine.url))) / 2 ** 20:.1f} МБ")
+    print(f"перенос {moved} заявок: {archive_s:.2f}с ({moved / archive_s:.0f} заявок/с, пачка {args.batch})")
+    print(f"возврат {len(restored)} заявок: {restore_ms:.1f}мс")
+
+
+if __name__ == "__main__":
+    main()
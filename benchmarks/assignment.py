@@ -0,0 +1,128 @@
+"""
+Автоназначение (src/assign.py): симуляция смены — новые заявки получают
+исполнителя по стратегии, часть открытых закрывается — и разброс нагрузки
+между исполнителями в конце. Плюс цена одного выбора по индексу нагрузки
+против подсчёта открытых заявок полным проходом по request.
+
+    python benchmarks/assignment.py --executors 50 --steps 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import assign  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import lookups  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService  # noqa: E402
+from stats import DONE  # noqa: E402
+
+SCAN = (
+    "SELECT assignee_id, count(*) FROM request WHERE status <> :done "
+    "AND assignee_id IN (SELECT p.id FROM person p JOIN \"user\" u ON u.username = p.name "
+    "WHERE u.is_active AND u.role <> 'admin') "
+    "GROUP BY assignee_id ORDER BY 2 LIMIT 1"
+)
+
+
+def prepare(args):
+    path = os.path.join(tempfile.mkdtemp(), "assign.db")
+    engine = db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    masters = datagen.generate(engine, users=args.executors * 10, requests=args.requests, comments=0,
+                               log=lambda line: None)
+    executors = masters[1:]  # user00000 — админ
+    with engine.begin() as conn:
+        # исполнители — мастера из генератора, остальные пользователи — клиенты
+        conn.execute(text('UPDATE "user" SET is_active = 0 WHERE role <> \'admin\' '
+                          f"AND username NOT IN ({', '.join(repr(e) for e in executors)})"))
+    return engine, executors
+
+
+def loads(engine, executors):
+    with engine.connect() as conn:
+        counts = dict(conn.execute(text(
+            "SELECT p.name, count(*) FROM request r JOIN person p ON p.id = r.assignee_id "
+            "WHERE r.status <> :done GROUP BY r.assignee_id"
+        ), {"done": DONE}).all())
+    return [counts.get(name, 0) for name in executors]
+
+
+def simulate(name, args):
+    engine, executors = prepare(args)
+    svc = RequestService(engine)
+    index = assign.index(engine)
+    rnd = random.Random(2)
+    before = loads(engine, executors)
+    with engine.connect() as conn:
+        open_ids = [row[0] for row in conn.execute(text(
+            "SELECT id FROM request WHERE status <> :done AND assignee_id <> :none"
+        ), {"done": DONE, "none": lookups.NO_ASSIGNEE})]
+
+    picks, specialist_hits = [], 0
+    start = time.perf_counter()
+    for step in range(args.steps):
+        equipment = rnd.choice(datagen.EQUIPMENT)
+        t = time.perf_counter()
+        assignee = index.pick(equipment, name)
+        picks.append((time.perf_counter() - t) * 1e6)
+        specialist_hits += assignee in index.specialists(equipment)
+        svc.create("ООО «Клиент 1»", equipment, "не включается", assigned_to=assignee)
+        with engine.connect() as conn:
+            open_ids.append(conn.execute(text("SELECT max(id) FROM request")).scalar_one())
+        if rnd.random() < args.close:
+            svc.update(open_ids.pop(rnd.randrange(len(open_ids))), status=DONE)
+    elapsed = time.perf_counter() - start
+
+    after = loads(engine, executors)
+    assert after == [index.loads()[e] for e in executors], "индекс в памяти разошёлся с базой"
+    picks.sort()
+    return {
+        "before": before, "after": after, "refreshes": index.refreshes,
+        "pick_p50": picks[len(picks) // 2], "pick_p99": picks[int(len(picks) * 0.99)],
+        "specialist": specialist_hits / args.steps, "elapsed": elapsed, "engine": engine,
+    }
+
+
+def describe(values):
+    return (f"мин {min(values):4} макс {max(values):4} "
+            f"σ {statistics.pstdev(values):6.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--executors", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--close", type=float, default=0.9, help="вероятность закрыть заявку на шаге")
+    args = parser.parse_args(argv)
+
+    results = {name: simulate(name, args) for name in assign.STRATEGIES}
+    first = next(iter(results.values()))
+    print(f"исполнителей {len(first['before'])}, открытых заявок у них до смены: {describe(first['before'])}")
+    print(f"{'стратегия':14} {'нагрузка после смены':32} {'выбор p50/p99':>16} {'перечитываний':>14} "
+          f"{'к опытному':>10}")
+    for name, r in results.items():
+        print(f"{name:14} {describe(r['after']):32} {r['pick_p50']:6.1f}/{r['pick_p99']:6.1f}мкс "
+              f"{r['refreshes']:14} {r['specialist']:10.0%}")
+
+    engine = first["engine"]
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for _ in range(20):
+            conn.execute(text(SCAN), {"done": DONE}).all()
+    scan_us = (time.perf_counter() - start) / 20 * 1e6
+    print(f"выбор подсчётом по request (полный проход): {scan_us:.0f}мкс")
+
+
+if __name__ == "__main__":
+    main()
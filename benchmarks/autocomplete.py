@@ -0,0 +1,101 @@
+"""
+Подсказки полей (src/suggest.py): холодная сборка индекса и его память на
+большой базе, время ответа на каждое нажатие при наборе имён по буквам,
+прибавление частоты при сохранении — и тот же ответ запросом к базе.
+
+    python benchmarks/autocomplete.py --requests 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import bindparam, text  # noqa: E402
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+import live  # noqa: E402
+import lookups  # noqa: E402
+import storage  # noqa: E402
+import suggest  # noqa: E402
+
+# тот же ответ без индекса: по префиксу имени, самые частые первыми
+QUERY = (
+    "SELECT {column}, count(*) FROM {view} WHERE {column} LIKE :prefix || '%' "
+    "GROUP BY {column} ORDER BY 2 DESC, 1 LIMIT :limit"
+)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1], samples[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=300, help="сколько имён набрать по буквам на поле")
+    parser.add_argument("--db-keys", type=int, default=30, help="сколько нажатий ответить запросом к базе")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "suggest.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    start = time.perf_counter()
+    datagen.generate(db.engine, users=args.users, requests=args.requests, comments=0, log=lambda line: None)
+    print(f"заявок {args.requests}: база {time.perf_counter() - start:.0f}с, "
+          f"{os.path.getsize(path) / 2 ** 20:.0f} МБ")
+
+    start = time.perf_counter()
+    completions = suggest.autocomplete(db.engine)  # сборка в фоне — ждём её
+    while not completions.ready():
+        time.sleep(0.005)
+    print(f"холодная сборка: {(time.perf_counter() - start) * 1000:.0f} мс")
+    tracemalloc.start()
+    completions.refresh()  # прежний индекс освобождается, в памяти остаётся новый
+    print(f"память индекса: {tracemalloc.get_traced_memory()[0] / 2 ** 20:.1f} МБ")
+    tracemalloc.stop()
+
+    # набираем значения случайных заявок: частые имена набирают чаще
+    rnd = random.Random(3)
+    ids = [rnd.randint(1, args.requests) for _ in range(args.words)]
+    print(f"{'поле':12} {'имён':>7} {'нажатие p50/p99/max, мкс':>28} {'запросом к базе p50, мс':>24}")
+    with db.engine.connect() as conn:
+        for field in suggest.FIELDS:
+            distinct = conn.execute(text(f"SELECT count(DISTINCT {field}) FROM {lookups.REQUEST_VIEW}")).scalar_one()
+            names = [name for name in conn.execute(
+                text(f"SELECT {field} FROM {lookups.REQUEST_VIEW} WHERE id IN :ids").bindparams(
+                    bindparam("ids", expanding=True)), {"ids": ids}).scalars() if name]
+            typed = [name[:i] for name in names for i in range(1, len(name) + 1)]
+            samples = []
+            for prefix in typed:
+                t = time.perf_counter()
+                completions.complete(field, prefix)
+                samples.append((time.perf_counter() - t) * 1e6)
+            p50, p99, top = percentiles(samples)
+
+            sql = text(QUERY.format(column=field, view=lookups.REQUEST_VIEW))
+            queried = []
+            for prefix in typed[:args.db_keys]:
+                t = time.perf_counter()
+                conn.execute(sql, {"prefix": prefix, "limit": suggest.SUGGESTIONS}).all()
+                queried.append((time.perf_counter() - t) * 1000)
+            print(f"{field:12} {distinct:7} {p50:8.1f} / {p99:7.1f} / {top:7.1f}     "
+                  f"{percentiles(queried)[0]:20.1f}")
+
+    # сохранение: событие live.py доходит до индекса в потоке писателя
+    n = 10_000
+    t = time.perf_counter()
+    for i in range(n):
+        live.broker.publish(db.engine, live.updated(i + 1, {"client": f"ООО «Клиент {i % 500}»"}))
+    print(f"учёт сохранения в индексе: {(time.perf_counter() - t) / n * 1e6:.1f} мкс на заявку")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Резервная копия на ходу (src/backup.py): задержка записи без копии и пока
+снимается копия большой базы — шагами с паузами и за один шаг, — а также
+время копии, размер до и после сжатия и число перезапусков копирования.
+
+    python benchmarks/backup_bench.py --requests 200000 --comments 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import backup  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, STATUSES  # noqa: E402
+
+
+class Writer(threading.Thread):
+    """правки заявок с паузой pause; задержка каждой записи, мс"""
+
+    def __init__(self, svc, ids, pause):
+        super().__init__(daemon=True)
+        self.svc, self.ids, self.pause = svc, ids, pause
+        self.samples = []
+        self.stop = threading.Event()
+
+    def run(self):
+        rnd = random.Random(1)
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            self.svc.update(rnd.choice(self.ids), status=rnd.choice(STATUSES))
+            self.samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(self.pause)
+
+
+def under_load(svc, ids, pause, work):
+    """задержки записей, пока идёт work(); (задержки, результат work)"""
+    writer = Writer(svc, ids, pause)
+    writer.start()
+    time.sleep(0.5)  # писатель разогнался
+    writer.samples.clear()
+    try:
+        result = work()
+    finally:
+        writer.stop.set()
+        writer.join()
+    return writer.samples, result
+
+
+def describe(samples):
+    samples = sorted(samples)
+    return (f"записей {len(samples):5}  p50={statistics.median(samples):6.2f}мс  "
+            f"p99={samples[int(len(samples) * 0.99) - 1]:7.2f}мс  max={samples[-1]:7.2f}мс")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--profile", default=storage.DEFAULT_PROFILE, choices=list(storage.PROFILES))
+    parser.add_argument("--pause", type=float, default=0.005, help="сек между записями")
+    parser.add_argument("--idle", type=float, default=5.0, help="сек замера без копии")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "backup.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}", args.profile)
+    db.create_db()
+    datagen.generate(db.engine, users=500, requests=args.requests, comments=args.comments, log=lambda line: None)
+    svc = RequestService(db.engine)
+    ids = list(range(1, args.requests + 1))
+    print(f"база {os.path.getsize(path) / 2 ** 20:.0f} МБ, профиль {args.profile}")
+
+    idle, _ = under_load(svc, ids, args.pause, lambda: time.sleep(args.idle))
+    print(f"{'без копии':26} {describe(idle)}")
+
+    runs = [
+        ("копия шагами", {"compress": False}),
+        ("копия шагами + gzip", {"compress": True}),
+        ("копия за один шаг", {"compress": False, "pages": -1, "sleep": 0}),
+    ]
+    for n, (name, options) in enumerate(runs):
+        directory = os.path.join(tmp, f"run{n}")
+        samples, result = under_load(svc, ids, args.pause,
+                                     lambda: backup.backup(db.engine, directory, keep=1, **options))
+        print(f"{name:26} {describe(samples)}")
+        print(f"{'':26} {result['seconds']:.1f}с, {result['bytes'] / 2 ** 20:.0f} МБ, "
+              f"шагов {result['steps']}, перезапусков {result['restarts']}, проверка ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Скорость потокового импорта/экспорта (src/bulk.py): генерирует JSONL
+на N заявок и по 2 комментария к каждой, загружает и выгружает обратно.
+
+    python benchmarks/bulk_import.py --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import bulk  # noqa: E402
+import db  # noqa: E402
+import storage  # noqa: E402
+
+EQUIPMENT = ["Принтер", "Сканер", "Ноутбук", "Монитор", "МФУ", "Роутер", "ИБП"]
+FAULTS = ["не включается", "замятие", "шумит", "нет сети", "перегрев"]
+
+
+def generate(path, rows, with_numbers):
+    rnd = random.Random(1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            row = {
+                "equipment": rnd.choice(EQUIPMENT),
+                "fault_type": rnd.choice(FAULTS),
+                "client": f"Клиент {rnd.randint(1, 5000)}",
+                "description": "legacy ticket",
+                "create_at": f"2024-{rnd.randint(1, 12):02}-{rnd.randint(1, 28):02}",
+                "status": rnd.choice(bulk.STATUSES),
+            }
+            if with_numbers:
+                row["number"] = 100000 + i
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def generate_comments(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            for j in range(2):
+                f.write(json.dumps({"request_number": 100000 + i, "author": "legacy",
+                                    "text": f"comment {j}"}, ensure_ascii=False) + "\n")
+
+
+def main(rows):
+    tmp = tempfile.mkdtemp()
+    db.engine = storage.make_engine(f"sqlite:///{os.path.join(tmp, 'bulk.db')}")
+    db.create_db()
+
+    requests_path = os.path.join(tmp, "requests.jsonl")
+    comments_path = os.path.join(tmp, "comments.jsonl")
+    generate(requests_path, rows, with_numbers=True)
+    generate_comments(comments_path, rows)
+
+    for name, load, path, expected in (
+        ("requests", bulk.import_requests, requests_path, rows),
+        ("comments", bulk.import_comments, comments_path, rows * 2),
+    ):
+        t0 = time.perf_counter()
+        count = load(bulk.read_rows(path))
+        elapsed = time.perf_counter() - t0
+        assert count == expected, (count, expected)
+        print(f"import {name:8} rows={count} {elapsed:6.1f}s {count / elapsed:8.0f} rows/s")
+
+    for kind in ("requests", "comments"):
+        t0 = time.perf_counter()
+        count = bulk.export_file(kind, os.path.join(tmp, f"out_{kind}.csv"))
+        elapsed = time.perf_counter() - t0
+        print(f"export {kind:8} rows={count} {elapsed:6.1f}s {count / elapsed:8.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,78 @@
+"""
+Массовая правка (RequestService.bulk_update): закрыть/переназначить N заявок
+одной транзакцией против прежнего пути по одной — загрузить заявку во
+вкладке редактирования и сохранить все поля формы.
+
+    python benchmarks/bulk_update.py --sizes 200 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import cache  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import stats  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, UPDATED  # noqa: E402
+
+
+def one_by_one(svc, ids, assignee):
+    """как load_request_for_edit + edit_request_handler для каждой заявки"""
+    for request_id in ids:
+        request = svc.get(request_id)
+        svc.update(
+            request_id,
+            equipment=request.equipment,
+            fault_type=request.fault_type,
+            client=request.client,
+            description=request.description,
+            status=stats.DONE,
+            assigned_to=assignee,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--profile", default=storage.DEFAULT_PROFILE, choices=list(storage.PROFILES))
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "bulk.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}", args.profile)
+    db.create_db()
+    datagen.generate(db.engine, users=200, requests=args.requests, comments=0, log=lambda line: None)
+    svc = RequestService(db.engine)
+    rnd = random.Random(1)
+    open_ids = [row.id for row in svc.list(query="", limit=args.requests) if row.status != stats.DONE]
+
+    print(f"{'заявок':>7} {'по одной':>12} {'массово':>10} {'ускорение':>10}  заявок/с по одной / массово")
+    for n in args.sizes:
+        first, second = rnd.sample(open_ids, n), rnd.sample(open_ids, n)
+        cache.requests.clear()
+        start = time.perf_counter()
+        one_by_one(svc, first, "смена 1")
+        single_s = time.perf_counter() - start
+
+        cache.requests.clear()
+        start = time.perf_counter()
+        results = svc.bulk_update(second, status=stats.DONE, assigned_to="смена 2")
+        bulk_s = time.perf_counter() - start
+
+        updated = sum(r == UPDATED for r in results.values())
+        print(f"{n:7} {single_s * 1000:10.1f}мс {bulk_s * 1000:8.1f}мс {single_s / bulk_s:9.1f}x  "
+              f"{n / single_s:8.0f} / {n / bulk_s:.0f} (обновлено {updated})")
+        # открываем обратно для следующего размера
+        svc.bulk_update(first + second, status="в работе")
+    diff = stats.check(db.engine)
+    print("счётчики сходятся" if not diff else f"расхождения в счётчиках: {diff}")
+
+
+if __name__ == "__main__":
+    main()
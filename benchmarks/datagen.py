@@ -0,0 +1,163 @@
+"""
+Генератор синтетической базы: пользователи, заявки и комментарии с
+правдоподобными распределениями (частые клиенты и оборудование, сезонность
+по дням недели, старые заявки чаще выполнены, у части заявок длинные обсуждения).
+Одинаковый --seed даёт одинаковую базу.
+
+    python benchmarks/datagen.py big.db --preset medium
+    python benchmarks/datagen.py big.db --users 1000 --requests 200000 --comments 5000000
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import auth  # noqa: E402
+import bulk  # noqa: E402
+import db  # noqa: E402
+import storage  # noqa: E402
+from db import User  # noqa: E402
+from stats import DONE  # noqa: E402
+
+PRESETS = {
+    "small": {"users": 100, "requests": 10_000, "comments": 10_000},
+    "medium": {"users": 1_000, "requests": 200_000, "comments": 1_000_000},
+    "large": {"users": 5_000, "requests": 1_000_000, "comments": 5_000_000},
+}
+PASSWORD = "password123"  # у всех сгенерированных пользователей
+
+EQUIPMENT = [
+    "Принтер HP LaserJet", "МФУ Canon i-SENSYS", "Ноутбук Lenovo ThinkPad", "Монитор Samsung",
+    "Системный блок", "Роутер TP-Link", "ИБП APC", "Сканер Epson", "Проектор Epson",
+    "IP-телефон Cisco", "Сервер Dell PowerEdge", "Коммутатор D-Link", "Планшет Samsung",
+    "Кассовый аппарат", "Плоттер HP DesignJet",
+]
+FAULTS = {
+    "Принтер": ["замятие бумаги", "не печатает", "полосы при печати", "не видит картридж"],
+    "МФУ": ["замятие бумаги", "не сканирует", "ошибка фьюзера", "не печатает"],
+    "Ноутбук": ["не включается", "перегрев", "разбит экран", "не заряжается", "синий экран"],
+    "Монитор": ["нет изображения", "мерцает", "битые пиксели"],
+    "Роутер": ["нет сети", "перезагружается", "медленный интернет"],
+    "ИБП": ["не держит заряд", "пищит", "не включается"],
+}
+DEFAULT_FAULTS = ["не включается", "шумит", "перегрев", "не работает"]
+PHRASES = [
+    "Принял в работу", "Жду запчасть", "Заменил картридж", "Клиент не отвечает",
+    "Проведена диагностика", "Нужна замена платы", "Проверил, работает", "Передал мастеру",
+    "Согласовано с клиентом", "Повторная поломка", "Почистил от пыли", "Обновил прошивку",
+]
+DESCRIPTIONS = [
+    "Сотрудник сообщил о неисправности", "Сломалось после перепада напряжения",
+    "Периодически зависает", "Поломка после переезда офиса", "",
+]
+
+
+def zipf_weights(n, s=1.1):
+    """кумулятивные веса Ципфа: первые элементы встречаются намного чаще"""
+    return list(itertools.accumulate(1 / (k + 1) ** s for k in range(n)))
+
+
+def pick(rnd, items, cum):
+    return items[bisect.bisect(cum, rnd.random() * cum[-1])]
+
+
+def generate(engine, users=100, requests=10_000, comments=10_000, seed=1, days=365, log=print):
+    """заполняет пустую базу; возвращает логины исполнителей"""
+    rnd = random.Random(seed)
+    today = date.today()
+
+    # один хеш на всех: сотни тысяч bcrypt заняли бы часы
+    start = time.perf_counter()
+    password_hash = auth.hash_password(PASSWORD)
+    logins = [f"user{i:05}" for i in range(users)]
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"username": login, "password_hash": password_hash, "full_name": f"Пользователь {i}",
+             "role": "admin" if i == 0 else "user", "is_active": True, "created_at": datetime.now()}
+            for i, login in enumerate(logins)
+        ])
+    masters = logins[: max(1, users // 10)]
+    log(f"users    {users:>9}  {time.perf_counter() - start:6.1f}s")
+
+    clients = [f"ООО «Клиент {i}»" for i in range(max(10, requests // 20))]
+    client_cum = zipf_weights(len(clients))
+    equipment_cum = zipf_weights(len(EQUIPMENT), 0.9)
+    master_cum = zipf_weights(len(masters), 0.5)
+    # будни загружены сильнее выходных
+    day_cum = list(itertools.accumulate(
+        0.3 if (today - timedelta(days=d)).weekday() >= 5 else 1.0 for d in range(days)
+    ))
+
+    def request_rows():
+        for i in range(requests):
+            age = bisect.bisect(day_cum, rnd.random() * day_cum[-1])
+            equipment = pick(rnd, EQUIPMENT, equipment_cum)
+            faults = FAULTS.get(equipment.split()[0], DEFAULT_FAULTS)
+            # чем старше заявка, тем вероятнее она закрыта
+            done = rnd.random() < min(0.97, 0.2 + age / 30)
+            status = DONE if done else ("в работе" if rnd.random() < 0.4 else "в ожидании")
+            yield i, {
+                "create_at": today - timedelta(days=age),
+                "equipment": equipment,
+                "fault_type": rnd.choice(faults),
+                "description": rnd.choice(DESCRIPTIONS),
+                "client": pick(rnd, clients, client_cum),
+                "status": status,
+                "assigned_to": pick(rnd, masters, master_cum) if status != "в ожидании" or rnd.random() < 0.3 else "",
+            }
+
+    start = time.perf_counter()
+    bulk.import_requests(request_rows(), engine)
+    log(f"requests {requests:>9}  {time.perf_counter() - start:6.1f}s")
+
+    # обсуждения распределены неравномерно: у немногих заявок сотни комментариев
+    request_cum = zipf_weights(requests, 0.8)
+    request_ids = list(range(1, requests + 1))
+    rnd.shuffle(request_ids)  # «горячие» заявки — не обязательно самые старые
+
+    def comment_rows():
+        for i in range(comments):
+            yield i, {
+                "request_id": pick(rnd, request_ids, request_cum),
+                "author": pick(rnd, masters, master_cum),
+                "text": rnd.choice(PHRASES),
+                "created_at": today - timedelta(days=rnd.randrange(days)),
+            }
+
+    start = time.perf_counter()
+    if requests:
+        bulk.import_comments(comment_rows(), engine)
+    log(f"comments {comments:>9}  {time.perf_counter() - start:6.1f}s")
+    return masters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="файл новой базы")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--requests", type=int)
+    parser.add_argument("--comments", type=int)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} уже существует")
+    sizes = dict(PRESETS[args.preset])
+    sizes.update({k: getattr(args, k) for k in sizes if getattr(args, k) is not None})
+
+    db.engine = storage.make_engine(f"sqlite:///{args.path}")
+    db.create_db()
+    generate(db.engine, **sizes, seed=args.seed, days=args.days)
+    print(f"Готово: {args.path}, {os.path.getsize(args.path) / 2**20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
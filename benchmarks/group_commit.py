@@ -0,0 +1,102 @@
+"""
+Общий коммит (src/writer.py): утренний наплыв — N диспетчеров одновременно
+заводят заявки и комментарии. Пропускная способность и задержка вызова
+(p50/p99/max) при коммите на каждый вызов и через фонового писателя.
+
+    python benchmarks/group_commit.py --threads 32 --per-thread 100 --profile durable
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import db  # noqa: E402
+import storage  # noqa: E402
+import writer  # noqa: E402
+from services import RequestService, CommentService  # noqa: E402
+
+COMMENT_EVERY = 4  # каждый четвёртый вызов — комментарий
+
+
+def run(args, group):
+    path = os.path.join(tempfile.mkdtemp(), "burst.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}", args.profile)
+    db.create_db()
+    writer.GROUP_COMMIT = group
+    requests_svc, comments_svc = RequestService(db.engine), CommentService(db.engine)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads + 1)
+
+    first = requests_svc.create("клиент", "принтер", "замятие")  # к ней идут комментарии
+    with db.engine.connect() as conn:
+        first_id = conn.execute(text("SELECT id FROM request WHERE number = :n"), {"n": first}).scalar_one()
+
+    def dispatcher(i):
+        mine = []
+        start.wait()
+        for j in range(args.per_thread):
+            t = time.perf_counter()
+            try:
+                if j % COMMENT_EVERY == COMMENT_EVERY - 1:
+                    comments_svc.add(first_id, f"диспетчер{i}", f"уточнение {j}")
+                else:
+                    requests_svc.create(f"клиент {i}", "принтер", "замятие", f"заявка {i}/{j}")
+            except Exception as ex:  # считаем, но не прерываем прогон
+                errors.append(ex)
+            mine.append((time.perf_counter() - t) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    pool = [threading.Thread(target=dispatcher, args=(i,)) for i in range(args.threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with db.engine.connect() as conn:
+        numbers = conn.execute(text("SELECT count(DISTINCT number), count(*) FROM request")).one()
+    assert numbers[0] == numbers[1], "номера повторяются"
+    latencies.sort()
+    result = {
+        "calls": len(latencies), "errors": len(errors), "elapsed": elapsed,
+        "p50": statistics.median(latencies), "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "max": latencies[-1], "first_error": errors[0] if errors else None,
+    }
+    if group:
+        w = writer.writer(db.engine)
+        result["batch"] = w.operations / max(w.batches, 1)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=100)
+    parser.add_argument("--profile", default=storage.DEFAULT_PROFILE, choices=list(storage.PROFILES))
+    args = parser.parse_args(argv)
+
+    print(f"диспетчеров {args.threads} по {args.per_thread} вызовов, профиль {args.profile}, "
+          f"пачка до {writer.WRITER_BATCH}, ожидание до {writer.WRITER_WAIT_MS:g} мс")
+    for name, group in (("коммит на вызов", False), ("общий коммит", True)):
+        r = run(args, group)
+        batch = f"  пачка в среднем {r['batch']:.1f}" if "batch" in r else ""
+        print(f"{name:16} {r['calls'] / r['elapsed']:7.0f} вызовов/с  p50={r['p50']:7.2f}мс "
+              f"p99={r['p99']:7.2f}мс  max={r['max']:7.2f}мс  ошибок {r['errors']}{batch}")
+        if r["first_error"]:
+            print(f"  первая ошибка: {r['first_error']!r}")
+
+
+if __name__ == "__main__":
+    main()
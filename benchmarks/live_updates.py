@@ -0,0 +1,107 @@
+"""
+Живые изменения (src/live.py): цена публикации для писателя при N открытых
+сессиях, сколько раз пачка правок будит сессию и сколько стоит применить её
+к окну таблицы против повторного запроса первой страницы в каждой сессии.
+
+    python benchmarks/live_updates.py --sessions 50 --burst 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+import live  # noqa: E402
+import paging  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, STATUSES  # noqa: E402
+
+
+def burst(svc, ids, n, rnd):
+    """n правок и новых заявок вперемешку; время каждой записи, мс"""
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        if i % 5 == 4:
+            svc.create(f"ООО «Клиент {i}»", "Принтер HP LaserJet", "замятие бумаги")
+        else:
+            svc.update(rnd.choice(ids), status=rnd.choice(STATUSES), assigned_to=f"user{i % 7:05}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "live.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    datagen.generate(db.engine, users=50, requests=args.requests, comments=0, log=lambda line: None)
+    svc = RequestService(db.engine)
+    rnd = random.Random(1)
+
+    def window():
+        pager = paging.RequestPager(db.engine, "", sort="number", descending=True)
+        pager.load_next()
+        return pager
+
+    def targets():
+        # половина правок — по строкам верхнего окна (по номеру, по убыванию), половина — мимо него
+        return [row.id for row in window().rows] + rnd.sample(range(1, args.requests), 50)
+
+    base = burst(svc, targets(), args.burst, rnd)
+
+    wakes = [0] * args.sessions
+    subs, pagers = [], []
+    for n in range(args.sessions):
+        def wake(n=n):
+            wakes[n] += 1
+        subs.append(live.broker.subscribe(db.engine, wake))
+        pagers.append(window())
+    with_subs = burst(svc, targets(), args.burst, rnd)
+
+    start = time.perf_counter()
+    touched = 0
+    for sub, pager in zip(subs, pagers):
+        for event in live.updates_first(sub.drain()):
+            if event["op"] == live.INSERT:
+                touched += pager.insert(event["row"]) is not None
+            else:
+                touched += pager.patch(event["id"], event["fields"]) is not None
+    apply_ms = (time.perf_counter() - start) * 1000 / args.sessions
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        pager = window()
+    requery_ms = (time.perf_counter() - start) * 1000 / args.sessions
+
+    # окно после патчей совпадает с тем, что вернул бы новый запрос (кроме порядка правленых)
+    fresh = {row.id: row for row in pager.rows}
+    stale = sum(1 for row in pagers[0].rows if row.id in fresh and fresh[row.id] != row)
+    for sub in subs:
+        sub.close()
+
+    def p(samples, q):
+        return sorted(samples)[int(len(samples) * q) - 1]
+
+    print(f"запись без подписчиков     p50={statistics.median(base):.3f}ms p99={p(base, 0.99):.3f}ms")
+    print(f"запись, {args.sessions} сессий        p50={statistics.median(with_subs):.3f}ms "
+          f"p99={p(with_subs, 0.99):.3f}ms")
+    print(f"событий {args.burst}, пробуждений на сессию: {statistics.mean(wakes):.1f}")
+    print(f"применение пачки к окну: {apply_ms:.3f}ms/сессия, строк затронуто {touched // args.sessions}")
+    print(f"повторный запрос страницы: {requery_ms:.3f}ms/сессия")
+    print(f"строк окна, расходящихся с базой: {stale}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Задержка входа при разной стоимости хеширования (auth.make_context).
+Для каждого числа раундов: регистрация, вход по паролю, вход после смены
+настроек (с пересчётом хеша) и вход по токену сессии.
+
+    python benchmarks/login_latency.py --rounds 10 12 --logins 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import auth  # noqa: E402
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def run(rounds: int, logins: int, scheme: str):
+    engine = storage.make_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}")
+    db.engine = engine
+    db.create_db()
+
+    auth.pwd_context = auth.make_context(scheme, rounds)
+    _, register_ms = timed(auth.register_user, engine, "user", "password123")
+
+    login_ms = [timed(auth.authenticate_user, engine, "user", "password123")[1] for _ in range(logins)]
+
+    # настройки поменялись: первый вход пересчитывает хеш, следующие уже по новым
+    auth.pwd_context = auth.make_context(scheme, rounds + 1)
+    user, rehash_ms = timed(auth.authenticate_user, engine, "user", "password123")
+    assert user and not auth.context().needs_update(user.password_hash)
+
+    token = auth.issue_token(user.id)
+    token_ms = [timed(auth.resolve_token, engine, token)[1] for _ in range(logins)]
+
+    print(f"{scheme} rounds={rounds:2} register={register_ms:7.1f}ms "
+          f"login p50={statistics.median(login_ms):7.1f}ms "
+          f"rehash login={rehash_ms:7.1f}ms "
+          f"token p50={statistics.median(token_ms):6.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--scheme", default=auth.SCHEME)
+    args = parser.parse_args()
+    for r in args.rounds:
+        run(r, args.logins, args.scheme)
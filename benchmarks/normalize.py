@@ -0,0 +1,149 @@
+"""
+Справочники (src/lookups.py): размер заявок и комментариев и время выборок
+по клиенту, исполнителю и оборудованию — в прежней схеме со строками в
+каждой строке заявки и в нынешней с целыми id справочников.
+
+    python benchmarks/normalize.py --requests 200000 --comments 200000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+import lookups  # noqa: E402
+import paging  # noqa: E402
+import storage  # noqa: E402
+from stats import DONE  # noqa: E402
+
+# прежняя схема: те же строки, имена текстом, индексы на текстовых колонках
+LEGACY = [
+    "CREATE TABLE request (id INTEGER PRIMARY KEY, number INTEGER NOT NULL, create_at DATE NOT NULL, "
+    "equipment VARCHAR NOT NULL, fault_type VARCHAR NOT NULL, description VARCHAR NOT NULL, "
+    "client VARCHAR NOT NULL, status VARCHAR NOT NULL, assigned_to VARCHAR NOT NULL)",
+    f"INSERT INTO request SELECT * FROM src.{lookups.REQUEST_VIEW}",
+    "CREATE TABLE comment (id INTEGER PRIMARY KEY, request_id INTEGER NOT NULL, author VARCHAR NOT NULL, "
+    "text VARCHAR NOT NULL, created_at DATE NOT NULL)",
+    f"INSERT INTO comment SELECT * FROM src.{lookups.COMMENT_VIEW}",
+    "CREATE UNIQUE INDEX ix_request_number ON request (number)",
+    "CREATE INDEX ix_comment_request_id ON comment (request_id)",
+    "CREATE INDEX ix_comment_author ON comment (author)",
+] + [f"CREATE INDEX {index} ON request ({column}, id)" for column, index in paging.SORT_COLUMNS.items()]
+
+COLUMNS = "id, number, create_at, equipment, fault_type, client, status, assigned_to"
+QUERIES = {
+    "заявки клиента, страница": (
+        f"SELECT {COLUMNS} FROM request WHERE client = :client ORDER BY id LIMIT 50",
+        f"SELECT {COLUMNS} FROM {lookups.REQUEST_VIEW} WHERE client = :client ORDER BY id LIMIT 50",
+    ),
+    "заявок у клиента": (
+        "SELECT count(*) FROM request WHERE client = :client",
+        f"SELECT count(*) FROM request WHERE client_id = {lookups.id_sql('client', ':client')}",
+    ),
+    "открытых у исполнителя": (
+        "SELECT count(*) FROM request WHERE assigned_to = :master AND status <> :done",
+        f"SELECT count(*) FROM request WHERE assignee_id = {lookups.id_sql('assigned_to', ':master')} "
+        "AND status <> :done",
+    ),
+    "опытные по оборудованию": (
+        "SELECT assigned_to FROM request WHERE equipment = :equipment AND assigned_to <> '' "
+        "GROUP BY assigned_to ORDER BY count(*) DESC",
+        f"SELECT {lookups.name_sql('assigned_to', 'r')} FROM request r "
+        f"WHERE r.equipment_id = {lookups.id_sql('equipment', ':equipment')} AND r.assignee_id <> :none "
+        "GROUP BY r.assignee_id ORDER BY count(*) DESC",
+    ),
+    "первая страница по клиенту": (
+        f"SELECT {COLUMNS} FROM request ORDER BY client, id LIMIT 50",
+        f"SELECT {COLUMNS} FROM {lookups.REQUEST_VIEW} ORDER BY client, id LIMIT 50",
+    ),
+    "комментарии автора": (
+        "SELECT count(*) FROM comment WHERE author = :master",
+        f"SELECT count(*) FROM comment WHERE author_id = {lookups.id_sql('author', ':master')}",
+    ),
+}
+
+
+def timed(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def size(engine, tables):
+    """МБ страниц таблиц tables и их индексов"""
+    with engine.connect() as conn:
+        names = ", ".join(f"'{t}'" for t in tables)
+        return conn.execute(text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name IN "
+            f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({names}))"
+        )).scalar_one() / 2 ** 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "normalized.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    datagen.generate(db.engine, users=args.users, requests=args.requests, comments=args.comments,
+                     log=lambda line: None)
+
+    legacy = storage.make_engine(f"sqlite:///{os.path.join(folder, 'legacy.db')}")
+    with legacy.connect() as conn:
+        conn.execute(text("ATTACH DATABASE :path AS src"), {"path": path})
+        for sql in LEGACY:
+            conn.execute(text(sql))
+        conn.commit()
+        conn.execute(text("DETACH DATABASE src"))
+    for engine in (legacy, db.engine):
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+            conn.execute(text("ANALYZE"))
+
+    with db.engine.connect() as conn:
+        # самые частые клиент, мастер и оборудование — выборки по ним самые большие
+        params = {
+            "client": conn.execute(text(
+                f"SELECT client FROM {lookups.REQUEST_VIEW} GROUP BY client ORDER BY count(*) DESC LIMIT 1"
+            )).scalar_one(),
+            "master": conn.execute(text(
+                f"SELECT assigned_to FROM {lookups.REQUEST_VIEW} WHERE assigned_to <> '' "
+                "GROUP BY assigned_to ORDER BY count(*) DESC LIMIT 1"
+            )).scalar_one(),
+            "equipment": datagen.EQUIPMENT[0],
+            "done": DONE,
+            "none": lookups.NO_ASSIGNEE,
+        }
+
+    before = size(legacy, ("request", "comment"))
+    after = size(db.engine, ("request", "comment", "client", "equipment"))
+    print(f"заявок {args.requests}, комментариев {args.comments}")
+    print(f"заявки и комментарии с индексами: {before:.1f} -> {after:.1f} МБ "
+          f"({1 - after / before:.0%} меньше)")
+    print(f"{'запрос':30} {'строки':>10} {'id':>10}")
+    with legacy.connect() as old, db.engine.connect() as new:
+        for name, (old_sql, new_sql) in QUERIES.items():
+            # порядок равных по счёту исполнителей в схемах разный — сравниваем без порядка
+            assert sorted(old.execute(text(old_sql), params)) == sorted(new.execute(text(new_sql), params)), name
+            print(f"{name:30} {timed(old, old_sql, params, args.repeat):8.2f}мс "
+                  f"{timed(new, new_sql, params, args.repeat):8.2f}мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Выдача номеров заявок под конкуренцией: N потоков одновременно вызывают
+save_request на одной базе. Проверяет, что номера не повторяются,
+и печатает вставки/сек.
+
+    python benchmarks/number_allocation.py --threads 8 --per-thread 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlmodel import Session, select  # noqa: E402
+
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+def run(threads: int, per_thread: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+
+    errors = []
+    start = threading.Barrier(threads + 1)
+
+    def worker(i):
+        start.wait()
+        for j in range(per_thread):
+            try:
+                db.save_request(f"client {i}", "printer", "jam", f"bench {i}/{j}")
+            except Exception as ex:  # считаем, но не прерываем прогон
+                errors.append(ex)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with Session(db.engine) as session:
+        numbers = session.exec(select(db.Request.number)).all()
+    duplicates = {n: c for n, c in Counter(numbers).items() if c > 1}
+
+    print(f"threads={threads} inserts={len(numbers)} errors={len(errors)} "
+          f"duplicates={len(duplicates)} elapsed={elapsed:.2f}s "
+          f"rate={len(numbers) / elapsed:.0f} inserts/s")
+    if errors:
+        print(f"first error: {errors[0]!r}")
+    return not duplicates and len(numbers) == threads * per_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.threads, args.per_thread) else 1)
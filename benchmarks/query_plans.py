@@ -0,0 +1,60 @@
+"""
+Проверка планов запросов: после миграций вход, поиск, подсчёт статусов
+и выборка комментариев должны идти по индексам, а не полным сканом.
+Печатает EXPLAIN QUERY PLAN каждого запроса, код возврата 1 — если есть SCAN.
+
+    python benchmarks/query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import db  # noqa: E402
+import lookups  # noqa: E402
+import storage  # noqa: E402
+import search  # noqa: E402
+
+QUERIES = {
+    "login": ('SELECT * FROM "user" WHERE username = :v', {"v": "admin"}),
+    "search": (
+        f"SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH :v ORDER BY rank LIMIT 200",
+        {"v": search.build_match("принтер")},
+    ),
+    "search by number": ("SELECT * FROM request WHERE number = :v", {"v": 1001}),
+    "status count": ("SELECT count(*) FROM request WHERE status = :v", {"v": "выполнено"}),
+    "comments of request": ("SELECT * FROM comment WHERE request_id = :v ORDER BY id", {"v": 1}),
+    "comment timeline page": (
+        "SELECT * FROM comment WHERE request_id = :v AND id > :after ORDER BY id LIMIT 50",
+        {"v": 1, "after": 100},
+    ),
+    "comment counts": (
+        "SELECT request_id, count(*) FROM comment WHERE request_id IN (1, 2, 3) GROUP BY request_id",
+        {},
+    ),
+    # имена — через справочники (lookups.py): индекс имени, затем индекс id справочника у заявок
+    "requests of executor": (f"SELECT * FROM {lookups.REQUEST_VIEW} WHERE assigned_to = :v", {"v": "admin"}),
+    "requests of client": (f"SELECT * FROM {lookups.REQUEST_VIEW} WHERE client = :v", {"v": "client"}),
+}
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "plans.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+
+    ok = True
+    with db.engine.connect() as conn:
+        for name, (sql, params) in QUERIES.items():
+            plan = [row[3] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+            full_scan = any(step.startswith("SCAN") and "VIRTUAL TABLE" not in step for step in plan)
+            ok &= not full_scan
+            print(f"{'FAIL' if full_scan else 'ok  '} {name}: {' | '.join(plan)}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
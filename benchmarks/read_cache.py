@@ -0,0 +1,75 @@
+"""
+Кэш чтения заявок и пользователей (src/cache.py): задержка повторных
+чтений заявки и проверки токена с кэшем и без, плюс счётчики попаданий.
+
+    python benchmarks/read_cache.py --requests 500 --reads 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import auth  # noqa: E402
+import cache  # noqa: E402
+import db  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, UserService  # noqa: E402
+
+
+def timed(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"  {name:<8} p50={statistics.median(samples):7.3f}ms p99={p99:7.3f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    auth.pwd_context = auth.make_context(rounds=4)  # хеширование здесь не меряем
+
+    requests_svc = RequestService(db.engine)
+    users_svc = UserService(db.engine)
+    for i in range(args.requests):
+        requests_svc.create(f"клиент {i % 50}", f"принтер {i}", "замятие")
+    users_svc.register("bench", "password123")
+    _, token = users_svc.login("bench", "password123")
+
+    # чтения с перекосом: как в работе, одни и те же заявки открывают чаще
+    rnd = random.Random(1)
+    ids = [(min(int(rnd.paretovariate(1.2)), args.requests),) for _ in range(args.reads)]
+    for enabled in (False, True):
+        cache.set_enabled(enabled)
+        print(f"cache={'on' if enabled else 'off'}")
+        report("get", timed(requests_svc.get, ids))
+        report("token", timed(users_svc.resolve_token, [(token,)] * args.reads))
+        # правка сразу после открытия карточки: запись не должна оставлять старую версию
+        for request_id in range(1, 101):
+            requests_svc.get(request_id)
+            requests_svc.update(request_id, status="в работе")
+            assert requests_svc.get(request_id).status == "в работе"
+            requests_svc.update(request_id, status="в ожидании")
+        print(f"  metrics  {cache.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Память одной сессии UI: сколько держит main() на экране входа, после входа
+пользователя и администратора, после открытия всех доступных вкладок и после
+выхода. Сессии гоняются без клиента Flet через страницу-заглушку.
+
+    python benchmarks/session_memory.py --sessions 20
+    python benchmarks/session_memory.py --src /tmp/old/src   # другая ревизия, для сравнения
+
+Память считается tracemalloc: прирост после N сессий, делённый на N. Первая
+сессия не в счёт — она платит за кэши SQLAlchemy, passlib и т.п.
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+import flet as ft
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+class Page:
+    """минимум ft.Page, который трогает main()"""
+
+    def __init__(self):
+        self.window = SimpleNamespace()
+        self.controls = []
+        self.overlay = []
+        self.tasks = []
+        self.loop = asyncio.get_running_loop()
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def update(self):
+        pass
+
+    def run_task(self, handler, *args, **kwargs):
+        # как у Flet: можно звать из потоков пулов (живые изменения)
+        future = asyncio.run_coroutine_threadsafe(handler(*args, **kwargs), self.loop)
+        self.tasks.append(asyncio.wrap_future(future, loop=self.loop))
+
+    async def settle(self):
+        # без клиента прокрутка (scroll_to) падает уже после отрисовки — это не мешает
+        while self.tasks:
+            tasks, self.tasks = self.tasks, []
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def walk(control):
+    yield control
+    for attr in ("content", "controls", "tabs"):
+        child = getattr(control, attr, None)
+        for c in child if isinstance(child, list) else [child]:
+            if isinstance(c, ft.BaseControl):
+                yield from walk(c)
+
+
+async def click(page, button):
+    result = button.on_click(SimpleNamespace(control=button))
+    if asyncio.iscoroutine(result):
+        await result
+    await page.settle()
+
+
+async def session(main, username, password, open_tabs, logout):
+    """одна сессия: вход, открытие вкладок, выход; возвращает страницу"""
+    page = Page()
+    await main(page)
+    auth_view = page.controls[-1]
+    if username:
+        login, password_field = [c for c in walk(auth_view) if isinstance(c, ft.TextField)][:2]
+        login.value, password_field.value = username, password
+        await click(page, next(c for c in walk(auth_view) if isinstance(c, ft.Button)))
+    tabs = [c for c in walk(page.controls[-1]) if isinstance(c, ft.Tabs)]
+    if username and open_tabs and tabs and tabs[0].on_change:
+        bar = next(c for c in walk(tabs[0]) if isinstance(c, ft.TabBar))
+        for index, tab in enumerate(bar.tabs):
+            if not tab.disabled:
+                tabs[0].selected_index = index
+                tabs[0].on_change(SimpleNamespace(control=tabs[0]))
+    await page.settle()
+    if username and logout:
+        logout_button = next(c for c in walk(page.controls[-1]) if isinstance(c, ft.IconButton))
+        await click(page, logout_button)
+    page.overlay.clear()  # всплывающие сообщения — не дерево сессии
+    return page
+
+
+async def per_session(main, n, **scenario):
+    await session(main, **scenario)  # прогрев
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    pages = [await session(main, **scenario) for _ in range(n)]
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    top = after.compare_to(before, "filename")[:3]
+    del pages
+    return (used - start) / n, top
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--src", default=SRC, help="каталог src (по умолчанию текущий)")
+    parser.add_argument("--top", action="store_true", help="файлы с наибольшим приростом")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("AUTH_ROUNDS", "4")  # bcrypt не должен занимать весь замер
+    os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'session.db')}"
+    os.environ["API_PORT"] = ""
+    sys.path.insert(0, os.path.abspath(args.src))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import db
+    import main as app
+    import datagen  # после main: сам добавляет в путь текущий src
+    from sqlmodel import Session, select
+
+    db.create_db()
+    datagen.generate(db.engine, users=10, requests=args.requests, comments=args.requests, log=lambda line: None)
+    with Session(db.engine) as s:
+        admin, user = (s.exec(select(db.User.username).where(db.User.role == role)).first()
+                       for role in ("admin", "user"))
+
+    scenarios = [
+        ("экран входа", dict(username=None, open_tabs=False, logout=False)),
+        ("пользователь, вход", dict(username=user, open_tabs=False, logout=False)),
+        ("пользователь, все вкладки", dict(username=user, open_tabs=True, logout=False)),
+        ("админ, вход", dict(username=admin, open_tabs=False, logout=False)),
+        ("админ, все вкладки", dict(username=admin, open_tabs=True, logout=False)),
+        ("админ, вкладки и выход", dict(username=admin, open_tabs=True, logout=True)),
+    ]
+    tracemalloc.start()
+    print(f"{'сценарий':<28} {'КБ/сессию':>10}")
+    for name, scenario in scenarios:
+        scenario["password"] = datagen.PASSWORD
+        size, top = asyncio.run(per_session(app.main, args.sessions, **scenario))
+        print(f"{name:<28} {size / 1024:10.1f}")
+        if args.top:
+            for stat in top:
+                print(f"    {stat}")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Время холодного старта в новом процессе: импорт приложения (src/main.py без
+ft.run), создание схемы на новой базе и проверка уже готовой, первая проверка
+пароля после фонового прогрева passlib/bcrypt. Код возврата 1 — если медиана
+какой-то фазы выше бюджета.
+
+    python benchmarks/startup_time.py --runs 5 --budget-import 2000 --budget-schema 500
+
+Первый экран (first_paint) без клиента Flet не замерить: его пишет само
+приложение в категорию startup панели «Производительность».
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# bcrypt с 4 раундами: в замер первой проверки идёт загрузка passlib, а не сам хеш
+HASH = "$2b$04$sPfCG7YbkjODqbmU2yxT.eW94Wmye9zeI1WuT29Bae.tkVAeCkMbm"
+
+CHILD = f"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {SRC!r})
+import main  # flet, модели, сервисы; ft.run не вызывается
+imported = time.perf_counter()
+import auth, db
+db.create_db()
+schema = time.perf_counter()
+db.create_db()
+schema_again = time.perf_counter()
+main.PREWARM.result()
+prewarmed = time.perf_counter()
+assert auth.verify_password("password123", {HASH!r})
+verified = time.perf_counter()
+print(json.dumps({{
+    "import": (imported - started) * 1000,
+    "schema": (schema - imported) * 1000,
+    "schema_again": (schema_again - schema) * 1000,
+    "prewarm_wait": (prewarmed - schema_again) * 1000,
+    "first_verify": (verified - prewarmed) * 1000,
+}}))
+"""
+
+
+def run_child(db_path):
+    env = dict(os.environ, DB_URL=f"sqlite:///{db_path}", API_PORT="")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-import", type=float, default=2000, help="мс")
+    parser.add_argument("--budget-schema", type=float, default=500, help="мс, новая база")
+    parser.add_argument("--budget-existing", type=float, default=50, help="мс, готовая база")
+    parser.add_argument("--budget-process", type=float, default=4000, help="мс, весь процесс")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    fresh, existing = [], []
+    for i in range(args.runs):
+        path = os.path.join(tmp, f"start{i}.db")
+        fresh.append(run_child(path))      # новая база: create_all и все миграции
+        existing.append(run_child(path))   # та же база, уже актуальная
+
+    def median(runs, key):
+        return statistics.median(r[key] for r in runs)
+
+    checks = [
+        ("import", median(fresh + existing, "import"), args.budget_import),
+        ("schema (новая база)", median(fresh, "schema"), args.budget_schema),
+        ("schema (готовая база)", median(existing, "schema"), args.budget_existing),
+        ("schema (повторно в процессе)", median(existing, "schema_again"), 1),
+        ("ожидание фонового prewarm", median(existing, "prewarm_wait"), None),
+        ("первая проверка пароля", median(existing, "first_verify"), None),
+        ("процесс целиком", median(existing, "process"), args.budget_process),
+    ]
+    ok = True
+    for name, value, budget in checks:
+        over = budget is not None and value > budget
+        ok &= not over
+        limit = f"/ {budget:g}" if budget is not None else ""
+        print(f"{'FAIL' if over else 'ok  '} {name:<30} {value:9.2f} мс {limit}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,87 @@
+"""
+История статусов (src/history.py): цена триггеров на правку заявки и время
+отчёта по срокам из сводок против пересчёта по всей истории событий.
+
+    python benchmarks/status_history.py --requests 50000 --days 180
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text  # noqa: E402
+
+import bulk  # noqa: E402
+import db  # noqa: E402
+import history  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, STATUSES  # noqa: E402
+
+# тот же отчёт, но посчитанный по request_event целиком (окна по заявке)
+FULL_SCAN = f"""
+WITH ev AS (
+    SELECT request_id, at, status,
+           lead(at) OVER (PARTITION BY request_id ORDER BY id) AS next_at,
+           lead(status) OVER (PARTITION BY request_id ORDER BY id) AS next_status
+    FROM {history.EVENT_TABLE}
+)
+SELECT status, avg(next_at - at) * 24, count(*) FROM ev
+WHERE next_status IS NOT NULL AND next_status <> status GROUP BY status
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--updates", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+
+    rnd = random.Random(1)
+    today = date.today()
+    rows = (
+        (i, {"create_at": (today - timedelta(days=rnd.randrange(args.days))).isoformat(),
+             "equipment": f"принтер {i % 300}", "client": f"клиент {i % 900}",
+             "assigned_to": f"мастер {i % 20}", "status": STATUSES[0]})
+        for i in range(args.requests)
+    )
+    start = time.perf_counter()
+    bulk.import_requests(rows, db.engine)
+    print(f"import {args.requests}: {time.perf_counter() - start:.2f}s")
+
+    svc = RequestService(db.engine)
+    ids = rnd.sample(range(1, args.requests + 1), args.updates)
+    for label, values in (("в работу", {"status": STATUSES[1]}),
+                          ("исполнитель", {"assigned_to": "мастер 99"}),
+                          ("выполнено", {"status": STATUSES[2]})):
+        start = time.perf_counter()
+        for request_id in ids:
+            svc.update(request_id, **values)
+        elapsed = (time.perf_counter() - start) / len(ids) * 1000
+        print(f"update {label:<12} {elapsed:.3f}ms/заявка")
+
+    with db.engine.connect() as conn:
+        events = conn.execute(text(f"SELECT count(*) FROM {history.EVENT_TABLE}")).scalar_one()
+        start = time.perf_counter()
+        full = conn.execute(text(FULL_SCAN)).all()
+        scan_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    report = history.report(db.engine)
+    report_ms = (time.perf_counter() - start) * 1000
+    print(f"events={events} report={report_ms:.2f}ms full scan={scan_ms:.1f}ms")
+    print(f"  status_time {report['status_time']}")
+    print(f"  full scan   {[(s, round(h, 1), n) for s, h, n in full]}")
+    print(f"  backlog     {report['backlog']}")
+
+
+if __name__ == "__main__":
+    main()
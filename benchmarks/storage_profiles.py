@@ -0,0 +1,74 @@
+"""
+Задержки чтения и записи для профилей хранилища (storage.PROFILES).
+Для каждого профиля: свежая база, писатель вызывает save_request,
+параллельно несколько читателей делают session.get по случайному id.
+
+    python benchmarks/storage_profiles.py --writes 500 --readers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlmodel import Session  # noqa: E402
+
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 if values else 0.0
+
+
+def run_profile(profile: str, writes: int, readers: int):
+    path = os.path.join(tempfile.mkdtemp(), f"{profile}.db")
+    db.engine = storage.make_engine(f"sqlite:///{path}", profile=profile)
+    db.create_db()
+    for i in range(100):  # чтобы читателям было что читать с первой секунды
+        db.save_request(f"client {i}", "printer", "jam", "seed")
+
+    write_times, read_times = [], []
+    done = threading.Event()
+
+    def reader():
+        rnd = random.Random()
+        while not done.is_set():
+            t0 = time.perf_counter()
+            with Session(db.engine) as session:
+                session.get(db.Request, rnd.randint(1, 100))
+            read_times.append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in pool:
+        t.start()
+    for i in range(writes):
+        t0 = time.perf_counter()
+        db.save_request(f"client {i}", "printer", "jam", "bench")
+        write_times.append(time.perf_counter() - t0)
+    done.set()
+    for t in pool:
+        t.join()
+    db.engine.dispose()
+
+    print(f"{profile:8} write p50={percentile(write_times, 50):6.2f}ms p99={percentile(write_times, 99):6.2f}ms "
+          f"mean={statistics.mean(write_times) * 1000:6.2f}ms | "
+          f"read p50={percentile(read_times, 50):6.2f}ms p99={percentile(read_times, 99):6.2f}ms "
+          f"reads={len(read_times)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--profile", action="append", choices=list(storage.PROFILES),
+                        help="можно несколько раз; по умолчанию все")
+    args = parser.parse_args()
+    for name in args.profile or storage.PROFILES:
+        run_profile(name, args.writes, args.readers)
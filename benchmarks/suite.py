@@ -0,0 +1,193 @@
+"""
+Набор замеров горячих путей на синтетической базе (datagen.py) с отчётом
+в JSON — для сравнения между коммитами.
+
+    python benchmarks/suite.py --preset small --out before.json
+    python benchmarks/suite.py --preset small --out after.json --compare before.json
+
+Замеряются те же вызовы, что делают обработчики UI и API: создание заявки,
+поиск и листание (load_request), подсчёт выполненных (status_complete),
+заявка по id (без кэша и с кэшем), комментарий, регистрация и вход.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import auth  # noqa: E402
+import cache  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import paging  # noqa: E402
+import storage  # noqa: E402
+from services import RequestService, CommentService, UserService  # noqa: E402
+from stats import DONE  # noqa: E402
+
+SEARCH_TERMS = ["принтер", "клиент 1", "замятие", "ноутбук", "перегрев", "сервер", "epson"]
+REGRESSION = 0.20  # p50 хуже базового отчёта больше чем на 20% — регрессия
+
+
+def measure(func, n):
+    func(n)  # прогрев: первый вызов платит за подключение, пересчёт хеша и т.п.
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "n": n,
+        "mean_ms": round(total / n, 4),
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[max(0, int(n * 0.95) - 1)], 4),
+        "p99_ms": round(samples[max(0, int(n * 0.99) - 1)], 4),
+        "ops_per_s": round(n / total * 1000, 1) if total else None,
+    }
+
+
+def cases(engine, masters, sizes, iterations, rnd):
+    requests_svc = RequestService(engine)
+    comments_svc = CommentService(engine)
+    users_svc = UserService(engine)
+    request_count = sizes["requests"]
+
+    def random_id(i):
+        return rnd.randint(1, request_count)
+
+    def search(i):
+        pager = paging.RequestPager(engine, SEARCH_TERMS[i % len(SEARCH_TERMS)], sort=paging.RANK)
+        pager.load_next()
+
+    def scroll(i):
+        # первая страница таблицы просмотра и три догрузки при прокрутке
+        pager = paging.RequestPager(engine, "", sort="create_at", descending=True)
+        for _ in range(4):
+            pager.load_next()
+
+    auth_n = max(3, iterations // 50)  # bcrypt дорогой: меньше повторов
+    # имя: (вызов, повторов[, кэш чтения включён]); по умолчанию кэш как в приложении
+    return {
+        "save_request": (lambda i: requests_svc.create(
+            f"ООО «Клиент {i}»", "Принтер HP LaserJet", "замятие бумаги", "bench", assigned_to=masters[0]
+        ), iterations),
+        "search": (search, iterations),
+        "scroll_pages": (scroll, max(1, iterations // 10)),
+        "status_complete": (lambda i: requests_svc.status_count(DONE), iterations),
+        "get_by_id": (lambda i: requests_svc.get(random_id(i)), iterations, False),
+        # рабочий набор, который помещается в кэш
+        "get_by_id_cached": (lambda i: requests_svc.get(random_id(i) % 50 + 1), iterations, True),
+        "update_status": (lambda i: requests_svc.update(random_id(i), status="в работе"), iterations),
+        "add_comment": (lambda i: comments_svc.add(random_id(i), masters[0], "bench"), iterations),
+        "comment_page": (lambda i: comments_svc.page(random_id(i)), iterations),
+        "register_user": (lambda i: users_svc.register(f"bench{i:06}", datagen.PASSWORD), auth_n),
+        "authenticate_user": (lambda i: users_svc.authenticate(masters[0], datagen.PASSWORD), auth_n),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, threshold):
+    """печать разницы с базовым отчётом; список регрессий"""
+    regressions = []
+    print(f"\nсравнение с {baseline['meta'].get('commit')}:")
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["p50_ms"]:
+            continue
+        delta = result["p50_ms"] / base["p50_ms"] - 1
+        mark = "РЕГРЕССИЯ" if delta > threshold else ""
+        if mark:
+            regressions.append(name)
+        print(f"  {name:<18} {base['p50_ms']:9.3f} -> {result['p50_ms']:9.3f}ms  {delta:+7.1%} {mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", choices=datagen.PRESETS, default="small")
+    parser.add_argument("--db", help="готовая база из datagen.py (копируется, оригинал не меняется)")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--only", nargs="*", help="только эти замеры")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="файл JSON-отчёта (иначе stdout)")
+    parser.add_argument("--compare", help="базовый JSON-отчёт для сравнения")
+    parser.add_argument("--threshold", type=float, default=REGRESSION)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "suite.db")
+    if args.db:
+        shutil.copy(args.db, path)
+    db.engine = storage.make_engine(f"sqlite:///{path}")
+    db.create_db()
+    if args.db:
+        with sqlite3.connect(path) as conn:
+            sizes = {name: conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+                     for name, table in (("users", "user"), ("requests", "request"), ("comments", "comment"))}
+            masters = [r[0] for r in conn.execute(
+                "SELECT assigned_to FROM request_named WHERE assigned_to <> '' GROUP BY assigned_to LIMIT 100"
+            )]
+    else:
+        sizes = datagen.PRESETS[args.preset]
+        masters = datagen.generate(db.engine, **sizes, seed=args.seed, log=lambda line: print(line, file=sys.stderr))
+
+    rnd = random.Random(args.seed)
+    results = {}
+    for name, (func, n, *cached) in cases(db.engine, masters, sizes, args.iterations, rnd).items():
+        if args.only and name not in args.only:
+            continue
+        cache.set_enabled(cached[0] if cached else cache.ENABLED)
+        results[name] = measure(func, n)
+        print(f"{name:<18} p50={results[name]['p50_ms']:9.3f}ms p99={results[name]['p99_ms']:9.3f}ms",
+              file=sys.stderr)
+    cache.set_enabled(cache.ENABLED)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "profile": os.environ.get("DB_PROFILE", storage.DEFAULT_PROFILE),
+            "auth_rounds": auth.ROUNDS,
+            "dataset": {"preset": None if args.db else args.preset, **sizes, "seed": args.seed},
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
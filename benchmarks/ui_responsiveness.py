@@ -0,0 +1,70 @@
+"""
+Отзывчивость цикла событий во время одновременных входов.
+Тикер каждые 10 мс замеряет, насколько он опоздал, пока идут N проверок
+пароля bcrypt: сначала прямо в цикле (как делали синхронные обработчики),
+затем через workers.run_hash. Код возврата 1, если через пул задержка
+цикла превысила --budget-ms.
+
+    python benchmarks/ui_responsiveness.py --logins 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import auth  # noqa: E402
+import workers  # noqa: E402
+
+TICK = 0.01
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - t0 - TICK)
+
+
+async def measure(logins: int, password_hash: str, offload: bool):
+    lags, stop = [], asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(TICK * 3)
+
+    async def login():
+        if offload:
+            return await workers.run_hash(auth.verify_password, "password123", password_hash)
+        await asyncio.sleep(0)  # обработчик начался, дальше — блокирующий вызов
+        return auth.verify_password("password123", password_hash)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await tick
+    assert all(results)
+    lags.sort()
+    return elapsed, lags[-1] * 1000, lags[int(len(lags) * 0.99) - 1] * 1000 if lags else 0.0
+
+
+async def main(logins: int, budget_ms: float):
+    password_hash = auth.hash_password("password123")
+    ok = True
+    for offload in (False, True):
+        elapsed, worst, p99 = await measure(logins, password_hash, offload)
+        mode = "worker pool" if offload else "inline     "
+        print(f"{mode} logins={logins} total={elapsed * 1000:7.1f}ms "
+              f"loop lag max={worst:7.1f}ms p99={p99:7.1f}ms")
+        if offload:
+            ok = worst <= budget_ms
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.logins, args.budget_ms)) else 1)
@@ -0,0 +1,271 @@
+"""
+Локальный HTTP/JSON API поверх сервисов — для других инструментов и интерфейсов.
+
+    python src/api.py --port 8550
+
+Все запросы, кроме входа и регистрации, с заголовком Authorization: Bearer <token>.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import auth
+import lookups
+import perf
+from services import RequestService, CommentService, UserService, UPDATED
+
+# ===================== HTTP API =====================
+DEFAULT_HOST = "127.0.0.1"  # только локально: API без TLS
+MAX_BODY = 1024 * 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _plain(obj):
+    """модель / строка запроса / словарь -> то, что понимает json"""
+    if hasattr(obj, "model_dump"):
+        # имена из справочников (client, assigned_to, ...) — не поля модели, а свойства
+        names = {name: getattr(obj, name) for name in lookups.NAMES if hasattr(type(obj), name)}
+        obj = {**obj.model_dump(), **names}
+    elif hasattr(obj, "_asdict"):
+        obj = obj._asdict()
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items() if k != "password_hash"}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return obj
+
+
+class Api:
+    """маршруты API; не зависит от http.server, поэтому легко вызывается напрямую"""
+
+    def __init__(self, engine):
+        self.requests = RequestService(engine)
+        self.comments = CommentService(engine)
+        self.users = UserService(engine)
+        self.routes = [
+            ("POST", r"/api/login", self.login, None),
+            ("POST", r"/api/logout", self.logout, "user"),
+            ("POST", r"/api/users", self.register, None),
+            ("GET", r"/api/requests", self.list_requests, "admin"),
+            ("POST", r"/api/requests", self.create_request, "user"),
+            ("POST", r"/api/requests/bulk", self.bulk_update, "admin"),
+            ("GET", r"/api/requests/(\d+)", self.get_request, "admin"),
+            ("PATCH", r"/api/requests/(\d+)", self.update_request, "admin"),
+            ("GET", r"/api/requests/(\d+)/history", self.request_history, "admin"),
+            ("POST", r"/api/requests/(\d+)/restore", self.restore_request, "admin"),
+            ("POST", r"/api/requests/(\d+)/comments", self.add_comment, "user"),
+            ("GET", r"/api/stats", self.stats, "admin"),
+            ("GET", r"/api/sla", self.sla, "admin"),
+            ("GET", r"/api/perf", self.perf, "admin"),
+        ]
+
+    def dispatch(self, method, path, query, body, token):
+        """(статус, тело ответа)"""
+        for route_method, pattern, handler, role in self.routes:
+            match = re.fullmatch(pattern, path)
+            if not match or route_method != method:
+                continue
+            user = None
+            if role:
+                user = self.users.resolve_token(token)
+                if not user:
+                    raise ApiError(401, "Нужен вход")
+                if role == "admin" and user.role != "admin":
+                    raise ApiError(403, "Только для администратора")
+            args = [int(g) for g in match.groups()]
+            with perf.timer("api", f"{method} {pattern}"):
+                return handler(*args, query=query, body=body, user=user, token=token)
+        raise ApiError(404, "Нет такого метода")
+
+    # ---------- auth ----------
+    def login(self, query, body, user, token):
+        result = self.users.login(body.get("username"), body.get("password"))
+        if not result:
+            raise ApiError(401, "Неверный логин или пароль")
+        user, token = result
+        return 200, {"token": token, "user": _plain(user)}
+
+    def logout(self, query, body, user, token):
+        self.users.logout(token)
+        return 200, {}
+
+    def register(self, query, body, user, token):
+        try:
+            self.users.register(body.get("username"), body.get("password"), body.get("full_name") or "")
+        except auth.AuthError as ex:
+            raise ApiError(409, str(ex))
+        return 201, {}
+
+    # ---------- requests ----------
+    def list_requests(self, query, body, user, token):
+        rows = self.requests.list(
+            query.get("q", ""),
+            sort=query.get("sort"),
+            descending=query.get("desc") in ("1", "true"),
+            limit=min(int(query.get("limit", 50)), 500),
+            with_archive=query.get("archive") in ("1", "true"),
+        )
+        return 200, {"items": _plain(rows)}
+
+    def create_request(self, query, body, user, token):
+        fields = {k: body.get(k) for k in ("client", "equipment", "fault_type", "description")}
+        number = self.requests.create(
+            **fields,
+            status=body.get("status") or "в ожидании",
+            assigned_to=body.get("assigned_to") or "",
+            auto_assign=True,
+        )
+        return 201, {"number": number}
+
+    def bulk_update(self, query, body, user, token):
+        ids = body.get("ids")
+        if not isinstance(ids, list) or not ids:
+            raise ApiError(400, "Ожидается непустой список ids")
+        fields = {k: body[k] for k in ("status", "assigned_to") if k in body}
+        results = self.requests.bulk_update(ids, **fields)
+        return 200, {
+            "updated": sum(r == UPDATED for r in results.values()),
+            "results": [{"id": request_id, "result": r} for request_id, r in results.items()],
+        }
+
+    def get_request(self, request_id, query, body, user, token):
+        request = self.requests.get(request_id)
+        if request:
+            return 200, _plain(request)
+        archived = self.requests.get_archived(request_id)
+        if not archived:
+            raise ApiError(404, f"Заявка с ID {request_id} не найдена")
+        return 200, _plain(archived)
+
+    def restore_request(self, request_id, query, body, user, token):
+        number = self.requests.restore(request_id)
+        if number is None:
+            raise ApiError(404, f"Заявки с ID {request_id} нет в архиве")
+        return 200, {"number": number}
+
+    def update_request(self, request_id, query, body, user, token):
+        # null или число в имени справочника дошли бы до lookups.to_ids как ключ
+        wrong = [k for k, v in body.items() if not isinstance(v, str)]
+        if wrong:
+            raise ApiError(400, f"Ожидаются строки: {', '.join(wrong)}")
+        number = self.requests.update(request_id, **body)
+        if number is None:
+            raise ApiError(404, f"Заявка с ID {request_id} не найдена")
+        return 200, {"number": number}
+
+    def request_history(self, request_id, query, body, user, token):
+        return 200, {"items": [
+            {"at": at, "status": status, "assigned_to": assigned_to}
+            for at, status, assigned_to in self.requests.history(request_id)
+        ]}
+
+    def add_comment(self, request_id, query, body, user, token):
+        comment_id = self.comments.add(request_id, body.get("author") or user.username, body.get("text"))
+        if comment_id is None:
+            raise ApiError(404, f"Заявка с ID {request_id} не найдена")
+        return 201, {"id": comment_id}
+
+    def stats(self, query, body, user, token):
+        snap = self.requests.stats()
+        snap["cache"] = self.requests.cache_metrics()
+        return 200, _plain(snap)
+
+    def sla(self, query, body, user, token):
+        return 200, _plain(self.requests.sla())
+
+    def perf(self, query, body, user, token):
+        return 200, perf.snapshot(top=int(query.get("top", 20)))
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive для клиентов с постоянным соединением
+
+        def setup(self):
+            super().setup()
+            # заголовки и тело уходят отдельными записями: без NODELAY каждый ответ ждёт ~40 мс
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def _handle(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            header = self.headers.get("Authorization", "")
+            token = header[7:] if header.startswith("Bearer ") else None
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY:
+                    raise ApiError(413, "Слишком большое тело запроса")
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                if not isinstance(body, dict):
+                    raise ApiError(400, "Ожидается JSON-объект")
+                status, payload = api.dispatch(self.command, url.path, query, body, token)
+            except ApiError as ex:
+                status, payload = ex.status, {"error": str(ex)}
+            except (ValueError, TypeError) as ex:
+                status, payload = 400, {"error": str(ex)}
+            except Exception as ex:
+                status, payload = 500, {"error": f"Ошибка: {ex}"}
+            data = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = _handle
+
+        def log_message(self, format, *args):
+            pass  # без построчного лога в stderr на каждый запрос
+
+    return Handler
+
+
+def make_server(engine, host=DEFAULT_HOST, port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(Api(engine)))
+    server.daemon_threads = True
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_in_background(engine, host=DEFAULT_HOST, port=None):
+    """API в фоновом потоке процесса приложения; повторный вызов ничего не делает"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            port = int(port if port is not None else os.environ.get("API_PORT", 0))
+            _server = make_server(engine, host, port)
+            threading.Thread(target=_server.serve_forever, name="api", daemon=True).start()
+    return _server
+
+
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="HTTP API заявок")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", 8550)))
+    args = parser.parse_args(argv)
+    db.create_db()
+    server = make_server(db.engine, args.host, args.port)
+    print(f"API: http://{args.host}:{server.server_port}/api")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
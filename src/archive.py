@@ -0,0 +1,288 @@
+"""
+Перенос выполненных заявок в архив и обратно.
+
+    python src/archive.py run --days 90 --batch 500
+    python src/archive.py restore 120 121
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import text
+
+import cache
+import live
+import lookups
+import paging
+import search
+import stats
+import storage
+from stats import DONE
+
+# ===================== ARCHIVE =====================
+# Заявки, выполненные больше ARCHIVE_DAYS дней назад, вместе с комментариями
+# переезжают пачками в файл архива (схема archive, подключается к каждому
+# соединению в storage.make_engine). Живая таблица request остаётся маленькой,
+# а поиск с галочкой «с архивом» читает обе (см. paging.RequestPager).
+#
+# В режиме WAL коммит, затронувший два файла, не атомарен, поэтому каждая
+# пачка — две транзакции: копия в архив, затем удаление из живой таблицы
+# только того, что уже лежит в архиве. После сбоя между ними строка есть
+# в обоих файлах, и следующий запуск просто доделывает удаление.
+# Восстановление — так же, в обратную сторону.
+#
+# История статусов (request_event) остаётся в основной базе. Счётчики
+# статистики описывают живую таблицу; число ушедших в архив ведётся в
+# stat_archived и добавляется к status_count.
+#
+# В основной базе клиент, оборудование, исполнитель и автор — id
+# справочников (lookups.py), а в архиве — сами имена: файл архива читается
+# без основной базы. В архив строки берутся из представлений с именами, при
+# возврате имена снова переводятся в id.
+ARCHIVE = storage.ARCHIVE
+ARCHIVE_DAYS = int(os.environ.get("ARCHIVE_DAYS", 90))
+BATCH = 500
+VERSION = 1
+
+REQUEST_COLUMNS = "id, number, create_at, equipment, fault_type, description, client, status, assigned_to"
+COMMENT_COLUMNS = "id, request_id, author, text, created_at"
+
+TABLES = {
+    "request": "id INTEGER PRIMARY KEY, number INTEGER NOT NULL, create_at DATE NOT NULL, "
+               "equipment VARCHAR NOT NULL, fault_type VARCHAR NOT NULL, description VARCHAR NOT NULL, "
+               "client VARCHAR NOT NULL, status VARCHAR NOT NULL, assigned_to VARCHAR NOT NULL, "
+               "archived_at REAL NOT NULL",
+    # id комментария в основной базе может освободиться и достаться другому,
+    # поэтому ключ — пара (заявка, id)
+    "comment": "id INTEGER NOT NULL, request_id INTEGER NOT NULL, author VARCHAR NOT NULL, "
+               "text VARCHAR NOT NULL, created_at DATE NOT NULL, PRIMARY KEY (request_id, id)",
+}
+
+
+def enabled(engine) -> bool:
+    """есть ли у базы engine файл архива (без соединения)"""
+    return storage.archive_path(str(engine.url)) is not None
+
+
+def available(conn) -> bool:
+    """подключён ли архив (у базы в памяти его нет)"""
+    return any(row[1] == ARCHIVE for row in conn.execute(text("PRAGMA database_list")))
+
+
+def _require(conn):
+    if not available(conn):
+        raise ValueError("Архив недоступен для базы в памяти")
+
+
+def create_archive(engine):
+    """таблицы, FTS и индексы в файле архива; версия — в его PRAGMA user_version"""
+    with engine.connect() as conn:
+        if not available(conn):
+            return
+        if conn.execute(text(f"PRAGMA {ARCHIVE}.user_version")).scalar_one() >= VERSION:
+            return
+    with engine.begin() as conn:
+        for name, columns in TABLES.items():
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {ARCHIVE}.{name} ({columns})"))
+        search.create_index(conn, ARCHIVE)
+        paging.create_indexes(conn, ARCHIVE)
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {ARCHIVE}.ix_request_number ON request (number)"))
+        conn.execute(text(f"PRAGMA {ARCHIVE}.user_version = {VERSION}"))
+
+
+def _ids(ids):
+    # список id прямо в тексте запроса: это целые числа из самой базы
+    return ", ".join(str(int(i)) for i in ids)
+
+
+def _to_main(columns, alias):
+    """(колонки основной базы, значения из строк архива alias): имена -> id справочников"""
+    columns = columns.split(", ")
+    return (
+        ", ".join(lookups.key(c) for c in columns),
+        ", ".join(lookups.id_sql(c, f"{alias}.{c}") if c in lookups.NAMES else f"{alias}.{c}" for c in columns),
+    )
+
+
+def _cleanup(conn):
+    """копии заявок, которые после копирования снова открыли: живая строка главнее"""
+    reopened = f"SELECT id FROM main.request WHERE status <> '{DONE}'"
+    conn.execute(text(f"DELETE FROM {ARCHIVE}.comment WHERE request_id IN ({reopened})"))
+    conn.execute(text(f"DELETE FROM {ARCHIVE}.request WHERE id IN ({reopened})"))
+
+
+def _copy(conn, ids):
+    """транзакция 1: заявки пачки и их комментарии — в архив (повтор ничего не дублирует)"""
+    conn.execute(text(
+        f"INSERT INTO {ARCHIVE}.request ({REQUEST_COLUMNS}, archived_at) "
+        f"SELECT {REQUEST_COLUMNS}, julianday('now') FROM main.{lookups.REQUEST_VIEW} "
+        f"WHERE id IN ({_ids(ids)}) AND id NOT IN (SELECT id FROM {ARCHIVE}.request)"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {ARCHIVE}.comment ({COMMENT_COLUMNS}) "
+        f"SELECT {COMMENT_COLUMNS} FROM main.{lookups.COMMENT_VIEW} c WHERE c.request_id IN ({_ids(ids)}) "
+        f"AND NOT EXISTS (SELECT 1 FROM {ARCHIVE}.comment a WHERE a.request_id = c.request_id AND a.id = c.id)"
+    ))
+
+
+def _drop(conn, ids) -> list:
+    """
+    транзакция 2: удаление из живой таблицы того, что уже в архиве. Заявку,
+    к которой успели дописать комментарий, не трогаем — её доделает следующий запуск.
+    """
+    deleted = [row[0] for row in conn.execute(text(
+        f"DELETE FROM main.request WHERE id IN ({_ids(ids)}) AND status = '{DONE}' "
+        f"AND id IN (SELECT id FROM {ARCHIVE}.request) "
+        f"AND NOT EXISTS (SELECT 1 FROM main.comment c WHERE c.request_id = request.id "
+        f"AND NOT EXISTS (SELECT 1 FROM {ARCHIVE}.comment a WHERE a.request_id = c.request_id AND a.id = c.id)) "
+        "RETURNING id"
+    ))]
+    if deleted:
+        stats.add_archived(conn, DONE, len(deleted))
+    return deleted
+
+
+def archive_closed(engine, days: int = ARCHIVE_DAYS, batch: int = BATCH, log=None) -> int:
+    """
+    перенос выполненных больше days дней назад; возвращает число перенесённых.
+    Последнюю по id заявку не переносим: иначе SQLite отдаст её id новой заявке.
+    """
+    log = log or (lambda line: None)
+    with engine.begin() as conn:
+        _require(conn)
+        _cleanup(conn)
+
+    moved, last = 0, 0
+    while True:
+        with engine.connect() as conn:
+            # ключ по id: выполненные недавно, но с меньшим id, не перечитываются каждой пачкой
+            ids = [row[0] for row in conn.execute(text(
+                "SELECT r.id FROM request r JOIN request_clock c ON c.request_id = r.id "
+                f"WHERE r.status = '{DONE}' AND r.id > :last "
+                "AND c.status_since < julianday('now') - :days "
+                "AND r.id < (SELECT max(id) FROM request) ORDER BY r.id LIMIT :batch"
+            ), {"last": last, "days": days, "batch": batch})]
+        if not ids:
+            break
+        last = ids[-1]
+        with engine.begin() as conn:
+            _copy(conn, ids)
+        with engine.begin() as conn:
+            deleted = _drop(conn, ids)
+        cache.requests.invalidate(*(cache.request_key(engine, i) for i in deleted))
+        moved += len(deleted)
+        log(f"в архиве {moved}")
+    if moved:
+        live.broker.publish(engine, live.reload())
+    return moved
+
+
+def restore(engine, ids) -> list:
+    """заявки из архива обратно в живую таблицу вместе с комментариями; восстановленные id"""
+    ids = list(ids)
+    if not ids:
+        return []
+    with engine.begin() as conn:
+        _require(conn)
+        last_event = conn.execute(text("SELECT coalesce(max(id), 0) FROM request_event")).scalar_one()
+        # имена из архива — в справочники, если их там нет
+        for column, table, key in (
+            ("equipment", "request", "id"), ("client", "request", "id"),
+            ("assigned_to", "request", "id"), ("author", "comment", "request_id"),
+        ):
+            names = f"SELECT DISTINCT {column} FROM {ARCHIVE}.{table} WHERE {key} IN ({_ids(ids)})"
+            lookups.ensure(conn, column, names)
+        columns, values = _to_main(REQUEST_COLUMNS, "a")
+        restored = [tuple(row) for row in conn.execute(text(
+            f"INSERT INTO main.request ({columns}) "
+            f"SELECT {values} FROM {ARCHIVE}.request a "
+            f"WHERE a.id IN ({_ids(ids)}) AND a.id NOT IN (SELECT id FROM main.request) "
+            "RETURNING id, status"
+        ))]
+        if restored:
+            restored_ids = _ids(r[0] for r in restored)
+            # комментарий, чей id в основной базе уже занят другим, получает новый id
+            columns, values = _to_main(COMMENT_COLUMNS, "a")
+            conn.execute(text(
+                f"INSERT INTO main.comment ({columns}) "
+                f"SELECT {values} FROM {ARCHIVE}.comment a WHERE a.request_id IN ({restored_ids}) "
+                "AND a.id NOT IN (SELECT id FROM main.comment)"
+            ))
+            columns, values = _to_main("request_id, author, text, created_at", "a")
+            conn.execute(text(
+                f"INSERT INTO main.comment ({columns}) "
+                f"SELECT {values} FROM {ARCHIVE}.comment a "
+                f"WHERE a.request_id IN ({restored_ids}) "
+                "AND EXISTS (SELECT 1 FROM main.comment c WHERE c.id = a.id AND c.request_id <> a.request_id)"
+            ))
+            # триггеры вставки считают заявку новой: убираем лишнее событие
+            # истории и «выполнено сегодня» — история у заявки уже есть
+            conn.execute(text(
+                f"DELETE FROM request_event WHERE id > :last AND request_id IN ({restored_ids})"
+            ), {"last": last_event})
+            done = sum(1 for _, status in restored if status == DONE)
+            conn.execute(text(
+                "UPDATE stat_day SET completed = completed - :n WHERE day = date('now', 'localtime')"
+            ), {"n": done})
+            for status in {status for _, status in restored}:
+                stats.add_archived(conn, status, -sum(1 for _, s in restored if s == status))
+    if not restored:
+        return []
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {ARCHIVE}.comment WHERE request_id IN ({restored_ids})"))
+        conn.execute(text(f"DELETE FROM {ARCHIVE}.request WHERE id IN ({restored_ids})"))
+    cache.requests.invalidate(*(cache.request_key(engine, r[0]) for r in restored))
+    live.broker.publish(engine, live.reload())
+    return [r[0] for r in restored]
+
+
+def get(engine, request_id):
+    """заявка из архива: {колонка: значение} или None"""
+    with engine.connect() as conn:
+        if not available(conn):
+            return None
+        row = conn.execute(text(
+            f"SELECT {REQUEST_COLUMNS}, datetime(archived_at, 'localtime') AS archived_at "
+            f"FROM {ARCHIVE}.request WHERE id = :id"
+        ), {"id": request_id}).first()
+    return dict(row._mapping) if row else None
+
+
+def size(engine) -> dict:
+    """число заявок и комментариев в архиве"""
+    with engine.connect() as conn:
+        if not available(conn):
+            return {"requests": 0, "comments": 0}
+        return {
+            "requests": conn.execute(text(f"SELECT count(*) FROM {ARCHIVE}.request")).scalar_one(),
+            "comments": conn.execute(text(f"SELECT count(*) FROM {ARCHIVE}.comment")).scalar_one(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Архив выполненных заявок")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="перенести выполненные давнее --days дней")
+    run.add_argument("--days", type=int, default=ARCHIVE_DAYS)
+    run.add_argument("--batch", type=int, default=BATCH)
+    back = sub.add_parser("restore", help="вернуть заявки из архива по id")
+    back.add_argument("ids", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    import db  # engine и схема по DB_URL / DB_PROFILE
+    db.create_db()
+    if not enabled(db.engine):
+        print("Архив недоступен для базы в памяти", file=sys.stderr)
+        return 1
+    if args.command == "run":
+        moved = archive_closed(db.engine, args.days, args.batch, log=lambda line: print(line, file=sys.stderr))
+        print(f"Перенесено в архив: {moved}")
+    else:
+        restored = restore(db.engine, args.ids)
+        missing = sorted(set(args.ids) - set(restored))
+        print(f"Восстановлено: {len(restored)}" + (f", нет в архиве: {missing}" if missing else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from sqlalchemy import text
+
+import live
+import lookups
+from stats import DONE
+
+# ===================== AUTO ASSIGNMENT =====================
+# Исполнитель для новой заявки без исполнителя. Исполнители — активные
+# пользователи не-админы. Сохранённый индекс нагрузки — stat_assignee
+# (открытые заявки по исполнителю, ведётся триггерами при любой записи,
+# см. stats.py); в памяти — его копия с кучей по нагрузке, так что
+# наименее загруженный находится за O(log n), без скана request.
+#
+# Копия в памяти обновляется по живым изменениям (live.py) на месте: для
+# этого она помнит исполнителя каждой открытой заявки (в событии правки есть
+# только новые значения). Импорт и архив (reload) помечают копию устаревшей,
+# и перед следующим выбором она перечитывается из базы. Раз в REFRESH_SECONDS
+# перечитывается в любом случае — так видны новые и отключённые пользователи
+# и записи из других процессов.
+#
+# Стратегии подключаются декоратором @strategy; по умолчанию — ASSIGN_STRATEGY.
+ASSIGN_STRATEGY = os.environ.get("ASSIGN_STRATEGY", "least_loaded")
+REFRESH_SECONDS = 60
+SPECIALISTS = 3  # сколько самых опытных по оборудованию рассматривает specialty
+SPECIALTY_SLACK = 5  # насколько опытный может быть загруженнее самого свободного
+
+STRATEGIES = {}
+
+
+def strategy(name):
+    """регистрация стратегии: fn(index, equipment) -> исполнитель или None"""
+    def register(fn):
+        STRATEGIES[name] = fn
+        return fn
+    return register
+
+
+class LoadIndex:
+    """открытые заявки по исполнителям одной базы"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.RLock()
+        self._load = {}       # исполнитель -> открытых заявок
+        self._open = {}       # id открытой заявки -> исполнитель
+        self._heap = []       # (нагрузка, исполнитель); устаревшие записи пропускаются
+        self._names = []      # исполнители по алфавиту — для очереди по кругу
+        self._last = None     # кому досталась предыдущая заявка по кругу
+        self._reserved = {}   # выбран, а заявка ещё не сохранена: её вставку не считаем дважды
+        self._specialists = {}  # оборудование -> (время, [исполнители по опыту])
+        self._dirty = True
+        self._loaded_at = 0.0
+        self.refreshes = 0
+        self._subscription = live.broker.subscribe(engine, self._on_change)
+
+    # ---------- синхронизация ----------
+    def _on_change(self):
+        # зовётся из потока писателя сразу после коммита
+        with self._lock:
+            for event in self._subscription.drain():
+                if event["op"] == live.RELOAD:
+                    self._dirty = True
+                elif event["op"] == live.INSERT:
+                    row = event["row"]
+                    if row.get("status") != DONE:
+                        self._open[event["id"]] = row.get("assigned_to")
+                        self._opened(row.get("assigned_to"))
+                else:
+                    self._changed(event["id"], event["fields"])
+
+    def _opened(self, name):
+        if name not in self._load:
+            return
+        if self._reserved.get(name):
+            self._reserved[name] -= 1  # уже учтена при выборе
+        else:
+            self._add(name, 1)
+
+    def _changed(self, request_id, fields):
+        if "status" not in fields and "assigned_to" not in fields:
+            return
+        was_open = request_id in self._open
+        old = self._open.pop(request_id, None)
+        is_open = fields["status"] != DONE if "status" in fields else was_open
+        if not is_open:
+            new = None
+        elif "assigned_to" in fields:
+            new = fields["assigned_to"]
+        elif was_open:
+            new = old
+        else:
+            self._dirty = True  # открыли заново, а исполнителя в событии нет
+            return
+        if is_open:
+            self._open[request_id] = new
+        if was_open and old in self._load and (not is_open or new != old):
+            self._add(old, -1)
+        if is_open and new in self._load and (not was_open or new != old):
+            self._add(new, 1)
+
+    def _add(self, name, delta):
+        self._load[name] += delta
+        heapq.heappush(self._heap, (self._load[name], name))
+        if len(self._heap) > 2 * len(self._load) + 64:
+            self._heapify()  # устаревших записей накопилось больше живых
+
+    def _heapify(self):
+        self._heap = [(load, name) for name, load in self._load.items()]
+        heapq.heapify(self._heap)
+
+    def refresh(self):
+        """перечитать исполнителей, их нагрузку (stat_assignee) и открытые заявки"""
+        # чтение под блокировкой: событие посреди чтения не потеряет пометку _dirty
+        with self._lock, self.engine.connect() as conn:
+            rows = conn.execute(text(
+                # нагрузка ведётся по справочнику имён: пользователь находит в нём себя по логину
+                'SELECT u.username, coalesce(s.open_count, 0) FROM "user" u '
+                "LEFT JOIN person p ON p.name = u.username "
+                "LEFT JOIN stat_assignee s ON s.assignee_id = p.id "
+                "WHERE u.is_active AND u.role <> 'admin'"
+            )).all()
+            # открытых немного: проход по индексу статуса, а не по всем заявкам
+            self._open = dict(conn.execute(text(
+                f"SELECT r.id, {lookups.name_sql('assigned_to', 'r')} FROM request r WHERE r.status <> :done"
+            ), {"done": DONE}).all())
+            self._load = {name: load + self._reserved.get(name, 0) for name, load in rows}
+            self._reserved = {name: n for name, n in self._reserved.items() if name in self._load}
+            self._heapify()
+            self._names = sorted(self._load)
+            self._dirty = False
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def _fresh(self):
+        if self._dirty or time.monotonic() - self._loaded_at > REFRESH_SECONDS:
+            self.refresh()
+
+    def invalidate(self):
+        with self._lock:
+            self._dirty = True
+
+    # ---------- выбор ----------
+    def least_loaded(self, among=None):
+        """наименее загруженный (при равенстве — по алфавиту); among — только из этих"""
+        if among is not None:
+            loads = [(self._load[name], name) for name in among if name in self._load]
+            return min(loads)[1] if loads else None
+        while self._heap:
+            load, name = self._heap[0]
+            if self._load.get(name) == load:
+                return name
+            heapq.heappop(self._heap)
+        return None
+
+    def next_in_turn(self):
+        if not self._names:
+            return None
+        i = bisect_right(self._names, self._last) if self._last is not None else 0
+        self._last = self._names[i % len(self._names)]
+        return self._last
+
+    def specialists(self, equipment):
+        """исполнители, чаще других бравшие заявки на это оборудование"""
+        cached = self._specialists.get(equipment)
+        if cached and time.monotonic() - cached[0] < REFRESH_SECONDS:
+            return cached[1]
+        with self.engine.connect() as conn:
+            names = [row[0] for row in conn.execute(text(
+                f"SELECT {lookups.name_sql('assigned_to', 'r')} FROM request r "
+                f"WHERE r.equipment_id = {lookups.id_sql('equipment', ':e')} AND r.assignee_id <> :none "
+                "GROUP BY r.assignee_id ORDER BY count(*) DESC"
+            ), {"e": equipment, "none": lookups.NO_ASSIGNEE})]
+        names = [name for name in names if name in self._load][:SPECIALISTS]
+        self._specialists[equipment] = (time.monotonic(), names)
+        return names
+
+    def pick(self, equipment="", name=None):
+        """
+        исполнитель для новой заявки по стратегии name (None — ASSIGN_STRATEGY)
+        или None, если исполнителей нет. Выбранному сразу +1: параллельные
+        заявки не достаются одному и тому же.
+        """
+        choose = STRATEGIES.get(name or ASSIGN_STRATEGY)
+        if choose is None:
+            raise ValueError(f"Неизвестная стратегия назначения: {name or ASSIGN_STRATEGY} "
+                             f"(есть: {', '.join(STRATEGIES)})")
+        with self._lock:
+            self._fresh()
+            assignee = choose(self, equipment)
+            if assignee is not None:
+                self._add(assignee, 1)
+                self._reserved[assignee] = self._reserved.get(assignee, 0) + 1
+            return assignee
+
+    def release(self, name):
+        """выбранный исполнитель не понадобился (заявка не сохранилась)"""
+        with self._lock:
+            if self._reserved.get(name):
+                self._reserved[name] -= 1
+                self._add(name, -1)
+
+    def load(self, name) -> int:
+        return self._load.get(name, 0)
+
+    def loads(self) -> dict:
+        with self._lock:
+            self._fresh()
+            return dict(self._load)
+
+
+@strategy("least_loaded")
+def least_loaded(index, equipment):
+    return index.least_loaded()
+
+
+@strategy("round_robin")
+def round_robin(index, equipment):
+    return index.next_in_turn()
+
+
+@strategy("specialty")
+def specialty(index, equipment):
+    """
+    наименее загруженный из самых опытных по этому оборудованию, если он не
+    намного загруженнее самого свободного; иначе — самый свободный
+    """
+    idle = index.least_loaded()
+    expert = equipment and index.least_loaded(among=index.specialists(equipment))
+    if expert and index.load(expert) - index.load(idle) <= SPECIALTY_SLACK:
+        return expert
+    return idle
+
+
+_indexes = {}  # engine.url -> LoadIndex
+_indexes_lock = threading.Lock()
+
+
+def index(engine) -> LoadIndex:
+    """индекс нагрузки базы engine (один на процесс)"""
+    with _indexes_lock:
+        if engine.url not in _indexes:
+            _indexes[engine.url] = LoadIndex(engine)
+        return _indexes[engine.url]
+
+
+def invalidate(engine):
+    """исполнители поменялись (регистрация, роль): перечитать перед следующим выбором"""
+    with _indexes_lock:
+        existing = _indexes.get(engine.url)
+    if existing is not None:
+        existing.invalidate()
@@ -0,0 +1,154 @@
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+import cache
+from db import User
+
+# ===================== AUTH =====================
+# Схема и стоимость хеширования задаются через AUTH_SCHEME / AUTH_ROUNDS.
+# Хеш, посчитанный со старыми настройками, пересчитывается при ближайшем
+# успешном входе. После входа выдаётся короткоживущий токен: клиент,
+# переподключившийся с ним, входит без повторной проверки bcrypt.
+# passlib загружается при первом обращении к контексту (или в prewarm() на
+# старте приложения), а не при импорте модуля.
+SCHEME = os.environ.get("AUTH_SCHEME", "bcrypt")
+ROUNDS = int(os.environ.get("AUTH_ROUNDS", 12))
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 30 * 60))  # сек
+
+
+class AuthError(Exception):
+    pass
+
+
+def make_context(scheme: str = SCHEME, rounds: int = ROUNDS):
+    """контекст хеширования; старые bcrypt-хеши остаются проверяемыми при смене схемы"""
+    from passlib.context import CryptContext
+
+    schemes = [scheme] + (["bcrypt"] if scheme != "bcrypt" else [])
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        **{
+            f"{scheme}__rounds": rounds,
+            # хеш с другим числом раундов считается устаревшим в обе стороны
+            f"{scheme}__min_desired_rounds": rounds,
+            f"{scheme}__max_desired_rounds": rounds,
+        },
+    )
+
+
+pwd_context = None  # make_context() при первом обращении; можно подменить своим
+_context_lock = threading.Lock()
+
+
+def context():
+    global pwd_context
+    if pwd_context is None:
+        with _context_lock:
+            if pwd_context is None:
+                pwd_context = make_context()
+    return pwd_context
+
+
+def prewarm():
+    """контекст и backend схемы (у bcrypt — с самопроверкой) заранее, до первого входа"""
+    handler = context().handler()
+    if hasattr(handler, "get_backend"):
+        handler.get_backend()
+
+
+def hash_password(password: str) -> str:
+    return context().hash(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return context().verify(password, password_hash)
+
+
+def register_user(engine, username, password, full_name=""):
+    """новый пользователь; логин проверяется уникальным индексом, без отдельного SELECT"""
+    with Session(engine) as db:
+        db.add(User(
+            username=username,
+            password_hash=hash_password(password),
+            full_name=full_name
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            raise AuthError("Пользователь уже существует")
+
+
+def authenticate_user(engine, username, password):
+    """пользователь по логину и паролю или None; устаревший хеш пересчитывается"""
+    username = username.lower()
+
+    def load():
+        with Session(engine) as db:
+            return db.exec(select(User).where(User.username == username)).first()
+
+    user = cache.users.get((engine.url, "name", username), load)
+    if not user or not user.is_active:
+        return None
+    valid, new_hash = context().verify_and_update(password, user.password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        with Session(engine) as db:
+            user = db.get(User, user.id)
+            user.password_hash = new_hash
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+        for key in cache.user_keys(engine, user):
+            cache.users.put(key, user)
+    return user
+
+
+# ---------- session tokens ----------
+_tokens = {}  # token -> (user_id, expires_at)
+_tokens_lock = threading.Lock()
+
+
+def issue_token(user_id: int) -> str:
+    token = secrets.token_urlsafe(32)
+    now = time.monotonic()
+    with _tokens_lock:
+        # заодно чистим истёкшие, чтобы словарь не рос
+        for key in [k for k, (_, exp) in _tokens.items() if exp <= now]:
+            del _tokens[key]
+        _tokens[token] = (user_id, now + TOKEN_TTL)
+    return token
+
+
+def revoke_token(token: Optional[str]):
+    if token:
+        with _tokens_lock:
+            _tokens.pop(token, None)
+
+
+def resolve_token(engine, token: Optional[str]):
+    """пользователь по действующему токену или None (без проверки пароля)"""
+    if not token:
+        return None
+    with _tokens_lock:
+        entry = _tokens.get(token)
+    if entry is None or entry[1] <= time.monotonic():
+        revoke_token(token)
+        return None
+
+    def load():
+        with Session(engine) as db:
+            return db.get(User, entry[0])
+
+    user = cache.users.get((engine.url, "id", entry[0]), load)
+    if not user or not user.is_active:
+        revoke_token(token)
+        return None
+    return user
@@ -0,0 +1,275 @@
+"""
+Резервные копии базы на ходу (online backup API SQLite).
+
+    python src/backup.py run --dir backups --keep 7
+    python src/backup.py verify backups/database-20260101-030000.db.gz
+    BACKUP_DIR=backups python main.py   # копии по расписанию в процессе приложения
+"""
+import argparse
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+import storage
+
+# ===================== BACKUP =====================
+# Копия снимается через sqlite3 backup API шагами по STEP_PAGES страниц с
+# паузой между шагами — копирование не занимает диск и GIL подряд.
+# В режиме WAL исходное соединение держит открытую читающую транзакцию:
+# копия — один согласованный снимок, а писатели WAL читателя не ждут.
+# Без этого backup API начинает копию заново после каждой записи с другого
+# соединения и под постоянной нагрузкой не заканчивается вовсе.
+# В rollback-журнале (профиль legacy) читатель блокирует писателей, поэтому
+# там снимок не держим, а после MAX_RESTARTS перезапусков копируем за один шаг.
+#
+# Каждая копия проверяется (PRAGMA integrity_check) до сжатия и ротации;
+# файл архива (archive.py) копируется тем же снимком рядом с основным.
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "")
+BACKUP_INTERVAL = int(os.environ.get("BACKUP_INTERVAL", 6 * 3600))  # сек
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", 7))
+BACKUP_COMPRESS = os.environ.get("BACKUP_COMPRESS", "1") != "0"
+STEP_PAGES = 256
+STEP_SLEEP = 0.005  # сек между шагами
+MAX_RESTARTS = 5
+
+log = logging.getLogger("backup")
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _database_path(engine):
+    if storage.is_memory(str(engine.url)):
+        raise ValueError("Нельзя сделать копию базы в памяти")
+    return make_url(str(engine.url)).database
+
+
+def _stem(engine):
+    return os.path.splitext(os.path.basename(_database_path(engine)))[0]
+
+
+def _copy(source, target_path, schema, pages, sleep):
+    """одна схема source -> файл target_path; (шагов, перезапусков)"""
+    target = sqlite3.connect(target_path)
+    seen = {"steps": 0, "restarts": 0, "remaining": None}
+
+    def progress(status, remaining, total):
+        # оставшихся страниц стало больше — источник изменился, копия пошла заново
+        if seen["remaining"] is not None and remaining > seen["remaining"]:
+            seen["restarts"] += 1
+            if seen["restarts"] > MAX_RESTARTS:
+                raise _Restarted()
+        seen["remaining"] = remaining
+        seen["steps"] += 1
+
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=sleep, name=schema)
+        except _Restarted:
+            log.warning("копия %s перезапускалась %d раз — копируем за один шаг", schema, MAX_RESTARTS)
+            source.backup(target, pages=-1, name=schema)
+        # в заголовке копии остаётся режим WAL источника — отдельный файл его не требует
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    return seen["steps"], seen["restarts"]
+
+
+def verify(path) -> list:
+    """PRAGMA integrity_check копии (.db или .db.gz); [] — копия цела"""
+    if path.endswith(".gz"):
+        plain = path[:-3] + ".verify"
+        with gzip.open(path, "rb") as src, open(plain, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        try:
+            return verify(plain)
+        finally:
+            os.remove(plain)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    return [] if rows == ["ok"] else rows
+
+
+def _compress(path):
+    with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(path + ".gz.tmp", path + ".gz")
+    os.remove(path)
+    return path + ".gz"
+
+
+def backup(engine, directory=None, keep=None, compress=None,
+           pages: int = STEP_PAGES, sleep: float = STEP_SLEEP) -> dict:
+    """
+    копия базы (и архива, если он есть) в directory с проверкой и ротацией.
+    Возвращает {"files", "bytes", "steps", "restarts", "seconds", "removed"}.
+    """
+    directory = directory or BACKUP_DIR
+    if not directory:
+        raise ValueError("Не задан каталог копий (BACKUP_DIR или --dir)")
+    keep = BACKUP_KEEP if keep is None else keep
+    compress = BACKUP_COMPRESS if compress is None else compress
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    prefix = os.path.join(directory, f"{_stem(engine)}-{datetime.now():%Y%m%d-%H%M%S}")
+    raw = engine.raw_connection()
+    try:
+        source = raw.driver_connection
+        schemas = [row[1] for row in source.execute("PRAGMA database_list") if row[1] != "temp"]
+        pin = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if pin:
+            source.execute("BEGIN")
+            for schema in schemas:  # снимок фиксируется первым чтением каждой схемы
+                source.execute(f"SELECT count(*) FROM {schema}.sqlite_master").fetchone()
+        steps = restarts = 0
+        plain = []
+        try:
+            for schema in schemas:
+                path = prefix + (".db" if schema == "main" else f".{schema}.db")
+                s, r = _copy(source, path + ".tmp", schema, pages, sleep)
+                steps, restarts = steps + s, restarts + r
+                plain.append(path)
+        finally:
+            if pin:
+                source.execute("ROLLBACK")
+    finally:
+        raw.close()
+
+    files = []
+    for path in plain:
+        os.replace(path + ".tmp", path)
+        errors = verify(path)
+        if errors:
+            for bad in plain:
+                for name in (bad, bad + ".tmp"):
+                    if os.path.exists(name):
+                        os.remove(name)
+            raise BackupError(f"Копия {path} не прошла проверку: {errors[:5]}")
+    for path in plain:
+        files.append(_compress(path) if compress else path)
+
+    removed = rotate(engine, directory, keep)
+    result = {
+        "files": files,
+        "bytes": sum(os.path.getsize(f) for f in files),
+        "steps": steps,
+        "restarts": restarts,
+        "seconds": round(time.perf_counter() - start, 3),
+        "removed": removed,
+    }
+    log.info("копия %s: %d байт за %.1f с", files[0], result["bytes"], result["seconds"])
+    return result
+
+
+def _sets(engine, directory):
+    """{метка времени: [файлы копии]} по возрастанию времени"""
+    pattern = re.compile(rf"^{re.escape(_stem(engine))}-(\d{{8}}-\d{{6}})(\.[a-z]+)?\.db(\.gz)?$")
+    sets = {}
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            sets.setdefault(match.group(1), []).append(os.path.join(directory, name))
+    return dict(sorted(sets.items()))
+
+
+def rotate(engine, directory, keep) -> list:
+    """удаление копий старше keep последних; удалённые файлы"""
+    sets = _sets(engine, directory)
+    removed = []
+    for stamp in list(sets)[:max(len(sets) - keep, 0)]:
+        for path in sets[stamp]:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def latest(engine, directory):
+    """время последней копии (datetime) или None"""
+    sets = _sets(engine, directory) if os.path.isdir(directory) else {}
+    return datetime.strptime(list(sets)[-1], "%Y%m%d-%H%M%S") if sets else None
+
+
+# ---------- расписание ----------
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _schedule(engine, directory, interval, stop):
+    while True:
+        last = latest(engine, directory)
+        wait = 0 if last is None else max(interval - (datetime.now() - last).total_seconds(), 0)
+        if stop.wait(wait):
+            return
+        try:
+            backup(engine, directory)
+        except Exception:
+            log.exception("резервная копия не удалась")
+            if stop.wait(min(interval, 600)):  # не повторяем сразу же
+                return
+
+
+def start_in_background(engine, directory=None, interval=None):
+    """копии по расписанию в фоновом потоке; повторный вызов ничего не делает"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=_schedule, name="backup", daemon=True,
+                args=(engine, directory or BACKUP_DIR, interval or BACKUP_INTERVAL, stop),
+            )
+            thread.start()
+            _scheduler = (thread, stop)
+    return _scheduler[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Резервные копии базы")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="снять копию сейчас")
+    run.add_argument("--dir", default=BACKUP_DIR or "backups")
+    run.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    run.add_argument("--no-compress", action="store_true")
+    check = sub.add_parser("verify", help="проверить файл копии")
+    check.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "verify":
+        errors = verify(args.path)
+        print("ok" if not errors else "\n".join(errors))
+        return 0 if not errors else 1
+
+    import db  # engine и схема по DB_URL / DB_PROFILE
+    db.create_db()
+    try:
+        result = backup(db.engine, args.dir, args.keep, compress=not args.no_compress)
+    except (ValueError, BackupError) as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    for path in result["files"]:
+        print(path)
+    print(f"{result['bytes'] / 2 ** 20:.1f} МБ за {result['seconds']} с, шагов {result['steps']}, "
+          f"удалено старых: {len(result['removed'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
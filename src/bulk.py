@@ -0,0 +1,306 @@
+"""
+Потоковый импорт/экспорт заявок и комментариев в CSV или JSONL.
+
+    python src/bulk.py import requests legacy.jsonl --rejects bad.txt
+    python src/bulk.py import comments comments.csv
+    python src/bulk.py export requests dump.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime
+from itertools import islice
+
+from sqlalchemy import select, text
+
+import cache
+import db
+import live
+import lookups
+import numbering
+from db import Request, Comment
+from services import STATUSES
+
+# ===================== BULK IMPORT / EXPORT =====================
+# Файл читается построчно и пишется пачками: одна транзакция и один
+# executemany на пачку, номера заявок для пачки резервируются одним
+# UPDATE счётчика, имена клиентов, оборудования и исполнителей переводятся
+# в id справочников (lookups.py) одним запросом на колонку. Экспорт читает
+# базу курсором порциями (yield_per).
+BATCH = 5000
+
+REQUEST_FIELDS = ["number", "create_at", "equipment", "fault_type", "description",
+                  "client", "status", "assigned_to"]
+COMMENT_FIELDS = ["request_number", "author", "text", "created_at"]
+
+
+class RowError(ValueError):
+    pass
+
+
+def _format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Неизвестный формат: {fmt} (csv или jsonl)")
+    return fmt
+
+
+def read_rows(path, fmt=None):
+    """(номер строки в файле, dict) по одной, без чтения файла целиком"""
+    fmt = _format(path, fmt)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                if None in row:
+                    yield reader.line_num, RowError("лишние колонки")
+                    continue
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as ex:
+                    yield line_no, RowError(f"некорректный JSON: {ex.msg}")
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, RowError("ожидается JSON-объект")
+                    continue
+                yield line_no, row
+
+
+def _date(value, field):
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(value[:19], fmt).date()
+        except ValueError:
+            pass
+    raise RowError(f"{field}: не дата: {value!r}")
+
+
+def _str(row, field, required=False):
+    value = row.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"{field}: пусто")
+    return value
+
+
+def _int(value, field):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field}: не число: {value!r}")
+
+
+def validate_request(row):
+    status = _str(row, "status") or STATUSES[0]
+    if status not in STATUSES:
+        raise RowError(f"status: неизвестный статус {status!r}")
+    return {
+        "number": _int(row.get("number"), "number"),
+        "create_at": _date(row.get("create_at"), "create_at") or date.today(),
+        "equipment": _str(row, "equipment", required=True),
+        "fault_type": _str(row, "fault_type"),
+        "description": _str(row, "description"),
+        "client": _str(row, "client", required=True),
+        "status": status,
+        "assigned_to": _str(row, "assigned_to"),
+    }
+
+
+def validate_comment(row):
+    number = _int(row.get("request_number"), "request_number")
+    request_id = _int(row.get("request_id"), "request_id")
+    if number is None and request_id is None:
+        raise RowError("нужен request_number или request_id")
+    return {
+        "request_number": number,
+        "request_id": request_id,
+        "author": _str(row, "author", required=True),
+        "text": _str(row, "text", required=True),
+        "created_at": _date(row.get("created_at"), "created_at") or date.today(),
+    }
+
+
+def _batches(rows, validate, on_reject):
+    """пачки проверенных строк; плохие строки уходят в on_reject"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, BATCH))
+        if not chunk:
+            return
+        good = []
+        for line_no, row in chunk:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                good.append((line_no, validate(row)))
+            except RowError as ex:
+                on_reject(line_no, str(ex))
+        yield good
+
+
+def import_requests(rows, engine=None, on_reject=None) -> int:
+    """заявки из потока (номер строки, dict); возвращает число вставленных"""
+    engine = engine or db.engine
+    on_reject = on_reject or (lambda line_no, reason: None)
+    insert = Request.__table__.insert()
+    total = 0
+    for batch in _batches(rows, validate_request, on_reject):
+        with engine.begin() as conn:
+            # номера из файла не должны пересекаться ни с базой, ни друг с другом
+            given = [r["number"] for _, r in batch if r["number"] is not None]
+            taken = set()
+            if given:
+                taken = set(conn.execute(
+                    select(Request.number).where(Request.number.in_(given))
+                ).scalars())
+            values = []
+            for line_no, r in batch:
+                if r["number"] is not None:
+                    if r["number"] in taken:
+                        on_reject(line_no, f"number: заявка {r['number']} уже есть")
+                        continue
+                    taken.add(r["number"])
+                values.append(r)
+            if not values:
+                continue
+
+            # счётчик сначала догоняет номера из файла, чтобы выданные не пересеклись с ними
+            if given:
+                conn.execute(text(
+                    f"UPDATE {numbering.COUNTER_TABLE} SET value = max(value, :n) WHERE name = 'request'"
+                ), {"n": max(given)})
+            # диапазон номеров на всю пачку одним обновлением счётчика
+            missing = [r for r in values if r["number"] is None]
+            if missing:
+                first = numbering.allocate(conn, len(missing))
+                for offset, r in enumerate(missing):
+                    r["number"] = first + offset
+            conn.execute(insert, lookups.to_ids(conn, values))
+            total += len(values)
+    # новые id могли совпасть с id удалённых заявок, оставшимися в кэше чтения
+    cache.requests.clear()
+    if total:
+        live.broker.publish(engine, live.reload())  # открытые таблицы перечитываются целиком
+    return total
+
+
+def import_comments(rows, engine=None, on_reject=None) -> int:
+    """комментарии из потока; заявка указывается номером (request_number) или id"""
+    engine = engine or db.engine
+    on_reject = on_reject or (lambda line_no, reason: None)
+    insert = Comment.__table__.insert()
+    total = 0
+    for batch in _batches(rows, validate_comment, on_reject):
+        with engine.begin() as conn:
+            numbers = {r["request_number"] for _, r in batch if r["request_number"] is not None}
+            ids = {r["request_id"] for _, r in batch if r["request_number"] is None}
+            by_number = dict(conn.execute(
+                select(Request.number, Request.id).where(Request.number.in_(numbers))
+            ).all()) if numbers else {}
+            known_ids = set(conn.execute(
+                select(Request.id).where(Request.id.in_(ids))
+            ).scalars()) if ids else set()
+
+            values = []
+            for line_no, r in batch:
+                if r["request_number"] is not None:
+                    request_id = by_number.get(r["request_number"])
+                else:
+                    request_id = r["request_id"] if r["request_id"] in known_ids else None
+                if request_id is None:
+                    on_reject(line_no, f"заявка {r['request_number'] or r['request_id']} не найдена")
+                    continue
+                values.append({"request_id": request_id, "author": r["author"],
+                               "text": r["text"], "created_at": r["created_at"]})
+            if values:
+                conn.execute(insert, lookups.to_ids(conn, values))
+                total += len(values)
+    return total
+
+
+def export_rows(kind, engine=None, yield_per=BATCH):
+    """строки для экспорта по одной; база читается порциями"""
+    engine = engine or db.engine
+    if kind == "requests":
+        stmt = select(*[getattr(Request, f) for f in REQUEST_FIELDS]).order_by(Request.id)
+        fields = REQUEST_FIELDS
+    else:
+        stmt = (
+            select(Request.number, Comment.author, Comment.text, Comment.created_at)
+            .join(Request, Request.id == Comment.request_id)
+            .order_by(Comment.id)
+        )
+        fields = COMMENT_FIELDS
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=yield_per).execute(stmt)
+        for row in result:
+            yield dict(zip(fields, row))
+
+
+def export_file(kind, path, fmt=None, engine=None) -> int:
+    fmt = _format(path, fmt)
+    fields = REQUEST_FIELDS if kind == "requests" else COMMENT_FIELDS
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for row in export_rows(kind, engine):
+            row = {k: v.isoformat() if isinstance(v, date) else v for k, v in row.items()}
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт/экспорт заявок и комментариев")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("kind", choices=["requests", "comments"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--rejects", help="файл для отклонённых строк (по умолчанию stderr)")
+    args = parser.parse_args(argv)
+
+    db.create_db()
+    if args.action == "export":
+        count = export_file(args.kind, args.path, args.format)
+        print(f"Выгружено: {count}")
+        return 0
+
+    rejected = 0
+    out = open(args.rejects, "w", encoding="utf-8") if args.rejects else sys.stderr
+
+    def on_reject(line_no, reason):
+        nonlocal rejected
+        rejected += 1
+        out.write(f"строка {line_no}: {reason}\n")
+
+    try:
+        load = import_requests if args.kind == "requests" else import_comments
+        count = load(read_rows(args.path, args.format), on_reject=on_reject)
+    finally:
+        if args.rejects:
+            out.close()
+    print(f"Загружено: {count}, отклонено: {rejected}")
+    return 0 if not rejected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
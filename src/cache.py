@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+# ===================== READ CACHE =====================
+# Общий для всех сессий Flet (и HTTP API) кэш чтения заявок и пользователей
+# по ключу. Хранятся не сами ORM-объекты, а их поля: каждый get отдаёт
+# новый отсоединённый экземпляр, так что вызывающий может его менять.
+# Вместе с полями хранятся и значения, загруженные SQL-выражениями (имена
+# справочников у заявки, db.py): это не поля pydantic, model_dump их не видит.
+# Каждая запись через сервисы обновляет или сбрасывает свою запись в кэше;
+# TTL ограничивает устаревание на случай записи в обход сервисов
+# (другой процесс, ручная правка базы). CACHE=0 — кэш выключен.
+ENABLED = os.environ.get("CACHE", "1") != "0"
+SIZE = int(os.environ.get("CACHE_SIZE", 1024))   # записей на кэш
+TTL = float(os.environ.get("CACHE_TTL", 60))     # сек
+
+
+class ReadCache:
+    """LRU с TTL; отсутствующие строки (None) не кэшируются"""
+
+    def __init__(self, size=SIZE, ttl=TTL, enabled=ENABLED):
+        self.size = size
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, модель, поля, загруженные выражения)
+        self._lock = threading.Lock()
+        # растёт при каждой записи: загрузка, начатая до записи, в кэш не попадёт
+        self._generation = 0
+
+    def get(self, key, load):
+        """значение по ключу; при промахе — load() и запоминание результата"""
+        if not self.enabled:
+            return load()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return _restore(*entry[1:])
+            self.misses += 1
+            generation = self._generation
+        value = load()
+        if value is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        fields = value.model_dump()
+        loaded = {k: v for k, v in vars(value).items() if not k.startswith("_") and k not in fields}
+        self._data[key] = (time.monotonic() + self.ttl, type(value), fields, loaded)
+        self._data.move_to_end(key)
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def put(self, key, value):
+        """запись прошла — кладём свежую версию строки (write-through)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._store(key, value)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def _restore(model, fields, loaded):
+    value = model.model_validate(fields)
+    for name, loaded_value in loaded.items():
+        set_committed_value(value, name, loaded_value)
+    return value
+
+
+requests = ReadCache()
+users = ReadCache()
+
+
+def request_key(engine, request_id):
+    return (engine.url, request_id)
+
+
+def user_keys(engine, user):
+    """ключи пользователя: по id и по логину"""
+    return (engine.url, "id", user.id), (engine.url, "name", user.username)
+
+
+def metrics() -> dict:
+    return {"requests": requests.metrics(), "users": users.metrics()}
+
+
+def set_enabled(enabled: bool):
+    """переключатель для отладки: выключение сразу сбрасывает накопленное"""
+    for c in (requests, users):
+        c.enabled = enabled
+        c.clear()
+
@@ -0,0 +1,135 @@
+from sqlmodel import SQLModel, Field, Session, select
+from sqlalchemy import insert
+from sqlalchemy.orm import column_property
+from typing import Optional
+from datetime import date, datetime
+import threading
+
+import archive
+import cache
+import live
+import lookups
+import migrations
+import numbering
+import paging
+import perf
+import storage
+
+# ===================== DB =====================
+engine = perf.instrument(storage.make_engine())  # путь и профиль — DB_URL / DB_PROFILE
+
+_ready = set()  # engine, для которых схема уже проверена в этом процессе
+_ready_lock = threading.Lock()
+
+
+def create_db():
+    """
+    схема и миграции — один раз на процесс для каждого engine: сессии Flet
+    (вкладки браузера) дальше не платят за create_all. База с актуальной
+    версией схемы не проверяется по метаданным вовсе.
+    """
+    with _ready_lock:
+        if engine in _ready:
+            return
+        if migrations.get_version(engine) < migrations.LATEST:
+            SQLModel.metadata.create_all(engine)
+            migrations.upgrade(engine)
+        # файл архива живёт отдельно от основной базы и мог появиться заново
+        archive.create_archive(engine)
+        _ready.add(engine)
+
+
+def insert_request(conn, client, equipment, fault_type, description,
+                   status="в ожидании", assigned_to=""):
+    """
+    новая заявка в открытой транзакции conn (номер, id справочников);
+    возвращает её строку таблицы просмотра (paging.Row) для request_saved
+    """
+    values = dict(
+        number=numbering.allocate(conn),
+        create_at=date.today(),
+        fault_type=fault_type,
+        description=description,
+        status=status,
+    )
+    names = lookups.to_ids(conn, [
+        {"equipment": equipment, "client": client, "assigned_to": assigned_to}
+    ])[0]
+    request_id = conn.execute(insert(Request).values(**values, **names).returning(Request.id)).scalar_one()
+    values.pop("description")
+    return paging.Row(id=request_id, equipment=equipment, client=client, assigned_to=assigned_to, **values)
+
+
+def request_saved(bind, row):
+    """после коммита вставки: кэш и живые изменения"""
+    # id могла занимать удалённая заявка — её строка в кэше больше не действительна
+    cache.requests.invalidate(cache.request_key(bind, row.id))
+    live.broker.publish(bind, live.inserted(row, paging.Row._fields))
+
+
+def save_request(client, equipment, fault_type, description,
+                status="в ожидании", assigned_to="", bind=None):
+    """сохранение новой заявки в DB (bind — другой engine вместо основного)"""
+    bind = bind or engine
+    with Session(bind) as session:
+        row = insert_request(session.connection(), client, equipment, fault_type, description,
+                             status=status, assigned_to=assigned_to)
+        session.commit()
+    request_saved(bind, row)
+    return row.number
+
+# ===================== MODELS =====================
+class User(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    username: str = Field(index=True, unique=True)
+    password_hash: str
+    full_name: Optional[str] = None
+    role: str = Field(default="user")
+    is_active: bool = Field(default=True)
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class Client(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True)
+
+class Equipment(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True)
+
+class Person(SQLModel, table=True):  # исполнитель или автор; учётная запись не обязательна
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True)
+
+class Request(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    number: int = Field(index=True, unique=True)
+    create_at: date
+    equipment_id: int = Field(foreign_key="equipment.id")
+    fault_type: str
+    description: str
+    client_id: int = Field(foreign_key="client.id")
+    status: str
+    assignee_id: int = Field(foreign_key="person.id")  # lookups.NO_ASSIGNEE — без исполнителя
+
+class Comment(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    request_id: int = Field(foreign_key="request.id", index=True, ondelete="CASCADE")
+    author_id: int = Field(foreign_key="person.id", index=True)
+    text: str
+    created_at: date = Field(default_factory=date.today)
+
+
+# ---------- имена из справочников ----------
+# client, equipment, assigned_to и author читаются, как до перевода на id
+# (lookups.py): подзапрос по первичному ключу справочника в том же SELECT,
+# что и сама строка. Записываются id — имена в них переводит lookups.to_ids.
+def _name(key, lookup, column):
+    return column_property(
+        select(column).where(lookup.id == key).correlate_except(lookup).scalar_subquery()
+    )
+
+
+Request.__mapper__.add_property("equipment", _name(Request.equipment_id, Equipment, Equipment.name))
+Request.__mapper__.add_property("client", _name(Request.client_id, Client, Client.name))
+Request.__mapper__.add_property("assigned_to", _name(Request.assignee_id, Person, Person.name))
+Comment.__mapper__.add_property("author", _name(Comment.author_id, Person, Person.name))
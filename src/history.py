@@ -0,0 +1,168 @@
+from sqlalchemy import text
+
+import lookups
+from stats import DONE
+
+# ===================== STATUS HISTORY =====================
+# Каждая смена статуса или исполнителя дописывается триггером в request_event
+# в той же транзакции, что и сама правка, — кто бы ни писал в request.
+# Время — julianday (дни, UTC). В request_clock у каждой заявки время создания
+# и начала текущего статуса, поэтому триггеры сразу обновляют сводки:
+#   stat_status_time — сколько заявки пробыли в каждом статусе (закрытые отрезки),
+#   stat_completion  — выполненные по месяцам и суммарное время до выполнения,
+#   stat_backlog     — открытые заявки по статусам и сумма времени их создания
+#                      (средний возраст = сейчас - сумма / число).
+# Отчёт читает только эти маленькие таблицы, а не историю целиком.
+# Исполнитель в событии — имя на момент события (у заявки — id, lookups.py).
+EVENT_TABLE = "request_event"
+
+TABLES = {
+    EVENT_TABLE: "id INTEGER PRIMARY KEY, request_id INTEGER NOT NULL, at REAL NOT NULL, "
+                 "status TEXT NOT NULL, assigned_to TEXT NOT NULL",
+    "request_clock": "request_id INTEGER PRIMARY KEY, created REAL NOT NULL, status_since REAL NOT NULL",
+    "stat_status_time": "status TEXT PRIMARY KEY, days REAL NOT NULL, count INTEGER NOT NULL",
+    "stat_completion": "month TEXT PRIMARY KEY, count INTEGER NOT NULL, days REAL NOT NULL",
+    "stat_backlog": "status TEXT PRIMARY KEY, count INTEGER NOT NULL, created_sum REAL NOT NULL",
+}
+
+_NOW = "julianday('now')"
+# заявка, загруженная задним числом (импорт), считается созданной в свой день
+_CREATED = (
+    f"CASE WHEN new.create_at < date('now', 'localtime') "
+    f"THEN julianday(new.create_at) ELSE {_NOW} END"
+)
+_CLOCK = "(SELECT {col} FROM request_clock WHERE request_id = {row}.id)"
+
+
+def _event(at):
+    return f"""
+        INSERT INTO {EVENT_TABLE}(request_id, at, status, assigned_to)
+            VALUES (new.id, {at}, new.status, {lookups.name_sql("assigned_to", "new")});
+    """
+
+
+def _backlog(row, sign):
+    """заявка row входит в открытые (sign=1) или выходит из них (sign=-1)"""
+    return f"""
+        INSERT INTO stat_backlog(status, count, created_sum)
+            SELECT {row}.status, {sign}, {sign} * {_CLOCK.format(col="created", row=row)}
+            WHERE {row}.status <> '{DONE}'
+            ON CONFLICT(status) DO UPDATE SET
+                count = count + excluded.count, created_sum = created_sum + excluded.created_sum;
+    """
+
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS history_request_ai AFTER INSERT ON request BEGIN
+        INSERT OR REPLACE INTO request_clock(request_id, created, status_since)
+            VALUES (new.id, {_CREATED}, {_CREATED});
+        {_event(_CREATED)}
+        {_backlog("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS history_request_ad AFTER DELETE ON request BEGIN
+        {_backlog("old", -1)}
+        DELETE FROM request_clock WHERE request_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS history_request_au_assignee AFTER UPDATE OF assignee_id ON request
+    WHEN old.assignee_id IS NOT new.assignee_id AND old.status IS new.status BEGIN
+        {_event(_NOW)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS history_request_au_status AFTER UPDATE OF status ON request
+    WHEN old.status IS NOT new.status BEGIN
+        {_event(_NOW)}
+        INSERT INTO stat_status_time(status, days, count)
+            VALUES (old.status, {_NOW} - {_CLOCK.format(col="status_since", row="old")}, 1)
+            ON CONFLICT(status) DO UPDATE SET days = days + excluded.days, count = count + 1;
+        INSERT INTO stat_completion(month, count, days)
+            SELECT strftime('%Y-%m', 'now', 'localtime'), 1, {_NOW} - {_CLOCK.format(col="created", row="new")}
+            WHERE new.status = '{DONE}'
+            ON CONFLICT(month) DO UPDATE SET count = count + 1, days = days + excluded.days;
+        {_backlog("old", -1)}
+        {_backlog("new", 1)}
+        UPDATE request_clock SET status_since = {_NOW} WHERE request_id = new.id;
+    END
+    """,
+]
+
+
+def create_history(conn):
+    """таблицы истории и сводок, триггеры и заполнение по существующим заявкам"""
+    for name, columns in TABLES.items():
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} ({columns})"))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{EVENT_TABLE}_request_id ON {EVENT_TABLE} (request_id, id)"
+    ))
+    for ddl in _TRIGGERS:
+        conn.execute(text(ddl))
+    backfill(conn)
+
+
+def backfill(conn):
+    """
+    история для заявок, у которых её нет: одно событие с текущим статусом на
+    день create_at. Когда были прежние смены статуса, уже не узнать, поэтому
+    в сводки времени в статусах и до выполнения такие заявки не попадают.
+    """
+    conn.execute(text(
+        "INSERT INTO request_clock(request_id, created, status_since) "
+        "SELECT id, julianday(create_at), julianday(create_at) FROM request "
+        "WHERE id NOT IN (SELECT request_id FROM request_clock)"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {EVENT_TABLE}(request_id, at, status, assigned_to) "
+        f"SELECT r.id, c.created, r.status, r.assigned_to FROM {lookups.REQUEST_VIEW} r "
+        "JOIN request_clock c ON c.request_id = r.id "
+        f"WHERE r.id NOT IN (SELECT request_id FROM {EVENT_TABLE})"
+    ))
+    rebuild_backlog(conn)
+
+
+def rebuild_backlog(conn):
+    """открытые заявки пересчитываются по request и request_clock"""
+    conn.execute(text("DELETE FROM stat_backlog"))
+    conn.execute(text(
+        "INSERT INTO stat_backlog(status, count, created_sum) "
+        "SELECT r.status, count(*), sum(c.created) FROM request r "
+        "JOIN request_clock c ON c.request_id = r.id "
+        f"WHERE r.status <> '{DONE}' GROUP BY r.status"
+    ))
+
+
+def events(engine, request_id) -> list:
+    """история заявки: [(время, статус, исполнитель)] по порядку"""
+    with engine.connect() as conn:
+        return [tuple(r) for r in conn.execute(text(
+            f"SELECT datetime(at, 'localtime'), status, assigned_to FROM {EVENT_TABLE} "
+            "WHERE request_id = :id ORDER BY id"
+        ), {"id": request_id})]
+
+
+def report(engine, months: int = 12) -> dict:
+    """сводка сроков в часах и днях; только чтение готовых сводок"""
+    with engine.connect() as conn:
+        def rows(sql):
+            return [tuple(r) for r in conn.execute(text(sql), {"months": months})]
+        return {
+            # средние часы в статусе по завершённым отрезкам
+            "status_time": rows(
+                "SELECT status, round(days / count * 24, 1), count FROM stat_status_time "
+                "WHERE count > 0 ORDER BY status"
+            ),
+            # выполнено за месяц и среднее число дней от создания до выполнения
+            "completion": rows(
+                "SELECT month, count, round(days / count, 1) FROM stat_completion "
+                "WHERE count > 0 ORDER BY month DESC LIMIT :months"
+            ),
+            # открытые заявки и их средний возраст в днях
+            "backlog": rows(
+                f"SELECT status, count, round({_NOW} - created_sum / count, 1) FROM stat_backlog "
+                "WHERE count > 0 ORDER BY status"
+            ),
+        }
@@ -0,0 +1,120 @@
+import threading
+from datetime import date
+
+# ===================== LIVE UPDATES =====================
+# Брокер изменений заявок внутри процесса: сервисы после коммита публикуют
+# изменения строк, открытые сессии Flet получают их вместо повторного поиска.
+# Работает и для записей из HTTP API, у которого нет page (поэтому не
+# page.pubsub). События:
+#   {"op": "insert", "id": 7, "row": {колонки таблицы просмотра}}
+#   {"op": "update", "id": 7, "fields": {только изменённые колонки}}
+#   {"op": "reload"} — изменилось много строк сразу (импорт), таблицу перечитать
+# Подписка копит события и сливает их по id: пачка правок одной заявки
+# доходит до сессии одним изменением, а будит её только первое событие пачки.
+INSERT, UPDATE, RELOAD = "insert", "update", "reload"
+
+
+class Subscription:
+    """очередь событий одной сессии с объединением по id"""
+
+    def __init__(self, broker, key, wake):
+        self._broker = broker
+        self._key = key
+        self._wake = wake
+        self._pending = {}  # id -> событие; None -> reload
+        self._waiting = False
+        self._lock = threading.Lock()
+
+    def push(self, event):
+        with self._lock:
+            self._merge(event)
+            if self._waiting:
+                return
+            self._waiting = True
+        self._wake()  # вне блокировки: wake может сразу позвать drain
+
+    def _merge(self, event):
+        if event["op"] == RELOAD or None in self._pending:
+            # после reload отдельные строки не нужны — таблица перечитается целиком
+            self._pending = {None: {"op": RELOAD}}
+            return
+        known = self._pending.get(event["id"])
+        if known is None:
+            self._pending[event["id"]] = event
+        elif known["op"] == INSERT:
+            row = {**known["row"], **event.get("fields", event.get("row", {}))}
+            self._pending[event["id"]] = {**known, "row": row}
+        else:
+            fields = {**known["fields"], **event.get("fields", event.get("row", {}))}
+            self._pending[event["id"]] = {**known, "fields": fields}
+
+    def drain(self) -> list:
+        """накопленные события по порядку первого появления; следующее событие снова будит"""
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending = {}
+            self._waiting = False
+        return events
+
+    def close(self):
+        self._broker.unsubscribe(self._key, self)
+
+
+class Broker:
+    def __init__(self):
+        self._subscribers = {}  # engine.url -> [Subscription]
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, engine, wake) -> Subscription:
+        """wake() зовётся из потока писателя — ему достаточно запланировать drain"""
+        sub = Subscription(self, engine.url, wake)
+        with self._lock:
+            self._subscribers.setdefault(engine.url, []).append(sub)
+        return sub
+
+    def unsubscribe(self, key, sub):
+        with self._lock:
+            subs = self._subscribers.get(key, [])
+            if sub in subs:
+                subs.remove(sub)
+
+    def publish(self, engine, event):
+        with self._lock:
+            subs = list(self._subscribers.get(engine.url, ()))
+            self.published += 1
+        for sub in subs:
+            sub.push(event)
+
+    def subscribers(self, engine) -> int:
+        with self._lock:
+            return len(self._subscribers.get(engine.url, ()))
+
+
+broker = Broker()
+
+
+def _plain(value):
+    # в таблицу просмотра даты приходят строками из SQLite — в событиях так же
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def inserted(request, columns):
+    return {"op": INSERT, "id": request.id,
+            "row": {c: _plain(getattr(request, c)) for c in columns}}
+
+
+def updated(request_id, fields):
+    return {"op": UPDATE, "id": request_id, "fields": {k: _plain(v) for k, v in fields.items()}}
+
+
+def reload():
+    return {"op": RELOAD}
+
+
+def updates_first(events):
+    """
+    правки раньше вставок: события разных id независимы (правки новой строки
+    уже слиты в её insert), а позиции строк окна не сдвигаются посреди правок
+    """
+    return sorted(events, key=lambda event: event["op"] == INSERT)
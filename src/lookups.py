@@ -0,0 +1,199 @@
+import json
+
+from sqlalchemy import bindparam, text
+
+# ===================== LOOKUPS =====================
+# Клиент, оборудование, исполнитель заявки и автор комментария хранятся
+# целыми id справочников: client, equipment и person (исполнители и авторы).
+# Строки заявок короче, индексы по этим колонкам целочисленные, а выборки по
+# клиенту или исполнителю сравнивают числа, а не строки.
+#
+# Читаются имена как раньше: у моделей — свойствами client, equipment,
+# assigned_to и author (db.py), в SQL — представлениями request_named и
+# comment_named с прежними колонками таблиц. Запись принимает имена:
+# незнакомое имя заводится в справочнике. person — только имена, не учётные
+# записи: исполнитель с ручного ввода или из импорта не занимает логин, а
+# пользователь с тем же логином узнаёт в нём себя по имени. «Без
+# исполнителя» — строка person с пустым именем и id NO_ASSIGNEE: соединение
+# остаётся внутренним, и сортировка по исполнителю идёт по индексу имён.
+REQUEST_VIEW = "request_named"
+COMMENT_VIEW = "comment_named"
+NO_ASSIGNEE = 0
+
+# колонка с именем -> (колонка с id, справочник, колонка имени в справочнике)
+NAMES = {
+    "equipment": ("equipment_id", "equipment", "name"),
+    "client": ("client_id", "client", "name"),
+    "assigned_to": ("assignee_id", "person", "name"),
+    "author": ("author_id", "person", "name"),
+}
+
+
+def key(column) -> str:
+    """колонка, по которой хранится column в основной базе"""
+    return NAMES[column][0] if column in NAMES else column
+
+
+def name_sql(column, row) -> str:
+    """SQL-выражение: имя по id из строки row (new/old в триггере, псевдоним таблицы)"""
+    fk, table, name = NAMES[column]
+    return f"(SELECT {name} FROM {table} WHERE id = {row}.{fk})"
+
+
+def id_sql(column, value) -> str:
+    """SQL-выражение: id по имени value (имя должно уже быть в справочнике, см. ensure)"""
+    _, table, name = NAMES[column]
+    return f"(SELECT id FROM {table} WHERE {name} = {value})"
+
+
+def ensure(conn, column, names_sql, params=None):
+    """заводит недостающие имена из подзапроса names_sql (одна колонка)"""
+    _, table, name = NAMES[column]
+    conn.execute(text(f"INSERT OR IGNORE INTO {table}({name}) SELECT * FROM ({names_sql})"), params or {})
+
+
+def resolve(conn, column, names) -> dict:
+    """{имя: id} для колонки column; недостающие имена заводятся"""
+    _, table, name = NAMES[column]
+    names = list(set(names))
+    if not names:
+        return {}
+    select = text(f"SELECT {name}, id FROM {table} WHERE {name} IN :names").bindparams(
+        bindparam("names", expanding=True)
+    )
+    found = dict(conn.execute(select, {"names": names}).all())
+    missing = [n for n in names if n not in found]
+    if missing:
+        ensure(conn, column, "SELECT value FROM json_each(:names)",
+               {"names": json.dumps(missing, ensure_ascii=False)})
+        found.update(conn.execute(select, {"names": missing}).all())
+    return found
+
+
+def to_ids(conn, rows) -> list:
+    """строки записи с именами (client, assigned_to, ...) -> те же строки с id справочников"""
+    columns = [c for c in NAMES if any(c in row for row in rows)]
+    ids = {c: resolve(conn, c, (row[c] for row in rows if c in row)) for c in columns}
+    return [
+        {key(k): ids[k][v] if k in ids else v for k, v in row.items()}
+        for row in rows
+    ]
+
+
+# ---------- схема ----------
+def normalized(conn) -> bool:
+    """заявки уже хранят id справочников (а не строки)"""
+    return conn.execute(text(
+        "SELECT 1 FROM pragma_table_info('request') WHERE name = 'client_id'"
+    )).first() is not None
+
+
+def _no_assignee(conn):
+    conn.execute(text(f"INSERT OR IGNORE INTO person(id, name) VALUES ({NO_ASSIGNEE}, '')"))
+
+
+def create_views(conn):
+    """строка «без исполнителя» и представления с именами вместо id"""
+    _no_assignee(conn)
+    conn.execute(text(
+        f"CREATE VIEW IF NOT EXISTS {REQUEST_VIEW} AS "
+        "SELECT r.id, r.number, r.create_at, e.name AS equipment, r.fault_type, r.description, "
+        "c.name AS client, r.status, p.name AS assigned_to FROM request r "
+        "JOIN equipment e ON e.id = r.equipment_id JOIN client c ON c.id = r.client_id "
+        "JOIN person p ON p.id = r.assignee_id"
+    ))
+    conn.execute(text(
+        f"CREATE VIEW IF NOT EXISTS {COMMENT_VIEW} AS "
+        "SELECT m.id, m.request_id, p.name AS author, m.text, m.created_at FROM comment m "
+        "JOIN person p ON p.id = m.author_id"
+    ))
+
+
+_LOOKUP_DDL = [
+    "CREATE TABLE IF NOT EXISTS client (\n\tid INTEGER NOT NULL, \n\tname VARCHAR NOT NULL, \n\tPRIMARY KEY (id)\n)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_client_name ON client (name)",
+    "CREATE TABLE IF NOT EXISTS equipment (\n\tid INTEGER NOT NULL, \n\tname VARCHAR NOT NULL, \n\tPRIMARY KEY (id)\n)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_equipment_name ON equipment (name)",
+    "CREATE TABLE IF NOT EXISTS person (\n\tid INTEGER NOT NULL, \n\tname VARCHAR NOT NULL, \n\tPRIMARY KEY (id)\n)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_person_name ON person (name)",
+]
+_REQUEST_DDL = (
+    "CREATE TABLE request_new (\n"
+    "\tid INTEGER NOT NULL, \n"
+    "\tnumber INTEGER NOT NULL, \n"
+    "\tcreate_at DATE NOT NULL, \n"
+    "\tequipment_id INTEGER NOT NULL, \n"
+    "\tfault_type VARCHAR NOT NULL, \n"
+    "\tdescription VARCHAR NOT NULL, \n"
+    "\tclient_id INTEGER NOT NULL, \n"
+    "\tstatus VARCHAR NOT NULL, \n"
+    "\tassignee_id INTEGER NOT NULL, \n"
+    "\tPRIMARY KEY (id), \n"
+    "\tFOREIGN KEY(equipment_id) REFERENCES equipment (id), \n"
+    "\tFOREIGN KEY(client_id) REFERENCES client (id), \n"
+    "\tFOREIGN KEY(assignee_id) REFERENCES person (id)\n"
+    ")"
+)
+_COMMENT_DDL = (
+    "CREATE TABLE comment_new (\n"
+    "\tid INTEGER NOT NULL, \n"
+    "\trequest_id INTEGER NOT NULL, \n"
+    "\tauthor_id INTEGER NOT NULL, \n"
+    "\ttext VARCHAR NOT NULL, \n"
+    "\tcreated_at DATE NOT NULL, \n"
+    "\tPRIMARY KEY (id), \n"
+    "\tFOREIGN KEY(request_id) REFERENCES request (id) ON DELETE CASCADE, \n"
+    "\tFOREIGN KEY(author_id) REFERENCES person (id)\n"
+    ")"
+)
+
+
+def normalize(conn):
+    """
+    перевод заявок и комментариев со строк на id справочников (пересозданием
+    таблиц). Триггеры, FTS-индекс и счётчики по старым колонкам удаляются —
+    их заново создаёт вызывающий (migrations._v6_lookups).
+    """
+    for (name,) in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('request', 'comment')"
+    )).all():
+        conn.execute(text(f'DROP TRIGGER "{name}"'))
+    for view in (REQUEST_VIEW, COMMENT_VIEW):
+        conn.execute(text(f"DROP VIEW IF EXISTS {view}"))
+    conn.execute(text("DROP TABLE IF EXISTS request_fts"))
+    conn.execute(text("DROP TABLE IF EXISTS stat_assignee"))
+    conn.execute(text("DROP TABLE IF EXISTS stat_equipment"))
+
+    for ddl in _LOOKUP_DDL:
+        conn.execute(text(ddl))
+    _no_assignee(conn)  # пустой исполнитель — это он, а не новое имя
+    for column, names in (
+        ("equipment", "SELECT DISTINCT equipment FROM request"),
+        ("client", "SELECT DISTINCT client FROM request"),
+        ("assigned_to", "SELECT DISTINCT assigned_to FROM request"),
+        ("author", "SELECT DISTINCT author FROM comment"),
+    ):
+        ensure(conn, column, names)
+
+    conn.execute(text(_REQUEST_DDL))
+    conn.execute(text(
+        "INSERT INTO request_new (id, number, create_at, equipment_id, fault_type, description, "
+        "client_id, status, assignee_id) "
+        f"SELECT r.id, r.number, r.create_at, {id_sql('equipment', 'r.equipment')}, r.fault_type, "
+        f"r.description, {id_sql('client', 'r.client')}, r.status, {id_sql('assigned_to', 'r.assigned_to')} "
+        "FROM request r"
+    ))
+    conn.execute(text(_COMMENT_DDL))
+    conn.execute(text(
+        "INSERT INTO comment_new (id, request_id, author_id, text, created_at) "
+        f"SELECT m.id, m.request_id, {id_sql('author', 'm.author')}, m.text, m.created_at FROM comment m"
+    ))
+    # индексы уходят вместе со старыми таблицами
+    conn.execute(text("DROP TABLE comment"))
+    conn.execute(text("DROP TABLE request"))
+    conn.execute(text("ALTER TABLE request_new RENAME TO request"))
+    conn.execute(text("ALTER TABLE comment_new RENAME TO comment"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_request_number ON request (number)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_comment_request_id ON comment (request_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_comment_author_id ON comment (author_id)"))
+    create_views(conn)
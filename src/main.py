@@ -1,79 +1,34 @@
+import time
+
+STARTED = time.perf_counter()  # до импорта flet и моделей — для отчёта о старте
+
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
 import flet as ft
-from sqlmodel import SQLModel, Field, create_engine, Session, select, func
-from typing import Optional
-from datetime import date, datetime
-from passlib.context import CryptContext
-
-# ===================== DB =====================
-engine = create_engine("sqlite:///database.db")
-
-def create_db():
-    SQLModel.metadata.create_all(engine)
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
-
-def save_request(client, equipment, fault_type, description,
-                status="в ожидании", assigned_to=""):
-    """сохранение новой заявки в DB"""
-    with Session(engine) as session:
-        max_number = session.exec(select(func.max(Request.number))).one()
-        next_number = (max_number or 1000) + 1
-        
-        req = Request(
-            number=next_number,
-            create_at=date.today(),
-            equipment=equipment,
-            fault_type=fault_type,
-            description=description,
-            client=client,
-            status=status,
-            assigned_to=assigned_to
-        )
-        
-        session.add(req)
-        session.commit()
-        
-        request_number = req.number
-        return request_number
-
-# ===================== MODELS =====================
-class User(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    username: str
-    password_hash: str
-    full_name: Optional[str] = None
-    role: str = Field(default="user")
-    is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.now)
-
-class Request(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    number: int
-    create_at: date
-    equipment: str
-    fault_type: str
-    description: str
-    client: str
-    status: str
-    assigned_to: str
-
-class Comment(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    request_id: int
-    author: str
-    text: str
-    created_at: date = Field(default_factory=date.today)
+
+import api
+import archive
+import auth
+import backup
+import live
+import paging
+import perf
+import stats
+import suggest
+import workers
+from db import engine, create_db
+from services import (RequestService, CommentService, UserService, COMMENT_PAGE,
+                      STATUSES, UPDATED, UNCHANGED)
+
+perf.record("startup", "import", (time.perf_counter() - STARTED) * 1000)
+# passlib и backend bcrypt грузятся в фоне, пока Flet ждёт первое подключение
+PREWARM = workers.hash_pool.submit(auth.prewarm)
 
 # ===================== APP =====================
 async def main(page: ft.Page):
+    session_started = time.perf_counter()
     page.title = "Учет заявок на ремонт"
     page.window.width = 1000
     page.window.height = 750
@@ -81,8 +36,17 @@ async def main(page: ft.Page):
     page.window.maximizable = False
     page.bgcolor = "#000000"
 
-    create_db()
+    with perf.timer("startup", "schema"):
+        create_db()
+    if os.environ.get("API_PORT"):
+        api.start_in_background(engine)  # один сервер на процесс, общий для всех сессий
+    if os.environ.get("BACKUP_DIR"):
+        backup.start_in_background(engine)  # как и API — один планировщик на процесс
+    completions = suggest.autocomplete(engine)  # индекс подсказок строится в фоне, один на процесс
     current_user = None
+    requests_svc = RequestService(engine)
+    comments_svc = CommentService(engine)
+    users_svc = UserService(engine)
 
     # ---------- utils ----------
     def show_msg(text, color):
@@ -90,548 +54,1219 @@ async def main(page: ft.Page):
         page.overlay.append(sb)
         sb.open = True
         page.update()
-        
+
     def is_admin():
         return current_user and current_user.role == "admin"
-    
+
+    SUGGESTIONS_SHOWN = 5
+
+    def with_suggestions(field, column, boxes):
+        """
+        поле и под ним подсказки ранее введённых значений column (suggest.py):
+        ответ из памяти, поэтому прямо в обработчике нажатия. boxes — список
+        блоков подсказок вкладки, чтобы скрыть их после сохранения
+        """
+        box = ft.Column(spacing=0, width=field.width, visible=False)
+        boxes.append(box)
+
+        def choose(name):
+            def handler(e):
+                field.value = name
+                box.visible = False
+                page.update()
+            return handler
+
+        def on_change(e):
+            names = []
+            if field.value:
+                with perf.timer("suggest", column):
+                    names = completions.complete(column, field.value, SUGGESTIONS_SHOWN + 1)
+            names = [name for name in names if name != field.value][:SUGGESTIONS_SHOWN]
+            box.controls = [ft.TextButton(name, on_click=choose(name)) for name in names]
+            box.visible = bool(names)
+            page.update()
+
+        field.on_change = on_change
+        return ft.Column([field, box], spacing=0)
+
+    def hide_suggestions(boxes):
+        for box in boxes:
+            box.visible = False
+
+    in_flight = {}  # обработчик -> индикатор, пока он выполняется
+
+    def single_flight(indicator):
+        """
+        async-обработчик кнопки: пока он работает, кнопка заблокирована,
+        индикатор показан, а повторные нажатия игнорируются
+        """
+        def wrap(handler):
+            async def run(e):
+                if handler in in_flight:
+                    return
+                in_flight[handler] = indicator
+                e.control.disabled = True
+                indicator.visible = True
+                page.update()
+                try:
+                    await handler(e)
+                finally:
+                    del in_flight[handler]
+                    e.control.disabled = False
+                    indicator.visible = indicator in in_flight.values()
+                    page.update()
+            return run
+        return wrap
+
+    def admin_only(handler):
+        """кнопки панели производительности — только для администратора"""
+        async def run(e):
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+            await handler(e)
+        return run
+
     # def is_master():
     #     return current_user and current_user.role == "master"
     # ---------- auth ----------
-    def register_user(username, password, full_name=""):
-        with Session(engine) as db:
-            if db.exec(select(User).where(User.username == username)).first():
-                raise Exception("Пользователь уже существует")
-            db.add(User(
-                username=username,
-                password_hash=hash_password(password),
-                full_name=full_name
-            ))
-            db.commit()
-
-    def authenticate_user(username, password):
-        with Session(engine) as db:
-            user = db.exec(select(User).where(User.username == username.lower())).first()
-            user = db.exec(select(User).where(User.username == username.lower())).first()
-            if not user or not verify_password(password, user.password_hash):
-                return None
-            if not user.is_active:
-                return None
-            client_field.value = user.username
-            return user
+    TOKEN_KEY = "auth_token"
+    session_token = None
 
-    # ---------- AUTH UI ----------
-    login_username = ft.TextField(label="Логин", width=250)
-    login_password = ft.TextField(label="Пароль", password=True, width=250)
+    async def load_token():
+        try:
+            return await ft.SharedPreferences().get(TOKEN_KEY)
+        except Exception:  # хранилище клиента недоступно — просто входим заново
+            return None
 
-    reg_username = ft.TextField(label="Логин", width=250)
-    reg_password = ft.TextField(label="Пароль", password=True, width=250)
-    reg_name = ft.TextField(label="ФИО", width=250)
+    async def store_token(token):
+        try:
+            if token:
+                await ft.SharedPreferences().set(TOKEN_KEY, token)
+            else:
+                await ft.SharedPreferences().remove(TOKEN_KEY)
+        except Exception:
+            pass
 
-    def login_handler(e):
+    def start_session(user):
         nonlocal current_user
-        user = authenticate_user(login_username.value, login_password.value)
-        if not user:
-            show_msg("Неверный логин или пароль", ft.Colors.RED)
-            return
         current_user = user
-        show_msg(f"Добро пожаловать, {user.username}", ft.Colors.GREEN)
-        show_app()
 
-    def register_handler(e):
-        try: 
-            if not reg_username.value:
-                show_msg("enter username", ft.Colors.RED)
-                return
+    # Экран входа и вкладки строятся функциями build_*: экран входа — только пока
+    # он показан, вкладка — при первом открытии. При выходе дерево вкладок со всеми
+    # полями, состоянием и обработчиками отпускается целиком.
 
-            if not reg_password.value:
-                show_msg("enter password", ft.Colors.RED)
-                return
+    # ---------- AUTH UI ----------
+    def build_auth_view():
+        login_username = ft.TextField(label="Логин", width=250)
+        login_password = ft.TextField(label="Пароль", password=True, width=250)
+
+        reg_username = ft.TextField(label="Логин", width=250)
+        reg_password = ft.TextField(label="Пароль", password=True, width=250)
+        reg_name = ft.TextField(label="ФИО", width=250)
 
-            if len(reg_password.value) < 8:
-                show_msg("password can't be less 8 symbol", ft.Colors.ORANGE)
+        auth_progress = ft.ProgressBar(width=250, visible=False)
+
+        @single_flight(auth_progress)
+        @perf.timed
+        async def login_handler(e):
+            nonlocal session_token
+            result = await workers.run_hash(users_svc.login, login_username.value, login_password.value)
+            if not result:
+                show_msg("Неверный логин или пароль", ft.Colors.RED)
                 return
+            user, session_token = result
+            start_session(user)
+            await store_token(session_token)
+            login_password.value = ""
+            show_msg(f"Добро пожаловать, {user.username}", ft.Colors.GREEN)
+            show_app()
+
+        @single_flight(auth_progress)
+        @perf.timed
+        async def register_handler(e):
+            try:
+                if not reg_username.value:
+                    show_msg("enter username", ft.Colors.RED)
+                    return
+
+                if not reg_password.value:
+                    show_msg("enter password", ft.Colors.RED)
+                    return
+
+                if len(reg_password.value) < 8:
+                    show_msg("password can't be less 8 symbol", ft.Colors.ORANGE)
+                    return
+
+                if not reg_name.value:
+                    show_msg("enter your name", ft.Colors.RED)
+                    return
+
+                await workers.run_hash(users_svc.register, reg_username.value, reg_password.value, reg_name.value)
+
+                show_msg("Регистрация успешна", ft.Colors.GREEN)
+                # Очистка полей
+                reg_username.value = ""
+                reg_password.value = ""
+                reg_name.value = ""
+                page.update()
+            except Exception as ex:
+                show_msg(str(ex), ft.Colors.RED)
+
+        return ft.Container(
+            content=ft.Column(
+                [
+                    auth_progress,
+                    ft.Text("Вход", size=22, color="WHITE"),
+                    login_username,
+                    login_password,
+                    ft.Button("Войти", on_click=login_handler, width=250),
+                    ft.Divider(height=20),
+                    ft.Text("Регистрация", size=22, color="WHITE"),
+                    reg_username,
+                    reg_password,
+                    reg_name,
+                    ft.Button("Зарегистрироваться", on_click=register_handler, width=250),
+                ],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            ),
+            alignment=ft.Alignment.CENTER,
+            expand=True,
+        )
+
+    app_progress = ft.ProgressBar(visible=False)
+    SCROLL_EDGE = 300      # px до края, с которых догружаем страницу
+
+    # ---------- ADD REQUEST UI ----------
+    def build_add_tab():
+        equipment_field = ft.TextField(label="Оборудование", width=250, border_color="#2095FE")
+        fault_field = ft.TextField(label="Тип неисправности", width=250, border_color="#2095FE")
+        client_field = ft.TextField(label="Клиент", value=current_user.username, width=250, border_color="#2095FE")
+        status_field = ft.Dropdown(
+            label="Статус",
+            width=250,
+            options=[
+                ft.dropdown.Option("в ожидании"),
+                ft.dropdown.Option("в работе"),
+                ft.dropdown.Option("выполнено"),
+            ],
+            value="в ожидании",
+            border_color="#2095FE"
+        )
+        description_field = ft.TextField(
+            label="Описание проблемы",
+            multiline=True,
+            min_lines=3,
+            max_lines=5,
+            width=760,
+            border_color="#2095FE"
+        )
+        assigned_field = ft.TextField(label="Исполнитель", width=250, border_color="#2095FE",)
 
-            if not reg_name.value:
-                show_msg("enter your name", ft.Colors.RED)
+        @single_flight(app_progress)
+        @perf.timed
+        async def add_request_handler(e):
+            if not client_field.value or not equipment_field.value:
+                show_msg("Заполните оборудование и клиента", ft.Colors.RED)
                 return
 
-            register_user(reg_username.value.lower(), reg_password.value, reg_name.value)
-            register_user(reg_username.value.lower(), reg_password.value, reg_name.value)
+            try:
+                request_number = await workers.run_db(
+                    requests_svc.create,
+                    client=client_field.value,
+                    equipment=equipment_field.value,
+                    fault_type=fault_field.value,
+                    description=description_field.value,
+                    status=status_field.value,
+                    # без исполнителя — наименее загруженный (или по ASSIGN_STRATEGY)
+                    assigned_to=assigned_field.value,
+                    auto_assign=True,
+                )
+
+                show_msg(f"Заявка #{request_number} создана!", ft.Colors.GREEN)
+
+                # Очистка полей
+                equipment_field.value = ""
+                fault_field.value = ""
+                client_field.value = ""
+                description_field.value = ""
+                assigned_field.value = ""
+                status_field.value = "в ожидании"
+                hide_suggestions(suggestion_boxes)
+
+            except Exception as ex:
+                show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
 
-            show_msg("Регистрация успешна", ft.Colors.GREEN)
-            # Очистка полей
-            reg_username.value = ""
-            reg_password.value = ""
-            reg_name.value = ""
             page.update()
-        except Exception as ex:
-            show_msg(str(ex), ft.Colors.RED)
 
-    auth_view = ft.Container(
-        content=ft.Column(
-            [
-                ft.Text("Вход", size=22, color="WHITE"),
-                login_username,
-                login_password,
-                ft.Button("Войти", on_click=login_handler, width=250),
-                ft.Divider(height=20),
-                ft.Text("Регистрация", size=22, color="WHITE"),
-                reg_username,
-                reg_password,
-                reg_name,
-                ft.Button("Зарегистрироваться", on_click=register_handler, width=250),
-            ],
-            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-        ),
-        alignment=ft.Alignment.CENTER,
-        expand=True,
-    )
+        suggestion_boxes = []
 
-    # ---------- ADD REQUEST UI ----------
-    equipment_field = ft.TextField(label="Оборудование", width=250, border_color="#2095FE")
-    fault_field = ft.TextField(label="Тип неисправности", width=250, border_color="#2095FE")
-    client_field = ft.TextField(label="Клиент", width=250, border_color="#2095FE")
-    status_field = ft.Dropdown(
-        label="Статус",
-        width=250,
-        options=[
-            ft.dropdown.Option("в ожидании"),
-            ft.dropdown.Option("в работе"),
-            ft.dropdown.Option("выполнено"),
-        ],
-        value="в ожидании",
-        border_color="#2095FE"
-    )
-    description_field = ft.TextField(
-        label="Описание проблемы",
-        multiline=True,
-        min_lines=3,
-        max_lines=5,
-        width=760,
-        border_color="#2095FE"
-    )
-    assigned_field = ft.TextField(label="Исполнитель", width=250, border_color="#2095FE",)
-
-    def add_request_handler(e):
-        if not client_field.value or not equipment_field.value:
-            show_msg("Заполните оборудование и клиента", ft.Colors.RED)
-            return
-        
-        try:
-            request_number = save_request(
-                client=client_field.value,
-                equipment=equipment_field.value,
-                fault_type=fault_field.value,
-                description=description_field.value,
-                status=status_field.value,
-                assigned_to=assigned_field.value if assigned_field.value else current_user.username
+        add_button = ft.Button(
+            "Добавить заявку",
+            on_click=add_request_handler,
+            width=200
+        )
+
+        return ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    with_suggestions(equipment_field, "equipment", suggestion_boxes),
+                    with_suggestions(fault_field, "fault_type", suggestion_boxes),
+                    with_suggestions(client_field, "client", suggestion_boxes)
+                ], alignment=ft.MainAxisAlignment.CENTER, vertical_alignment=ft.CrossAxisAlignment.START),
+                ft.Row([
+                    status_field,
+                    with_suggestions(assigned_field, "assigned_to", suggestion_boxes),
+                    ft.Container(width=250)  # Пустой контейнер для выравнивания
+                ], alignment=ft.MainAxisAlignment.CENTER, vertical_alignment=ft.CrossAxisAlignment.START),
+                ft.Row([
+                    description_field
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    add_button
+                ], alignment=ft.MainAxisAlignment.CENTER)
+            ], spacing=20),
+            alignment=ft.Alignment.CENTER,
+            padding=20,
+        )
+
+    # ---------- VIEW UI ----------
+    def build_view_tab():
+        search_state = {"gen": 0, "cancel": None, "pager": None, "busy": False,
+                        "sort": None, "descending": False, "counts": {}, "archive": False,
+                        "selected": set()}  # id, отмеченные для массовой правки
+        SEARCH_DEBOUNCE = 0.3  # сек, пауза после последнего нажатия
+        LIVE_COALESCE = 0.25   # сек, за которые копятся живые изменения перед отрисовкой
+        ROW_HEIGHT = 48        # фиксированная высота строки — для коррекции прокрутки
+
+        def row_values(req):
+            return [
+                str(req.number),
+                str(req.create_at),
+                req.equipment,
+                req.fault_type,
+                req.client,
+                req.status,
+                req.assigned_to,
+                str(search_state["counts"].get(req.id, "")),
+            ]
+
+        def render_row(req):
+            return ft.DataRow(
+                cells=[ft.DataCell(ft.Text(value)) for value in row_values(req)],
+                data=req.id,
+                selected=req.id in search_state["selected"],
+                on_select_change=on_row_select,
             )
-            
-            show_msg(f"Заявка #{request_number} создана!", ft.Colors.GREEN)
-            
-            # Очистка полей
-            equipment_field.value = ""
-            fault_field.value = ""
-            client_field.value = ""
-            description_field.value = ""
-            assigned_field.value = ""
-            status_field.value = "в ожидании"
-            
-        except Exception as ex:
-            show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
-        
-        page.update()
-        
-    def load_request(search=""):
-        check_status.selected_index = None
-        check_status.rows.clear()
-        
-        if not is_admin():
-            show_msg("admin only", ft.Colors.ORANGE)
-            return
-        
-        if not search:
+
+        def show_selected():
+            count = len(search_state["selected"])
+            selected_text.value = f"Выбрано: {count}"
+            bulk_button.disabled = not count
+
+        def on_row_select(e):
+            # отметка живёт в search_state: окно при прокрутке перерисовывается
+            row = e.control
+            row.selected = not row.selected
+            if row.selected:
+                search_state["selected"].add(row.data)
+            else:
+                search_state["selected"].discard(row.data)
+            show_selected()
             page.update()
-            return
-        
-        with Session(engine) as session:
-            stat = select(Request)
-            
-            if search:
-                search_lower = search.lower()
-                # print(search.lower())
-                stat = stat.where(
-                    (Request.number.like(f"%{search}%")) |  # number ищем как есть
-                    (Request.equipment.like(f"%{search_lower}%")) |  # equipment в нижнем регистре
-                    (Request.client.like(f"%{search_lower}%"))        # client в нижнем регистре
-                )
-            
-            
-            requests = session.exec(stat).all()
-            
-        for req in requests:
-            check_status.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(req.number))),
-                        ft.DataCell(ft.Text(str(req.create_at))),
-                        ft.DataCell(ft.Text(req.equipment)),
-                        ft.DataCell(ft.Text(req.fault_type)),
-                        ft.DataCell(ft.Text(req.client)),
-                        ft.DataCell(ft.Text(req.status)),
-                        ft.DataCell(ft.Text(req.assigned_to)),
-                    ]
-                )
+
+        def on_select_all(e):
+            """отметка всех загруженных строк окна или снятие всех отметок"""
+            select = not all(row.selected for row in check_status.rows)
+            for row in check_status.rows:
+                row.selected = select
+            if select:
+                search_state["selected"].update(row.data for row in check_status.rows)
+            else:
+                search_state["selected"].clear()
+            show_selected()
+            page.update()
+
+        def render_requests(requests):
+            check_status.rows.clear()
+            for req in requests:
+                check_status.rows.append(render_row(req))
+
+        async def apply_changes():
+            """
+            изменения заявок из всех сессий и API: правятся только затронутые
+            строки. Пауза собирает пачку правок в одно обновление страницы.
+            """
+            await asyncio.sleep(LIVE_COALESCE)
+            while search_state["busy"]:  # окно сейчас догружается в потоке БД
+                await asyncio.sleep(LIVE_COALESCE)
+            events = subscription.drain()
+            pager = search_state["pager"]
+            if pager is None or not events:
+                return
+            if events[0]["op"] == live.RELOAD:
+                await load_request(search_field.value or "", 0)
+                return
+            with perf.timer("handler", "apply_changes"):
+                changed = False
+                for event in live.updates_first(events):
+                    if event["op"] == live.INSERT:
+                        index = pager.insert(event["row"])
+                        if index is not None:
+                            search_state["counts"][event["id"]] = 0
+                            check_status.rows.insert(index, render_row(pager.rows[index]))
+                    else:
+                        index = pager.patch(event["id"], event["fields"])
+                        if index is not None:
+                            cells = check_status.rows[index].cells
+                            for cell, value in zip(cells, row_values(pager.rows[index])):
+                                cell.content.value = value
+                    changed |= index is not None
+                if changed:
+                    page.update()
+
+        def load_page(pager, load, cancel, counts):
+            """
+            страница заявок и число комментариев к её строкам (в потоке БД).
+            Счётчики берутся одним сгруппированным запросом только для новых строк,
+            а не отдельным запросом на каждую строку таблицы.
+            """
+            loaded = load(cancel)
+            if loaded:
+                missing = [r.id for r in pager.rows if r.id not in counts]
+                counts.update(comments_svc.counts(missing))
+                # окно страниц сдвинулось — счётчики ушедших строк не держим
+                visible = {r.id for r in pager.rows}
+                for request_id in [k for k in counts if k not in visible]:
+                    del counts[request_id]
+            return loaded
+
+        def new_search():
+            """новый поиск отменяет предыдущий: рисуется только последний"""
+            search_state["gen"] += 1
+            if search_state["cancel"] is not None:
+                search_state["cancel"].set()
+            search_state["cancel"] = threading.Event()
+            return search_state["gen"], search_state["cancel"]
+
+        async def load_request(query="", debounce=SEARCH_DEBOUNCE):
+            gen, cancel = new_search()
+            check_status.selected_index = None
+
+            if not is_admin():
+                check_status.rows.clear()
+                show_msg("admin only", ft.Colors.ORANGE)
+                return
+
+            if debounce:
+                await asyncio.sleep(debounce)
+                if gen != search_state["gen"]:
+                    return
+
+            # время после паузы ввода: сама пауза в замер не входит
+            with perf.timer("handler", "load_request"):
+                # без выбранной колонки результаты поиска идут по релевантности
+                sort = search_state["sort"] or (paging.RANK if query.strip() else "number")
+                pager = paging.RequestPager(engine, query, sort=sort,
+                                            descending=search_state["descending"],
+                                            archive=search_state["archive"])
+                counts = {}
+                try:
+                    loaded = await workers.run_db(load_page, pager, pager.load_next, cancel, counts)
+                except Exception as ex:
+                    show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
+                    return
+                if loaded is None or gen != search_state["gen"]:
+                    return
+
+                search_state["pager"] = pager
+                search_state["counts"] = counts
+                search_state["selected"].clear()
+                show_selected()
+                render_requests(pager.rows)
+                page.update()
+                await view_column.scroll_to(offset=0)
+
+        async def on_view_scroll(e):
+            """догрузка страниц при прокрутке к краю таблицы"""
+            pager = search_state["pager"]
+            if pager is None or search_state["busy"]:
+                return
+            if e.pixels >= e.max_scroll_extent - SCROLL_EDGE and not pager.at_end:
+                load = pager.load_next
+            elif e.pixels <= e.min_scroll_extent + SCROLL_EDGE and not pager.at_start:
+                load = pager.load_prev
+            else:
+                return
+
+            gen, cancel = search_state["gen"], search_state["cancel"]
+            first = pager.pages[0][0]
+            search_state["busy"] = True
+            with perf.timer("handler", "on_view_scroll"):
+                try:
+                    loaded = await workers.run_db(load_page, pager, load, cancel, search_state["counts"])
+                finally:
+                    search_state["busy"] = False
+                if not loaded or gen != search_state["gen"]:
+                    return
+
+                render_requests(pager.rows)
+                page.update()
+                # строки сверху добавились/убрались — сдвигаем прокрутку, чтобы не прыгало
+                shift = first - pager.pages[0][0]
+                if shift:
+                    await view_column.scroll_to(delta=shift * ROW_HEIGHT)
+
+        def on_sort(e):
+            search_state["sort"] = list(paging.SORT_COLUMNS)[e.column_index]
+            search_state["descending"] = not e.ascending
+            check_status.sort_column_index = e.column_index
+            check_status.sort_ascending = e.ascending
+            page.run_task(load_request, search_field.value or "", 0)
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def status_complete(e):
+            """Показывает количество выполненных заявок (только для админа)"""
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+
+            count = await workers.run_db(requests_svc.status_count, stats.DONE)
+
+            show_msg(f"Выполнено заявок: {count}", ft.Colors.BLUE)
+            return count
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def bulk_apply(e):
+            """статус/исполнитель всем отмеченным заявкам одной транзакцией"""
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+            fields = {}
+            if bulk_status.value:
+                fields["status"] = bulk_status.value
+            if bulk_assignee.value:
+                fields["assigned_to"] = bulk_assignee.value.strip()
+            try:
+                results = await workers.run_db(requests_svc.bulk_update, list(search_state["selected"]), **fields)
+            except ValueError as ex:
+                show_msg(str(ex), ft.Colors.RED)
+                return
+            except Exception as ex:
+                show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
+                return
+            # строки таблицы поправит подписка на живые изменения
+            search_state["selected"].clear()
+            for row in check_status.rows:
+                row.selected = False
+            show_selected()
+            updated = sum(r == UPDATED for r in results.values())
+            unchanged = sum(r == UNCHANGED for r in results.values())
+            missing = len(results) - updated - unchanged
+            show_msg(
+                f"Обновлено: {updated}, без изменений: {unchanged}"
+                + (f", не найдено: {missing}" if missing else ""),
+                ft.Colors.GREEN if not missing else ft.Colors.ORANGE,
             )
 
-    page.update()
-    
-    def status_complete(e):
-        """Показывает количество выполненных заявок (только для админа)"""
-        if not is_admin():
-            show_msg("Только для администратора", ft.Colors.ORANGE)
-            return
-        
-        with Session(engine) as session:
-            count = session.exec(
-                select(func.count()).where(Request.status == "выполнено")
-            ).one()
-        
-        show_msg(f"Выполнено заявок: {count}", ft.Colors.BLUE)
-        return count
-
-    
-    add_button = ft.Button(
-        "Добавить заявку",
-        on_click=add_request_handler,
-        width=200
-    )
+        check_status=ft.DataTable(
+            columns=[
+                ft.DataColumn(label="№", on_sort=on_sort),
+                ft.DataColumn(label="create_at", on_sort=on_sort),
+                ft.DataColumn(label="оборудование", on_sort=on_sort),
+                ft.DataColumn(label="fail_type", on_sort=on_sort),
+                ft.DataColumn(label="client", on_sort=on_sort),
+                ft.DataColumn(label="status", on_sort=on_sort),
+                ft.DataColumn(label="assigned_to", on_sort=on_sort),
+                ft.DataColumn(label="комментарии", numeric=True),
+                ],
+            data_row_min_height=ROW_HEIGHT,
+            data_row_max_height=ROW_HEIGHT,
+            show_checkbox_column=True,
+            on_select_all=on_select_all,
+            )
+
+        selected_text = ft.Text("Выбрано: 0")
+        bulk_status = ft.Dropdown(
+            label="Новый статус",
+            width=200,
+            border_color="#2095FE",
+            options=[ft.dropdown.Option(status) for status in STATUSES],
+        )
+        bulk_assignee = ft.TextField(label="Новый исполнитель", width=200, border_color="#2095FE")
+        bulk_button = ft.Button(
+            "Применить к выбранным",
+            on_click=bulk_apply,
+            width=220,
+            disabled=True,
+        )
+
+        search_field = ft.TextField(
+            label="search (number, client, equipment)",
+            on_change=lambda e: page.run_task(load_request, search_field.value)
+        )
+
+        def on_archive_toggle(e):
+            search_state["archive"] = archive_checkbox.value
+            page.run_task(load_request, search_field.value or "", 0)
+
+        # у базы в памяти архива нет
+        archive_checkbox = ft.Checkbox(
+            label="с архивом",
+            value=False,
+            disabled=not archive.enabled(engine),
+            on_change=on_archive_toggle,
+        )
+
+
+        btn_done_count = ft.Button(
+            "Показать выполненные заявки",
+            on_click=status_complete,
+            width=200
+        )
+
+        view_column = ft.Column(
+            [
+                ft.Row(
+                    [
+                        search_field,
+                        archive_checkbox,
+                    ],
+                    alignment=ft.MainAxisAlignment.CENTER
+                ),
+                ft.Row(
+                    [
+                        selected_text,
+                        bulk_status,
+                        bulk_assignee,
+                        bulk_button,
+                    ],
+                    alignment=ft.MainAxisAlignment.CENTER
+                ),
+                ft.Divider(),
+                check_status,
+                btn_done_count
+            ],
+            expand=True,
+            scroll=ft.ScrollMode.AUTO,
+            on_scroll=on_view_scroll,
+            scroll_interval=100,
+        )
+
+        # выход посреди поиска: результат уже не рисуем
+        ui_state["on_release"].append(new_search)
+        if is_admin():
+            subscription = live.broker.subscribe(engine, lambda: page.run_task(apply_changes))
+            ui_state["on_release"].append(subscription.close)
+            page.run_task(load_request, "", 0)
+
+        return ft.Container(
+            content=view_column,
+            padding=20
+        )
 
     # ---------- EDIT REQUEST UI ----------
-    edit_id_field = ft.TextField(label="ID заявки", width=200, border_color="#2095FE")
-    edit_equipment_field = ft.TextField(label="Оборудование", width=250, border_color="#2095FE")
-    edit_fault_field = ft.TextField(label="Тип неисправности", width=250, border_color="#2095FE")
-    edit_client_field = ft.TextField(label="Клиент", width=250, border_color="#2095FE")
-    edit_status_field = ft.Dropdown(
-        label="Статус",
-        width=250,
-        border_color="#2095FE",
-        options=[
-            ft.dropdown.Option("в ожидании"),
-            ft.dropdown.Option("в работе"),
-            ft.dropdown.Option("выполнено"),
-        ]
-    )
-    edit_description_field = ft.TextField(
-        label="Описание проблемы",
-        multiline=True,
-        min_lines=3,
-        max_lines=5,
-        width=760,
-        border_color="#2095FE"
-    )
-    edit_assigned_field = ft.TextField(label="Исполнитель", width=250, border_color="#2095FE")
-
-    check_status=ft.DataTable(
-        columns=[
-            ft.DataColumn(label="№"),
-            ft.DataColumn(label="create_at"),
-            ft.DataColumn(label="оборудование"),
-            ft.DataColumn(label="fail_type"),
-            ft.DataColumn(label="client"),
-            ft.DataColumn(label="status"),
-            ft.DataColumn(label="assigned_to")
+    def build_edit_tab():
+        edit_id_field = ft.TextField(label="ID заявки", width=200, border_color="#2095FE")
+        edit_equipment_field = ft.TextField(label="Оборудование", width=250, border_color="#2095FE")
+        edit_fault_field = ft.TextField(label="Тип неисправности", width=250, border_color="#2095FE")
+        edit_client_field = ft.TextField(label="Клиент", width=250, border_color="#2095FE")
+        edit_status_field = ft.Dropdown(
+            label="Статус",
+            width=250,
+            border_color="#2095FE",
+            options=[
+                ft.dropdown.Option("в ожидании"),
+                ft.dropdown.Option("в работе"),
+                ft.dropdown.Option("выполнено"),
             ]
         )
+        edit_description_field = ft.TextField(
+            label="Описание проблемы",
+            multiline=True,
+            min_lines=3,
+            max_lines=5,
+            width=760,
+            border_color="#2095FE"
+        )
+        edit_assigned_field = ft.TextField(label="Исполнитель", width=250, border_color="#2095FE")
 
-    search_field = ft.TextField(
-        label="search (number, client, equipment)",
-        on_change=lambda e: load_request(search_field.value)
-    )
-    
-
-    btn_done_count = ft.Button(
-        "Показать выполненные заявки",
-        on_click=status_complete,
-        width=200
-    )
-    
-    def load_request_for_edit(e):
-        if not is_admin():
-            show_msg("Only admin function", ft.Colors.ORANGE)
-            return                                           #Загрузить данные зая  вки для редактирования
-        
-        if not edit_id_field.value:
-            show_msg("Введите ID заявки", ft.Colors.RED)
-            return
-        
-        try:
-            request_id = int(edit_id_field.value)
-            with Session(engine) as session:
-                request = session.get(Request, request_id)
+        @single_flight(app_progress)
+        @perf.timed
+        async def load_request_for_edit(e):
+            if not is_admin():
+                show_msg("Only admin function", ft.Colors.ORANGE)
+                return                                           #Загрузить данные зая  вки для редактирования
+
+            if not edit_id_field.value:
+                show_msg("Введите ID заявки", ft.Colors.RED)
+                return
+
+            try:
+                request_id = int(edit_id_field.value)
+                request = await workers.run_db(requests_svc.get, request_id)
+                archived = None
                 if not request:
-                    show_msg(f"Заявка с ID {request_id} не найдена", ft.Colors.RED)
-                    return
-                
+                    archived = await workers.run_db(requests_svc.get_archived, request_id)
+                    if not archived:
+                        show_msg(f"Заявка с ID {request_id} не найдена", ft.Colors.RED)
+                        return
+                    request = SimpleNamespace(**archived)
+
                 # Заполняем поля данными из БД
+                hide_suggestions(suggestion_boxes)
                 edit_equipment_field.value = request.equipment
                 edit_fault_field.value = request.fault_type
                 edit_client_field.value = request.client
                 edit_description_field.value = request.description
                 edit_status_field.value = request.status
                 edit_assigned_field.value = request.assigned_to
-                
-                show_msg(f"Заявка #{request.number} загружена", ft.Colors.GREEN)
+                # заявку из архива сначала возвращают, потом правят
+                edit_button.disabled = archived is not None
+                restore_button.visible = archived is not None
+
+                await show_history(request_id)
+                if archived:
+                    show_msg(f"Заявка #{request.number} в архиве с {archived['archived_at']}", ft.Colors.BLUE)
+                else:
+                    show_msg(f"Заявка #{request.number} загружена", ft.Colors.GREEN)
                 page.update()
-                
-        except ValueError:
-            show_msg("ID должен быть числом", ft.Colors.RED)
-        except Exception as ex:
-            show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
-
-    def edit_request_handler(e):
-        if not is_admin():
-            show_msg("Only admin function", ft.Colors.ORANGE)
-            return
-        
-        if not edit_id_field.value:
-            show_msg("Введите ID заявки", ft.Colors.RED)
-            return
-        
-        try:
-            request_id = int(edit_id_field.value)
-            
-            with Session(engine) as session:
-                request = session.get(Request, request_id)
-                if not request:
+
+            except ValueError:
+                show_msg("ID должен быть числом", ft.Colors.RED)
+            except Exception as ex:
+                show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
+
+        edit_history = ft.Column(spacing=4, width=760)
+
+        async def show_history(request_id):
+            """история статусов и исполнителей под формой редактирования"""
+            events = await workers.run_db(requests_svc.history, request_id)
+            edit_history.controls = [ft.Text("История", size=18, color="WHITE")] + [
+                ft.Text(f"{at}  {status}  {assigned_to or '—'}") for at, status, assigned_to in events
+            ]
+            page.update()
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def edit_request_handler(e):
+            if not is_admin():
+                show_msg("Only admin function", ft.Colors.ORANGE)
+                return
+
+            if not edit_id_field.value:
+                show_msg("Введите ID заявки", ft.Colors.RED)
+                return
+
+            try:
+                request_id = int(edit_id_field.value)
+
+                # Обновляем данные
+                number = await workers.run_db(
+                    requests_svc.update,
+                    request_id,
+                    equipment=edit_equipment_field.value,
+                    fault_type=edit_fault_field.value,
+                    client=edit_client_field.value,
+                    description=edit_description_field.value,
+                    status=edit_status_field.value,
+                    assigned_to=edit_assigned_field.value,
+                )
+                if number is None:
                     show_msg(f"Заявка с ID {request_id} не найдена", ft.Colors.RED)
                     return
-                
-                # Обновляем данные
-                request.equipment = edit_equipment_field.value
-                request.fault_type = edit_fault_field.value
-                request.client = edit_client_field.value
-                request.description = edit_description_field.value
-                request.status = edit_status_field.value
-                request.assigned_to = edit_assigned_field.value
-                
-                session.add(request)
-                session.commit()
-                
-                show_msg(f"Заявка №{request.number} успешно обновлена!", ft.Colors.GREEN)
-                
-        except ValueError:
-            show_msg("ID должен быть числом", ft.Colors.RED)
-        except Exception as ex:
-            show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
-
-    load_button = ft.Button(
-        "Загрузить",
-        on_click=load_request_for_edit,
-        width=200
-    )
-
-    edit_button = ft.Button(
-        "Сохранить изменения",
-        on_click=edit_request_handler,
-        width=200
-    )
+
+                hide_suggestions(suggestion_boxes)
+                await show_history(request_id)
+                show_msg(f"Заявка №{number} успешно обновлена!", ft.Colors.GREEN)
+
+            except ValueError:
+                show_msg("ID должен быть числом", ft.Colors.RED)
+            except Exception as ex:
+                show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def restore_request_handler(e):
+            if not is_admin():
+                show_msg("Only admin function", ft.Colors.ORANGE)
+                return
+            try:
+                request_id = int(edit_id_field.value)
+                number = await workers.run_db(requests_svc.restore, request_id)
+                if number is None:
+                    show_msg(f"Заявки с ID {request_id} нет в архиве", ft.Colors.RED)
+                    return
+                edit_button.disabled = False
+                restore_button.visible = False
+                show_msg(f"Заявка №{number} возвращена из архива", ft.Colors.GREEN)
+                page.update()
+            except ValueError:
+                show_msg("ID должен быть числом", ft.Colors.RED)
+            except Exception as ex:
+                show_msg(f"Ошибка: {str(ex)}", ft.Colors.RED)
+
+        load_button = ft.Button(
+            "Загрузить",
+            on_click=load_request_for_edit,
+            width=200
+        )
+
+        restore_button = ft.Button(
+            "Вернуть из архива",
+            on_click=restore_request_handler,
+            width=200,
+            visible=False,
+        )
+
+        suggestion_boxes = []
+
+        edit_button = ft.Button(
+            "Сохранить изменения",
+            on_click=edit_request_handler,
+            width=200
+        )
+
+        return ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    edit_id_field,
+                    load_button
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    with_suggestions(edit_equipment_field, "equipment", suggestion_boxes),
+                    with_suggestions(edit_fault_field, "fault_type", suggestion_boxes),
+                    with_suggestions(edit_client_field, "client", suggestion_boxes)
+                ], alignment=ft.MainAxisAlignment.CENTER, vertical_alignment=ft.CrossAxisAlignment.START),
+                ft.Row([
+                    edit_status_field,
+                    with_suggestions(edit_assigned_field, "assigned_to", suggestion_boxes),
+                    ft.Container(width=250)
+                ], alignment=ft.MainAxisAlignment.CENTER, vertical_alignment=ft.CrossAxisAlignment.START),
+                ft.Row([
+                    edit_description_field
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    edit_button,
+                    restore_button
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    edit_history
+                ], alignment=ft.MainAxisAlignment.CENTER)
+            ], spacing=20, scroll=ft.ScrollMode.AUTO),
+            alignment=ft.Alignment.CENTER,
+            padding=20,
+        )
 
     # ---------- COMMENT UI ----------
-    comment_id_field = ft.TextField(label="ID заявки", width=250, border_color="#2095FE")
-    comment_author = ft.TextField(label="Автор", width=250, border_color="#2095FE")
-    comment_text = ft.TextField(label="Комментарий", multiline=True, min_lines=3, width=250, border_color="#2095FE")
+    def build_comment_tab():
+        comment_id_field = ft.TextField(label="ID заявки", width=250, border_color="#2095FE")
+        comment_author = ft.TextField(label="Автор", width=250, border_color="#2095FE")
+        comment_text = ft.TextField(label="Комментарий", multiline=True, min_lines=3, width=250, border_color="#2095FE")
 
-    def add_comment_handler(e):
-        if not comment_id_field.value:
-            show_msg("Введите ID заявки", ft.Colors.RED)
-            return
-        
-        if not comment_author.value:
-            show_msg("Введите автора", ft.Colors.RED)
-            return
-        
-        if not comment_text.value:
-            show_msg("Введите текст комментария", ft.Colors.RED)
-            return
-        
-        try:
-            with Session(engine) as session:
-                # Проверяем существование заявки
-                request = session.get(Request, int(comment_id_field.value))
-                if not request:
+        comment_state = {"request_id": None, "last_id": None, "at_end": True, "busy": False}
+
+        def comment_tile(comment):
+            return ft.ListTile(
+                title=ft.Text(comment.text),
+                subtitle=ft.Text(f"{comment.author} · {comment.created_at}"),
+            )
+
+        async def load_comments_page():
+            """следующая страница ленты комментариев открытой заявки"""
+            if comment_state["busy"] or comment_state["at_end"]:
+                return
+            request_id = comment_state["request_id"]
+            comment_state["busy"] = True
+            try:
+                comments = await workers.run_db(comments_svc.page, request_id, comment_state["last_id"])
+            finally:
+                comment_state["busy"] = False
+            if request_id != comment_state["request_id"]:
+                return  # пока грузили, открыли другую заявку
+            comment_timeline.controls.extend(comment_tile(c) for c in comments)
+            if comments:
+                comment_state["last_id"] = comments[-1].id
+            comment_state["at_end"] = len(comments) < COMMENT_PAGE
+            page.update()
+
+        async def open_timeline(request_id):
+            comment_state.update(request_id=request_id, last_id=None, at_end=False, busy=False)
+            comment_timeline.controls.clear()
+            await load_comments_page()
+
+        async def on_timeline_scroll(e):
+            if e.pixels >= e.max_scroll_extent - SCROLL_EDGE:
+                await load_comments_page()
+
+        comment_timeline = ft.ListView(
+            spacing=8,
+            height=300,
+            width=760,
+            on_scroll=on_timeline_scroll,
+            scroll_interval=100,
+        )
+
+        @perf.timed
+        async def show_comments_handler(e):
+            try:
+                request_id = int(comment_id_field.value)
+            except (TypeError, ValueError):
+                show_msg("ID заявки должен быть числом", ft.Colors.RED)
+                return
+            try:
+                await open_timeline(request_id)
+            except Exception as ex:
+                show_msg(f"Ошибка: {ex}", ft.Colors.RED)
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def add_comment_handler(e):
+            if not comment_id_field.value:
+                show_msg("Введите ID заявки", ft.Colors.RED)
+                return
+
+            if not comment_author.value:
+                show_msg("Введите автора", ft.Colors.RED)
+                return
+
+            if not comment_text.value:
+                show_msg("Введите текст комментария", ft.Colors.RED)
+                return
+
+            try:
+                comment_id = await workers.run_db(
+                    comments_svc.add,
+                    int(comment_id_field.value),
+                    comment_author.value,
+                    comment_text.value,
+                )
+                if comment_id is None:
                     show_msg(f"Заявка с ID {comment_id_field.value} не найдена", ft.Colors.RED)
                     return
-                
-                comment = Comment(
-                    request_id=int(comment_id_field.value),
-                    author=comment_author.value,
-                    text=comment_text.value
-                )
-                session.add(comment)
-                session.commit()
 
-                show_msg(f"Комментарий #{comment.id} успешно добавлен!", ft.Colors.GREEN)
+                show_msg(f"Комментарий #{comment_id} успешно добавлен!", ft.Colors.GREEN)
 
                 # Очищаем поля
                 comment_author.value = ""
                 comment_text.value = ""
-                
+
+                # лента этой заявки открыта и догружена до конца — новый комментарий дописываем
+                if comment_state["request_id"] == int(comment_id_field.value) and comment_state["at_end"]:
+                    comment_state["at_end"] = False
+                    await load_comments_page()
+
                 page.update()
 
-        except ValueError:
-            show_msg("ID заявки должен быть числом", ft.Colors.RED)
-        except Exception as ex:
-            show_msg(f"Ошибка: {ex}", ft.Colors.RED)
+            except ValueError:
+                show_msg("ID заявки должен быть числом", ft.Colors.RED)
+            except Exception as ex:
+                show_msg(f"Ошибка: {ex}", ft.Colors.RED)
 
-    comment_button = ft.Button(
-        "Добавить комментарий",
-        on_click=add_comment_handler,
-        width=200
-    )
+        comment_button = ft.Button(
+            "Добавить комментарий",
+            on_click=add_comment_handler,
+            width=200
+        )
 
-    # ---------- APP VIEW ----------
-    app_view = ft.Tabs(
-        length=4,
-        expand=True,
-        content=ft.Column(
-            expand=True,
-            controls=[
-                ft.TabBar(
-                    tabs=[
-                        ft.Tab(label="ДОБАВИТЬ", icon=ft.Icons.ADD),
-                        ft.Tab(label="РЕДАКТИРОВАТЬ", icon=ft.Icons.EDIT),
-                        ft.Tab(label="КОММЕНТАРИИ", icon=ft.Icons.COMMENT),
-                        ft.Tab(label="view", icon=ft.Icons.VIEW_AGENDA)
-                    ]
+        show_comments_button = ft.Button(
+            "Показать комментарии",
+            on_click=show_comments_handler,
+            width=200
+        )
+
+        return ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    comment_id_field
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    comment_author
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    comment_text
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    comment_button,
+                    show_comments_button
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([
+                    comment_timeline
+                ], alignment=ft.MainAxisAlignment.CENTER)
+            ], spacing=20, scroll=ft.ScrollMode.AUTO),
+            alignment=ft.Alignment.CENTER,
+            padding=20,
+        )
+
+    # ---------- STATS UI ----------
+    def stats_table(columns, rows):
+        return ft.DataTable(
+            columns=[ft.DataColumn(label=c) for c in columns],
+            rows=[ft.DataRow(cells=[ft.DataCell(ft.Text(str(v))) for v in row]) for row in rows],
+        )
+
+    def build_stats_tab():
+        stats_column = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO, spacing=20)
+
+        async def refresh_stats():
+            snap = await workers.run_db(requests_svc.stats)
+            sla = await workers.run_db(requests_svc.sla)
+            cache_stats = requests_svc.cache_metrics()
+            stats_column.controls = [
+                ft.Row([refresh_stats_button, check_stats_button, archive_button],
+                       alignment=ft.MainAxisAlignment.CENTER),
+                ft.Text("По статусам", size=18, color="WHITE"),
+                stats_table(["статус", "заявок"], snap["status"].items()),
+                ft.Text("В архиве", size=18, color="WHITE"),
+                stats_table(["статус", "заявок"], snap["archived"].items()),
+                ft.Text("Открытые заявки по исполнителям", size=18, color="WHITE"),
+                stats_table(["исполнитель", "открыто"], snap["assignee"]),
+                ft.Text("По дням", size=18, color="WHITE"),
+                stats_table(["день", "принято", "выполнено"], snap["days"]),
+                ft.Text("Неисправности по оборудованию", size=18, color="WHITE"),
+                stats_table(["оборудование", "неисправность", "заявок"], snap["equipment"]),
+                ft.Text("Среднее время в статусе", size=18, color="WHITE"),
+                stats_table(["статус", "часов", "переходов"], sla["status_time"]),
+                ft.Text("Выполнение по месяцам", size=18, color="WHITE"),
+                stats_table(["месяц", "выполнено", "дней до выполнения"], sla["completion"]),
+                ft.Text("Открытые заявки", size=18, color="WHITE"),
+                stats_table(["статус", "заявок", "средний возраст, дней"], sla["backlog"]),
+                ft.Text("Кэш чтения", size=18, color="WHITE"),
+                stats_table(
+                    ["кэш", "включён", "записей", "попаданий", "промахов", "доля попаданий"],
+                    [(name, *m.values()) for name, m in cache_stats.items()],
                 ),
-                ft.TabBarView(
-                    expand=True,
-                    controls=[
-                        # ВКЛАДКА ДОБАВЛЕНИЯ
-                        ft.Container(
-                            content=ft.Column([
-                                ft.Row([
-                                    equipment_field, 
-                                    fault_field, 
-                                    client_field
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    status_field, 
-                                    assigned_field, 
-                                    ft.Container(width=250)  # Пустой контейнер для выравнивания
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    description_field
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    add_button
-                                ], alignment=ft.MainAxisAlignment.CENTER)
-                            ], spacing=20),
-                            alignment=ft.Alignment.CENTER,
-                            padding=20,
-                        ),
-
-                        # ВКЛАДКА РЕДАКТИРОВАНИЯ
-                        ft.Container(
-                            content=ft.Column([
-                                ft.Row([
-                                    edit_id_field,
-                                    load_button
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    edit_equipment_field, 
-                                    edit_fault_field, 
-                                    edit_client_field
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    edit_status_field, 
-                                    edit_assigned_field,
-                                    ft.Container(width=250)
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    edit_description_field
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    edit_button
-                                ], alignment=ft.MainAxisAlignment.CENTER)
-                            ], spacing=20),
-                            alignment=ft.Alignment.CENTER,
-                            padding=20,
-                        ),
-
-                        # ВКЛАДКА КОММЕНТАРИЕВ
-                        ft.Container(
-                            content=ft.Column([
-                                ft.Row([
-                                    comment_id_field
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    comment_author
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    comment_text
-                                ], alignment=ft.MainAxisAlignment.CENTER),
-                                ft.Row([
-                                    comment_button
-                                ], alignment=ft.MainAxisAlignment.CENTER)
-                            ], spacing=20),
-                            alignment=ft.Alignment.CENTER,
-                            padding=20,
-                        ),
-                        ft.Container(
-                            content=ft.Column(
-                                [
-                                    ft.Row(
-                                        [
-                                            search_field,
-                                        ],
-                                        alignment=ft.MainAxisAlignment.CENTER
-                                    ),
-                                    ft.Divider(),
-                                    check_status,
-                                    btn_done_count
-                                ],
-                                expand=True,
-                                scroll=ft.ScrollMode.AUTO
-                            ),
-                            padding=20
-                        )
-                    ],
+            ]
+            page.update()
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def load_stats(e):
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+            await refresh_stats()
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def check_stats(e):
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+            diff = await workers.run_db(stats.check, engine)
+            if not diff:
+                show_msg("Счётчики сходятся с заявками", ft.Colors.GREEN)
+                return
+            show_msg(f"Расхождения в счётчиках: {diff}", ft.Colors.ORANGE)
+
+        @single_flight(app_progress)
+        @perf.timed
+        async def archive_closed(e):
+            if not is_admin():
+                show_msg("Только для администратора", ft.Colors.ORANGE)
+                return
+            moved = await workers.run_db(requests_svc.archive_closed)
+            show_msg(f"Перенесено в архив: {moved}", ft.Colors.GREEN)
+            await refresh_stats()
+
+        refresh_stats_button = ft.Button("Обновить", on_click=load_stats, width=200)
+        check_stats_button = ft.Button("Сверить счётчики", on_click=check_stats, width=200)
+        archive_button = ft.Button(
+            f"В архив (старше {archive.ARCHIVE_DAYS} дн.)",
+            on_click=archive_closed,
+            width=200,
+            disabled=not archive.enabled(engine),
+        )
+        stats_column.controls = [
+            ft.Row([refresh_stats_button, check_stats_button, archive_button],
+                   alignment=ft.MainAxisAlignment.CENTER),
+        ]
+        page.run_task(refresh_stats)
+
+        return ft.Container(
+            content=stats_column,
+            padding=20
+        )
+
+    # ---------- PERF UI ----------
+    PERF_COLUMNS = ["count", "mean_ms", "p50_ms", "p95_ms", "max_ms", "total_ms"]
+
+    def perf_table(rows, with_rows=False):
+        columns = PERF_COLUMNS + (["rows"] if with_rows else [])
+        return stats_table(
+            ["имя", *columns],
+            [(r["name"], *(r[c] for c in columns)) for r in rows],
+        )
+
+    def build_perf_tab():
+        perf_column = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO, spacing=20)
+
+        def refresh_perf():
+            snap = perf.snapshot()
+            perf_column.controls = [
+                ft.Row([refresh_perf_button, reset_perf_button, dump_perf_button],
+                       alignment=ft.MainAxisAlignment.CENTER),
+                ft.Text("Обработчики (всё время, с базой, хешем и отрисовкой)", size=18, color="WHITE"),
+                perf_table(snap.get("handler", [])),
+                ft.Text("Запросы SQL (самые затратные)", size=18, color="WHITE"),
+                perf_table(snap.get("sql", []), with_rows=True),
+                ft.Text("Хеширование паролей", size=18, color="WHITE"),
+                perf_table(snap.get("hash", [])),
+                ft.Text("Старт: импорт, схема, первый экран", size=18, color="WHITE"),
+                perf_table(snap.get("startup", [])),
+                ft.Text("Ожидание потока в пулах", size=18, color="WHITE"),
+                perf_table(snap.get("pool", [])),
+                ft.Text(f"Медленные запросы (от {perf.SLOW_QUERY_MS:g} мс)", size=18, color="WHITE"),
+                stats_table(
+                    ["время", "мс", "запрос", "план"],
+                    [(s["at"], s["ms"], s["statement"][:120], " | ".join(s["plan"])) for s in snap["slow"]],
                 ),
-            ],
-        ),
-    )
-
-    # ---------- LOGOUT BUTTON ----------
-    logout_button = ft.IconButton(
-        icon=ft.Icons.LOGOUT,
-        icon_color="white",
-        on_click=lambda e: show_auth(),
-        tooltip="Выйти"
-    )
-
-    # Добавляем кнопку выхода в app_view
-    app_view_with_logout = ft.Column([
-        ft.Row([logout_button], alignment=ft.MainAxisAlignment.END),
-        app_view
-    ], expand=True)
+            ]
+            page.update()
+
+        @admin_only
+        async def load_perf(e):
+            refresh_perf()
+
+        @admin_only
+        async def reset_perf(e):
+            perf.reset()
+            refresh_perf()
+
+        @admin_only
+        async def dump_perf(e):
+            try:
+                path = await workers.run_db(perf.dump)
+            except OSError as ex:
+                show_msg(f"Ошибка: {ex}", ft.Colors.RED)
+                return
+            show_msg(f"Сохранено: {path}", ft.Colors.GREEN)
+
+        refresh_perf_button = ft.Button("Обновить", on_click=load_perf, width=200)
+        reset_perf_button = ft.Button("Сбросить", on_click=reset_perf, width=200)
+        dump_perf_button = ft.Button("Сохранить JSON", on_click=dump_perf, width=200)
+        perf_column.controls = [
+            ft.Row([refresh_perf_button, reset_perf_button, dump_perf_button],
+                   alignment=ft.MainAxisAlignment.CENTER),
+        ]
+
+        return ft.Container(
+            content=perf_column,
+            padding=20
+        )
+
+    # ---------- APP VIEW ----------
+    TABS = [
+        ("ДОБАВИТЬ", ft.Icons.ADD, build_add_tab),
+        ("РЕДАКТИРОВАТЬ", ft.Icons.EDIT, build_edit_tab),
+        ("КОММЕНТАРИИ", ft.Icons.COMMENT, build_comment_tab),
+        ("view", ft.Icons.VIEW_AGENDA, build_view_tab),
+        ("СТАТИСТИКА", ft.Icons.INSIGHTS, build_stats_tab),
+        ("ПРОИЗВОДИТЕЛЬНОСТЬ", ft.Icons.SPEED, build_perf_tab),
+    ]
+    ADMIN_TABS = (1, 4, 5)
+
+    # места под вкладки текущего входа и что сделать при выходе
+    ui_state = {"tab_view": None, "on_release": []}
+
+    def open_tab(index):
+        """вкладка строится при первом открытии; чужие по роли — никогда"""
+        slot = ui_state["tab_view"].controls[index]
+        if slot.content is not None or (index in ADMIN_TABS and not is_admin()):
+            return
+        label, _, build = TABS[index]
+        with perf.timer("handler", f"open_tab {label}"):
+            slot.content = build()
+
+    def on_tab_change(e):
+        open_tab(e.control.selected_index)
+        page.update()
+
+    def build_app_view():
+        ui_state["tab_view"] = ft.TabBarView(
+            expand=True,
+            controls=[ft.Container(expand=True) for _ in TABS],  # содержимое — в open_tab
+        )
+        tab_bar = ft.TabBar(
+            tabs=[
+                ft.Tab(label=label, icon=icon, disabled=index in ADMIN_TABS and not is_admin())
+                for index, (label, icon, _) in enumerate(TABS)
+            ]
+        )
+        app_view = ft.Tabs(
+            length=len(TABS),
+            expand=True,
+            on_change=on_tab_change,
+            content=ft.Column(
+                expand=True,
+                controls=[
+                    tab_bar,
+                    ui_state["tab_view"],
+                ],
+            ),
+        )
+
+        # ---------- LOGOUT BUTTON ----------
+        logout_button = ft.IconButton(
+            icon=ft.Icons.LOGOUT,
+            icon_color="white",
+            on_click=lambda e: page.run_task(logout),
+            tooltip="Выйти"
+        )
+
+        # Добавляем кнопку выхода в app_view
+        return ft.Column([
+            ft.Row([logout_button], alignment=ft.MainAxisAlignment.END),
+            app_progress,
+            app_view
+        ], expand=True)
+
+    def release_app():
+        """выход: дерево вкладок с полями, состоянием и обработчиками больше не держим"""
+        for release in ui_state["on_release"]:
+            release()
+        ui_state.update(tab_view=None, on_release=[])
 
     # ---------- NAV ----------
-    def show_auth():
+    async def logout():
+        nonlocal current_user, session_token
+        users_svc.logout(session_token)
+        session_token = None
+        current_user = None
+        await store_token(None)
+        show_auth()
+
+    def show(view):
         page.controls.clear()
-        page.add(auth_view)
+        page.add(view)
         page.update()
 
+    def show_auth():
+        release_app()
+        show(build_auth_view())
+
     def show_app():
-        page.controls.clear()
-        page.add(app_view_with_logout)
-        page.update()
-        
-        if hasattr(app_view, 'tab_bar') and app_view.tab_bar and hasattr(app_view.tab_bar, 'tabs'):
-            if len(app_view.tab_bar.tabs) > 1:
-                app_view.tab_bar.tabs[1].disabled = not is_admin()
+        view = build_app_view()
+        open_tab(0)
+        show(view)
+
+    # сессия истекла (вкладку закрыли давно): подписки на изменения больше не держим
+    page.on_close = lambda e: release_app()
+
+    # переподключение с действующим токеном — без повторной проверки пароля
+    session_token = await load_token()
+    user = await workers.run_db(users_svc.resolve_token, session_token)
+    if user:
+        start_session(user)
+        show_app()
+    else:
+        session_token = None
+        show_auth()
+    # от подключения сессии до первого отправленного экрана
+    perf.record("startup", "first_paint", (time.perf_counter() - session_started) * 1000)
 
-    show_auth()
 
-ft.run(main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.run(main)
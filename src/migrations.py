@@ -0,0 +1,157 @@
+from sqlalchemy import text
+
+import history
+import lookups
+import numbering
+import paging
+import search
+import stats
+
+# ===================== MIGRATIONS =====================
+# Версия схемы хранится в самой базе (PRAGMA user_version). При старте
+# выполняются все миграции новее текущей версии, каждая в своей транзакции
+# вместе с записью новой версии — упавшая миграция не оставляет базу
+# наполовину обновлённой. Шаги написаны идемпотентно: база, созданная
+# create_all по актуальным моделям, проходит их без изменений.
+#
+# Триггеры и индексы шагов 1, 3 и 4 описаны по актуальной схеме заявок (id
+# справочников). Старая база со строковыми колонками проходит эти шаги без
+# них, а создаёт их шаг 6 — после перевода таблиц на id.
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _v1_search_paging_counter(conn):
+    """FTS-индекс, индексы таблицы просмотра и счётчик номеров"""
+    numbering.create_counter(conn)
+    if not lookups.normalized(conn):
+        return
+    lookups.create_views(conn)
+    search.create_index(conn)
+    paging.create_indexes(conn)
+
+
+def _duplicates(conn, table, column):
+    return [row[0] for row in conn.execute(text(
+        f'SELECT {column} FROM "{table}" GROUP BY {column} HAVING count(*) > 1 LIMIT 10'
+    ))]
+
+
+def _v2_unique_and_comment_fk(conn):
+    """уникальные логин и номер заявки, индекс и внешний ключ comment.request_id"""
+    for table, column in (("user", "username"), ("request", "number")):
+        dups = _duplicates(conn, table, column)
+        if dups:
+            raise MigrationError(f"Повторяющиеся значения {table}.{column}: {dups}")
+    conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_user_username ON "user" (username)'))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_request_number ON request (number)"))
+
+    has_fk = conn.execute(text("SELECT 1 FROM pragma_foreign_key_list('comment')")).first()
+    if not has_fk:
+        # внешний ключ в SQLite добавляется только пересозданием таблицы
+        conn.execute(text("DROP INDEX IF EXISTS ix_comment_request_id"))
+        conn.execute(text("ALTER TABLE comment RENAME TO comment_old"))
+        conn.execute(text(
+            "CREATE TABLE comment (\n"
+            "\tid INTEGER NOT NULL, \n"
+            "\trequest_id INTEGER NOT NULL, \n"
+            "\tauthor VARCHAR NOT NULL, \n"
+            "\ttext VARCHAR NOT NULL, \n"
+            "\tcreated_at DATE NOT NULL, \n"
+            "\tPRIMARY KEY (id), \n"
+            "\tFOREIGN KEY(request_id) REFERENCES request (id) ON DELETE CASCADE\n"
+            ")"
+        ))
+        conn.execute(text(
+            "INSERT INTO comment (id, request_id, author, text, created_at) "
+            "SELECT id, request_id, author, text, created_at FROM comment_old "
+            "WHERE request_id IN (SELECT id FROM request)"
+        ))
+        # комментарии к несуществующим заявкам не теряем, а откладываем в сторону
+        orphans = conn.execute(text(
+            "SELECT count(*) FROM comment_old WHERE request_id NOT IN (SELECT id FROM request)"
+        )).scalar_one()
+        if orphans:
+            conn.execute(text(
+                "CREATE TABLE comment_orphan AS SELECT * FROM comment_old "
+                "WHERE request_id NOT IN (SELECT id FROM request)"
+            ))
+        conn.execute(text("DROP TABLE comment_old"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_comment_request_id ON comment (request_id)"))
+
+
+def _v3_stats(conn):
+    """счётчики статистики с триггерами"""
+    if lookups.normalized(conn):
+        stats.create_stats(conn)
+
+
+def _v4_history(conn):
+    """история статусов и исполнителей со сводками сроков"""
+    if lookups.normalized(conn):
+        history.create_history(conn)
+
+
+def _v5_archive_stats(conn):
+    """счётчик заявок, перенесённых в архив"""
+    stats.create_archived(conn)
+
+
+def _v6_lookups(conn):
+    """
+    клиент, оборудование, исполнитель и автор — id справочников вместо строк;
+    триггеры, FTS-индекс, индексы сортировки и счётчики — по новым колонкам
+    """
+    if not lookups.normalized(conn):
+        lookups.normalize(conn)
+    lookups.create_views(conn)
+    search.create_index(conn)
+    paging.create_indexes(conn)
+    stats.create_stats(conn)
+    history.create_history(conn)
+
+
+MIGRATIONS = [
+    (1, _v1_search_paging_counter),
+    (2, _v2_unique_and_comment_fk),
+    (3, _v3_stats),
+    (4, _v4_history),
+    (5, _v5_archive_stats),
+    (6, _v6_lookups),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def get_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar_one()
+
+
+def upgrade(engine, target: int = LATEST) -> int:
+    """применяет недостающие миграции; возвращает итоговую версию схемы"""
+    # AUTOCOMMIT отключает неявные транзакции pysqlite: BEGIN/COMMIT ставим сами,
+    # чтобы DDL и запись версии попали в одну транзакцию
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar_one()
+        conn.execute(text("PRAGMA foreign_keys = OFF"))  # на время пересоздания таблиц
+        try:
+            for number, migrate in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                conn.execute(text("BEGIN IMMEDIATE"))
+                try:
+                    migrate(conn)
+                    broken = conn.execute(text("PRAGMA foreign_key_check")).first()
+                    if broken:
+                        raise MigrationError(f"Нарушен внешний ключ после миграции {number}: {tuple(broken)}")
+                    conn.execute(text(f"PRAGMA user_version = {number}"))
+                    conn.execute(text("COMMIT"))
+                except Exception:
+                    conn.execute(text("ROLLBACK"))
+                    raise
+                version = number
+        finally:
+            conn.execute(text("PRAGMA foreign_keys = ON"))
+    return version
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+# ===================== REQUEST NUMBERS =====================
+# Номера заявок выдаются из таблицы-счётчика: UPDATE ... RETURNING
+# берёт блокировку записи сразу, поэтому две сессии не получат один номер,
+# а выдача номера и вставка заявки идут в одной транзакции.
+COUNTER_TABLE = "request_counter"
+FIRST_NUMBER = 1000  # номера начинаются с 1001, как и раньше
+
+
+def create_counter(conn):
+    """таблица-счётчик; при первом создании продолжает текущий max(number)"""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} "
+        "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+    ))
+    conn.execute(text(
+        f"INSERT OR IGNORE INTO {COUNTER_TABLE}(name, value) "
+        "SELECT 'request', coalesce(max(number), :first) FROM request"
+    ), {"first": FIRST_NUMBER})
+
+
+def allocate(conn, count: int = 1) -> int:
+    """
+    резервирует count номеров подряд в текущей транзакции conn;
+    возвращает первый из них. При откате транзакции номера возвращаются.
+    """
+    last = conn.execute(
+        text(f"UPDATE {COUNTER_TABLE} SET value = value + :n WHERE name = 'request' RETURNING value"),
+        {"n": count},
+    ).scalar_one()
+    return last - count + 1
@@ -0,0 +1,254 @@
+import threading
+from collections import namedtuple
+from typing import Optional
+
+from sqlalchemy import text
+
+import lookups
+from search import FTS_TABLE, build_match, run_cancellable
+from storage import ARCHIVE
+
+# ===================== KEYSET PAGING =====================
+# Таблица заявок грузится страницами: следующая страница ищется по ключу
+# (значение колонки сортировки, id) последней строки, а не через OFFSET,
+# поэтому каждая страница — короткий проход по индексу.
+PAGE_SIZE = 50
+WINDOW_PAGES = 4  # сколько страниц держим в таблице одновременно
+
+COLUMNS = "id, number, create_at, equipment, fault_type, client, status, assigned_to"
+Row = namedtuple("Row", COLUMNS)  # строка окна, пришедшая не из выборки (живые изменения)
+
+# колонка сортировки -> индекс под ORDER BY (col, id)
+SORT_COLUMNS = {
+    "number": "ix_request_number_id",
+    "create_at": "ix_request_create_at_id",
+    "equipment": "ix_request_equipment_id",
+    "fault_type": "ix_request_fault_type_id",
+    "client": "ix_request_client_id",
+    "status": "ix_request_status_id",
+    "assigned_to": "ix_request_assigned_to_id",
+}
+RANK = "rank"  # сортировка по релевантности (только при поиске по индексу)
+# с архивом (archive.py) каждая страница — по странице из обеих таблиц,
+# слитых UNION ALL: у каждой свои индексы, порядок и ключ те же
+#
+# В основной базе оборудование, клиент и исполнитель — id справочников
+# (lookups.py), строки читаются из представления с именами. Сортировка по
+# имени — проход по индексу имён справочника и по (id справочника, id) заявок;
+# ключ страницы для них — две ветки: «то же имя, id дальше» и «имя дальше».
+
+
+def _table(schema):
+    return "request" if schema == ARCHIVE else lookups.REQUEST_VIEW
+
+
+def create_indexes(conn, schema="main"):
+    """индексы под сортировки таблицы просмотра (они же — под фильтры по этим колонкам)"""
+    for column, index in SORT_COLUMNS.items():
+        key = column if schema == ARCHIVE else lookups.key(column)
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {schema}.{index} ON request ({key}, id)"))
+
+
+class RequestPager:
+    """окно страниц заявок для таблицы просмотра"""
+
+    def __init__(self, engine, search: str = "", sort: str = "number",
+                 descending: bool = False, page_size: int = PAGE_SIZE,
+                 window: int = WINDOW_PAGES, archive: bool = False):
+        search = search.strip()
+        self.engine = engine
+        self.schemas = ("main", ARCHIVE) if archive else ("main",)
+        self.match = build_match(search) if search else None
+        self.like = f"%{search}%" if search and not self.match else None
+        if sort == RANK and not self.match:
+            sort = "number"
+        if sort != RANK and sort not in SORT_COLUMNS:
+            raise ValueError(f"Неизвестная колонка сортировки: {sort}")
+        self.sort = sort
+        self.descending = descending
+        self.page_size = page_size
+        self.window = window
+        self.pages = []  # [(offset первой строки, строки)]
+        self.at_end = False
+        self._positions = None  # id -> (страница, строка, индекс в rows); None — пересчитать
+
+    @property
+    def rows(self):
+        return [row for _, rows in self.pages for row in rows]
+
+    @property
+    def at_start(self):
+        return not self.pages or self.pages[0][0] == 0
+
+    def load_next(self, cancel: Optional[threading.Event] = None) -> Optional[bool]:
+        """
+        догрузка страницы снизу; лишняя страница сверху выбрасывается.
+        True — окно изменилось, False — дальше строк нет, None — отменено.
+        """
+        if self.at_end:
+            return False
+        if self.pages:
+            offset, rows = self.pages[-1]
+            offset += len(rows)
+            after = rows[-1]
+        else:
+            offset, after = 0, None
+
+        rows = self._fetch(after=after, offset=offset, cancel=cancel)
+        if rows is None:
+            return None
+        self.at_end = len(rows) <= self.page_size
+        rows = rows[:self.page_size]
+        if not rows:
+            return False
+        self.pages.append((offset, rows))
+        if len(self.pages) > self.window:
+            self.pages.pop(0)
+        self._positions = None
+        return True
+
+    def load_prev(self, cancel: Optional[threading.Event] = None) -> Optional[bool]:
+        """догрузка страницы сверху (после прокрутки назад); лишняя снизу выбрасывается"""
+        if self.at_start:
+            return False
+        offset, rows = self.pages[0]
+        start = max(offset - self.page_size, 0)
+
+        rows = self._fetch(before=rows[0], offset=start, limit=offset - start, cancel=cancel)
+        if rows is None:
+            return None
+        if not rows:
+            return False
+        self.pages.insert(0, (start, rows))
+        if len(self.pages) > self.window:
+            self.pages.pop()
+            self.at_end = False
+        self._positions = None
+        return True
+
+    def patch(self, request_id, fields) -> Optional[int]:
+        """
+        изменённые колонки строки окна (живое изменение); индекс строки в rows
+        или None, если строки в окне нет. Порядок не пересчитывается: строка
+        переедет на своё место при следующей загрузке.
+        """
+        fields = {k: v for k, v in fields.items() if k in Row._fields}
+        position = self._position(request_id)
+        if position is None or not fields:
+            return None
+        p, i, index = position
+        rows = self.pages[p][1]
+        rows[i] = Row(**{**rows[i]._asdict(), **fields})
+        return index
+
+    def insert(self, values) -> Optional[int]:
+        """
+        новая строка (живое изменение, {колонка: значение}) на своё место по
+        сортировке, если оно внутри окна; индекс в rows или None. При поиске не
+        вставляем: совпадение с MATCH/LIKE в Python не проверить.
+        """
+        if self.match or self.like:
+            return None
+        row = Row(**{c: values.get(c) for c in Row._fields})
+        if not self.pages:
+            if not self.at_end:
+                return None
+            self.pages.append((0, [row]))
+            self._positions = None
+            return 0
+        self._positions = None
+        key = self._key(row)
+        index = 0
+        for p, (offset, rows) in enumerate(self.pages):
+            for i, existing in enumerate(rows):
+                if (key > self._key(existing)) if self.descending else (key < self._key(existing)):
+                    if p == 0 and i == 0 and not self.at_start:
+                        self._shift(0)  # строка выше окна: окно съехало на одну вниз
+                        return None
+                    rows.insert(i, row)
+                    self._shift(p + 1)
+                    return index + i
+            index += len(rows)
+        if not self.at_end:
+            return None
+        self.pages[-1][1].append(row)
+        return index
+
+    def _position(self, request_id):
+        # правок в пачке много, а окно меняется редко — индекс строк по id
+        if self._positions is None:
+            self._positions = {}
+            index = 0
+            for p, (_, rows) in enumerate(self.pages):
+                for i, row in enumerate(rows):
+                    self._positions[row.id] = (p, i, index + i)
+                index += len(rows)
+        return self._positions.get(request_id)
+
+    def _key(self, row):
+        # NULL в SQLite меньше любого значения
+        value = getattr(row, self.sort)
+        return (value is not None, value if value is not None else 0, row.id)
+
+    def _shift(self, first_page):
+        self.pages[first_page:] = [(offset + 1, rows) for offset, rows in self.pages[first_page:]]
+
+    def _fetch(self, after=None, before=None, offset=0, limit=None, cancel=None):
+        limit = limit or self.page_size + 1
+        params = {"limit": limit}
+        where = []
+
+        if self.sort == RANK:
+            # у bm25 нет устойчивого ключа, но выдача FTS уже отсортирована по rank
+            arms = [
+                f"SELECT {', '.join('r.' + c for c in COLUMNS.split(', '))}, f.rank AS rank "
+                f"FROM {schema}.{FTS_TABLE} f JOIN {schema}.{_table(schema)} r ON r.id = f.rowid "
+                f"WHERE f.{FTS_TABLE} MATCH :q"
+                for schema in self.schemas
+            ]
+            sql = text(
+                f"SELECT {COLUMNS} FROM ({' UNION ALL '.join(arms)}) "
+                "ORDER BY rank LIMIT :limit OFFSET :offset"
+            )
+            params.update(q=self.match, offset=offset)
+            return run_cancellable(self.engine, sql, params, cancel)
+
+        if self.match:
+            # {schema} подставляется для каждой таблицы ниже
+            where.append(f"id IN (SELECT rowid FROM {{schema}}.{FTS_TABLE} WHERE {FTS_TABLE} MATCH :q)")
+            params["q"] = self.match
+        elif self.like:
+            where.append("(CAST(number AS TEXT) LIKE :like OR equipment LIKE :like OR client LIKE :like)")
+            params["like"] = self.like
+
+        # назад — та же выборка в обратном порядке, потом разворачиваем
+        backward = before is not None
+        ascending = self.descending == backward
+        key = after if after is not None else before
+        keys = [None]
+        if key is not None:
+            op = ">" if ascending else "<"
+            if self.sort in lookups.NAMES:
+                keys = [f"{self.sort} = :key AND id {op} :key_id", f"{self.sort} {op} :key"]
+            else:
+                keys = [f"({self.sort}, id) {op} (:key, :key_id)"]
+            params.update(key=getattr(key, self.sort), key_id=key.id)
+
+        order = f" ORDER BY {self.sort} {'ASC' if ascending else 'DESC'}, id {'ASC' if ascending else 'DESC'}"
+        arms = []
+        for schema in self.schemas:
+            for condition in keys:
+                conditions = [w.format(schema=schema) for w in where] + ([condition] if condition else [])
+                arms.append(
+                    f"SELECT {COLUMNS} FROM {schema}.{_table(schema)}"
+                    + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+                    + order + " LIMIT :limit"
+                )
+        if len(arms) == 1:
+            sql = text(arms[0])
+        else:
+            sql = text(" UNION ALL ".join(f"SELECT * FROM ({arm})" for arm in arms) + order + " LIMIT :limit")
+        rows = run_cancellable(self.engine, sql, params, cancel)
+        if rows is not None and backward:
+            rows.reverse()
+        return rows
@@ -0,0 +1,191 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+# ===================== PERFORMANCE METRICS =====================
+# Гистограммы времени по категориям, общие для процесса:
+#   sql     — каждый запрос к SQLite (хуки курсора на engine),
+#   handler — обработчики UI целиком (база + хеш + отрисовка),
+#   hash    — bcrypt в пуле hash,
+#   pool    — ожидание свободного потока в пулах db / hash,
+#   api     — методы HTTP API.
+# Обработчик долгий, а sql и hash в нём короткие — время уходит в Flet.
+# Запросы дольше SLOW_QUERY_MS пишутся в лог вместе с EXPLAIN QUERY PLAN.
+ENABLED = os.environ.get("PERF", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+SLOW_KEEP = 50  # последних медленных запросов для панели
+
+# границы корзин, мс: от 0.05 до ~100 с с шагом x2
+BUCKETS = [0.05 * 2 ** i for i in range(22)]
+
+log = logging.getLogger("perf")
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows=None):
+        self.counts[bisect.bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def percentile(self, q):
+        """верхняя граница корзины, в которую попал q-й процентиль"""
+        target = self.count * q
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 2),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max, 2),
+            "rows": self.rows,
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}  # (категория, имя) -> Histogram
+_slow = deque(maxlen=SLOW_KEEP)
+
+
+def record(category, name, ms, rows=None):
+    if not ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get((category, name))
+        if hist is None:
+            hist = _histograms[(category, name)] = Histogram()
+        hist.add(ms, rows)
+
+
+@contextmanager
+def timer(category, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, name, (time.perf_counter() - start) * 1000)
+
+
+def timed(handler):
+    """async-обработчик UI в гистограмму handler под своим именем"""
+    @functools.wraps(handler)
+    async def run(*args, **kwargs):
+        with timer("handler", handler.__name__):
+            return await handler(*args, **kwargs)
+    return run
+
+
+# ---------- SQL ----------
+_SPACES = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+@functools.lru_cache(maxsize=1024)  # текстов запросов немного, а вызов — на каждый запрос
+def statement_name(statement):
+    """текст запроса без лишних пробелов; IN (?, ?, ...) любой длины — одна строка"""
+    return _IN_LIST.sub("(?...)", _SPACES.sub(" ", statement).strip())[:300]
+
+
+def _explain(conn, statement, parameters):
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            return [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+        finally:
+            cursor.close()
+    except Exception as ex:  # план не обязателен: не ломаем сам запрос
+        return [f"нет плана: {ex}"]
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perf_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("perf_start")
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    name = statement_name(statement)
+    # у SELECT sqlite3 не знает числа строк до выборки (-1) — считаются только изменения
+    record("sql", name, ms, cursor.rowcount)
+    if ms >= SLOW_QUERY_MS and ENABLED:
+        plan = [] if executemany else _explain(conn, statement, parameters)
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(ms, 2),
+            "statement": name,
+            "plan": plan,
+        }
+        with _lock:
+            _slow.append(entry)
+        log.warning("медленный запрос %.1f мс: %s | план: %s", ms, name, " | ".join(plan))
+
+
+def instrument(engine):
+    """хуки времени запросов на engine; повторный вызов ничего не делает"""
+    if ENABLED and not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+    return engine
+
+
+# ---------- отчёт ----------
+def snapshot(top: int = 20) -> dict:
+    """{категория: [строки, самые затратные по суммарному времени]}, медленные запросы"""
+    with _lock:
+        items = [(category, name, hist.summary()) for (category, name), hist in _histograms.items()]
+        slow = list(_slow)
+    report = {}
+    for category, name, summary in sorted(items, key=lambda item: -item[2]["total_ms"]):
+        rows = report.setdefault(category, [])
+        if len(rows) < top:
+            rows.append({"name": name, **summary})
+    report["slow"] = slow[::-1]
+    return report
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _slow.clear()
+
+
+def dump(path=None) -> str:
+    """полный снимок в JSON-файл; возвращает путь"""
+    path = path or f"perf-{datetime.now():%Y%m%d-%H%M%S}.json"
+    data = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "slow_query_ms": SLOW_QUERY_MS,
+        **snapshot(top=10 ** 6),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return os.path.abspath(path)
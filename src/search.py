@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import lookups
+from storage import ARCHIVE
+
+# ===================== FTS INDEX =====================
+# Полнотекстовый индекс по заявкам (FTS5 + trigram): ищет подстроку
+# без полного сканирования таблицы request. Синхронизация — триггерами,
+# поэтому индекс обновляется при любой записи в request.
+# В основной базе оборудование и клиент — id справочников (lookups.py):
+# содержимое индекса читается из представления с именами, а триггеры берут
+# имена из справочников. В архиве имена лежат в самой таблице.
+FTS_TABLE = "request_fts"
+FTS_COLUMNS = "number, equipment, client, fault_type, description"
+MIN_QUERY = 3  # trigram не умеет искать по строкам короче 3 символов
+
+
+def _values(schema, row):
+    """значения колонок индекса из строки row (new/old) триггера"""
+    return ", ".join(
+        lookups.name_sql(c, row) if c in lookups.NAMES and schema != ARCHIVE else f"{row}.{c}"
+        for c in FTS_COLUMNS.split(", ")
+    )
+
+
+def _ddl(schema):
+    # имена объектов — со схемой (main или archive), а таблицы в телах
+    # триггеров — без: SQLite ищет их в схеме самого триггера
+    content = "request" if schema == ARCHIVE else lookups.REQUEST_VIEW
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.{FTS_TABLE} USING fts5(
+            {FTS_COLUMNS},
+            content='{content}', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {schema}.request_fts_ai AFTER INSERT ON request BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            VALUES (new.id, {_values(schema, "new")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {schema}.request_fts_ad AFTER DELETE ON request BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            VALUES ('delete', old.id, {_values(schema, "old")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {schema}.request_fts_au AFTER UPDATE ON request BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            VALUES ('delete', old.id, {_values(schema, "old")});
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            VALUES (new.id, {_values(schema, "new")});
+        END
+        """,
+    ]
+
+
+def create_index(conn, schema="main"):
+    """создание FTS-индекса и триггеров; при первом создании индекс заполняется"""
+    exists = conn.execute(
+        text(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for ddl in _ddl(schema):
+        conn.execute(text(ddl))
+    if not exists:
+        conn.execute(text(f"INSERT INTO {schema}.{FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match(search: str) -> Optional[str]:
+    """строка поиска -> выражение MATCH (каждое слово как фраза, через AND)"""
+    words = [w for w in search.split() if len(w) >= MIN_QUERY]
+    if not words:
+        return None
+    return " AND ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def run_cancellable(engine, sql, params, cancel: Optional[threading.Event] = None):
+    """выполнение запроса, который можно прервать через cancel (тогда возвращается None)"""
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        if cancel is not None:
+            raw.set_progress_handler(cancel.is_set, 1000)
+        try:
+            return conn.execute(sql, params).all()
+        except OperationalError as ex:
+            if isinstance(ex.orig, sqlite3.OperationalError) and cancel is not None and cancel.is_set():
+                return None
+            raise
+        finally:
+            if cancel is not None:
+                raw.set_progress_handler(None, 0)
@@ -0,0 +1,247 @@
+from datetime import date
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func
+
+import archive
+import assign
+import auth
+import cache
+import history
+import live
+import lookups
+import paging
+import stats
+import writer
+from db import insert_request, request_saved, Request, Comment
+
+# ===================== SERVICES =====================
+# Бизнес-логика без привязки к Flet: UI, HTTP API и скрипты вызывают одни
+# и те же методы. Сервисы ничего не знают о контролах и возвращают модели
+# или простые значения; «не найдено» — это None, ошибки ввода — ValueError.
+STATUSES = ("в ожидании", "в работе", "выполнено")
+EDITABLE = ("equipment", "fault_type", "client", "description", "status", "assigned_to")
+COMMENT_PAGE = 50
+BULK_EDITABLE = ("status", "assigned_to")
+BULK_CHUNK = 10_000  # id в одном IN: меньше лимита параметров SQLite (32766)
+# результат массовой правки по каждой заявке
+UPDATED, UNCHANGED, NOT_FOUND = "updated", "unchanged", "not_found"
+
+
+class RequestService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def create(self, client, equipment, fault_type="", description="",
+               status="в ожидании", assigned_to="", auto_assign=False):
+        """
+        новая заявка; возвращает её номер. auto_assign — открытой заявке без
+        исполнителя его подбирает assign.py (если исполнителей нет, остаётся пусто)
+        """
+        if not client or not equipment:
+            raise ValueError("Заполните оборудование и клиента")
+        if status not in STATUSES:
+            raise ValueError(f"Неизвестный статус: {status}")
+        picked = None
+        if auto_assign and not assigned_to and status != stats.DONE:
+            picked = assigned_to = assign.index(self.engine).pick(equipment)
+        try:
+            # через писателя (GROUP_COMMIT — общим коммитом с соседними вызовами) или сразу
+            row = writer.write(
+                self.engine,
+                lambda conn: insert_request(conn, client, equipment, fault_type or "", description or "",
+                                            status=status, assigned_to=assigned_to or ""),
+                lambda row: request_saved(self.engine, row),
+            )
+            return row.number
+        except Exception:
+            if picked:
+                assign.index(self.engine).release(picked)
+            raise
+
+    def get(self, request_id):
+        """заявка по id (через общий кэш чтения) или None"""
+        def load():
+            with Session(self.engine) as session:
+                return session.get(Request, request_id)
+        return cache.requests.get(cache.request_key(self.engine, request_id), load)
+
+    def update(self, request_id, **fields):
+        """обновление заявки; возвращает её номер или None, если заявки нет"""
+        unknown = set(fields) - set(EDITABLE)
+        if unknown:
+            raise ValueError(f"Нельзя изменить поля: {', '.join(sorted(unknown))}")
+        if "status" in fields and fields["status"] not in STATUSES:
+            raise ValueError(f"Неизвестный статус: {fields['status']}")
+        key = cache.request_key(self.engine, request_id)
+        if not fields:
+            request = self.get(request_id)
+            return request.number if request else None
+        # один UPDATE ... RETURNING вместо чтения строки и записи следом; имена
+        # заявки — подзапросы к справочникам, RETURNING их не вернёт: строку
+        # в кэше не подменяем, а сбрасываем
+        def apply(conn):
+            values = lookups.to_ids(conn, [fields])[0]
+            return conn.execute(
+                update(Request).where(Request.id == request_id).values(**values).returning(Request.number)
+            ).scalar()
+
+        def applied(number):
+            cache.requests.invalidate(key)
+            if number is not None:
+                live.broker.publish(self.engine, live.updated(request_id, fields))
+
+        return writer.write(self.engine, apply, applied)
+
+    def bulk_update(self, request_ids, **fields):
+        """
+        статус и/или исполнитель сразу у многих заявок: один UPDATE ... WHERE id IN
+        на пачку id, всё в одной транзакции. {id: UPDATED | UNCHANGED | NOT_FOUND}
+        в порядке request_ids.
+        """
+        unknown = set(fields) - set(BULK_EDITABLE)
+        if unknown:
+            raise ValueError(f"Массово нельзя изменить поля: {', '.join(sorted(unknown))}")
+        if not fields:
+            raise ValueError("Укажите новый статус или исполнителя")
+        if "status" in fields and fields["status"] not in STATUSES:
+            raise ValueError(f"Неизвестный статус: {fields['status']}")
+        ids = list(dict.fromkeys(int(i) for i in request_ids))
+        results = dict.fromkeys(ids, NOT_FOUND)
+        updated = []
+        with Session(self.engine) as session:
+            values = lookups.to_ids(session.connection(), [fields])[0]
+            # строки, где уже всё так, не трогаем: триггеры истории и счётчиков не срабатывают зря
+            differs = or_(*(getattr(Request, name).is_distinct_from(value) for name, value in values.items()))
+            for start in range(0, len(ids), BULK_CHUNK):
+                chunk = ids[start:start + BULK_CHUNK]
+                for request_id in session.exec(
+                    select(Request.id).where(Request.id.in_(chunk), ~differs)
+                ):
+                    results[request_id] = UNCHANGED
+                updated += session.execute(
+                    update(Request).where(Request.id.in_(chunk), differs).values(**values).returning(Request.id)
+                ).scalars().all()
+            session.commit()
+        cache.requests.invalidate(*(cache.request_key(self.engine, i) for i in updated))
+        for request_id in updated:
+            results[request_id] = UPDATED
+            live.broker.publish(self.engine, live.updated(request_id, fields))
+        return results
+
+    def list(self, query="", sort=None, descending=False, limit=paging.PAGE_SIZE, with_archive=False):
+        """первая страница списка/поиска (как в таблице просмотра); with_archive — вместе с архивом"""
+        sort = sort or (paging.RANK if query.strip() else "number")
+        pager = paging.RequestPager(self.engine, query, sort=sort, descending=descending,
+                                    page_size=limit, archive=with_archive)
+        pager.load_next()
+        return pager.rows
+
+    def get_archived(self, request_id):
+        """заявка из архива ({колонка: значение}) или None"""
+        return archive.get(self.engine, request_id)
+
+    def restore(self, request_id):
+        """возврат заявки из архива; её номер или None, если в архиве её нет"""
+        restored = archive.restore(self.engine, [request_id])
+        if not restored:
+            return None
+        request = self.get(request_id)
+        return request.number if request else None
+
+    def archive_closed(self, days=archive.ARCHIVE_DAYS):
+        """перенос выполненных давнее days дней в архив; сколько перенесено"""
+        return archive.archive_closed(self.engine, days)
+
+    def status_count(self, status):
+        return stats.status_count(self.engine, status)
+
+    def stats(self):
+        return stats.snapshot(self.engine)
+
+    def history(self, request_id):
+        """смены статуса и исполнителя заявки: [(время, статус, исполнитель)]"""
+        return history.events(self.engine, request_id)
+
+    def sla(self):
+        """время в статусах, время до выполнения по месяцам, возраст открытых"""
+        return history.report(self.engine)
+
+    def cache_metrics(self):
+        """попадания/промахи общего кэша чтения заявок и пользователей"""
+        return cache.metrics()
+
+
+class CommentService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def add(self, request_id, author, text):
+        """комментарий к заявке; возвращает его id или None, если заявки нет"""
+        if not author or not text:
+            raise ValueError("Заполните автора и текст комментария")
+        # существование заявки проверяет внешний ключ, без отдельного чтения
+        def add(conn):
+            names = lookups.to_ids(conn, [{"author": author}])[0]
+            values = dict(request_id=request_id, text=text, created_at=date.today(), **names)
+            return conn.execute(insert(Comment).values(**values).returning(Comment.id)).scalar_one()
+
+        try:
+            return writer.write(self.engine, add)
+        except IntegrityError:
+            return None
+
+    def page(self, request_id, after_id=None, limit=COMMENT_PAGE):
+        """
+        страница ленты комментариев заявки по порядку добавления.
+        Следующая страница — с after_id последнего комментария: это проход
+        по индексу (request_id, id), сколько бы комментариев ни было.
+        """
+        stmt = select(Comment).where(Comment.request_id == request_id)
+        if after_id is not None:
+            stmt = stmt.where(Comment.id > after_id)
+        with Session(self.engine) as session:
+            return session.exec(stmt.order_by(Comment.id).limit(limit)).all()
+
+    def counts(self, request_ids):
+        """{id заявки: число комментариев} одним сгруппированным запросом"""
+        if not request_ids:
+            return {}
+        stmt = (
+            select(Comment.request_id, func.count())
+            .where(Comment.request_id.in_(request_ids))
+            .group_by(Comment.request_id)
+        )
+        with Session(self.engine) as session:
+            counts = dict(session.exec(stmt).all())
+        return {request_id: counts.get(request_id, 0) for request_id in request_ids}
+
+
+class UserService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def register(self, username, password, full_name=""):
+        if not username or not password:
+            raise ValueError("Заполните логин и пароль")
+        if len(password) < 8:
+            raise ValueError("password can't be less 8 symbol")
+        auth.register_user(self.engine, username.lower(), password, full_name)
+        assign.invalidate(self.engine)  # новый исполнитель — в очередь назначения
+
+    def authenticate(self, username, password):
+        return auth.authenticate_user(self.engine, username or "", password or "")
+
+    def login(self, username, password):
+        """(пользователь, токен) или None"""
+        user = self.authenticate(username, password)
+        if not user:
+            return None
+        return user, auth.issue_token(user.id)
+
+    def resolve_token(self, token):
+        return auth.resolve_token(self.engine, token)
+
+    def logout(self, token):
+        auth.revoke_token(token)
@@ -0,0 +1,177 @@
+from sqlalchemy import text
+
+import lookups
+
+# ===================== STATISTICS =====================
+# Счётчики для панели статистики ведутся триггерами на request, так что
+# любая запись (save_request, редактирование, импорт) обновляет их в той же
+# транзакции, а панель читает несколько маленьких таблиц вместо скана request.
+# Всё, кроме выполненных по дням, отражает текущее содержимое request и
+# пересчитывается rebuild(). Выполненные по дням — это события перехода в
+# «выполнено» за день; из таблицы заявок их не восстановить.
+# Исполнитель и оборудование в счётчиках — id (lookups.py), имена
+# подставляются при чтении из справочников.
+DONE = "выполнено"
+
+TABLES = {
+    "stat_status": "status TEXT PRIMARY KEY, count INTEGER NOT NULL",
+    "stat_assignee": "assignee_id INTEGER PRIMARY KEY, open_count INTEGER NOT NULL",
+    "stat_day": "day DATE PRIMARY KEY, created INTEGER NOT NULL DEFAULT 0, completed INTEGER NOT NULL DEFAULT 0",
+    "stat_equipment": "equipment_id INTEGER, fault_type TEXT, count INTEGER NOT NULL, "
+                      "PRIMARY KEY (equipment_id, fault_type)",
+}
+# заявки, перенесённые в архив (archive.py), по статусу; триггеры их не видят,
+# счётчик ведёт сам перенос, rebuild и check его не трогают
+ARCHIVED = "stat_archived"
+ARCHIVED_COLUMNS = "status TEXT PRIMARY KEY, count INTEGER NOT NULL"
+
+
+def _bump(row, sign):
+    """вклад строки request (new/old) в счётчики со знаком sign"""
+    return f"""
+        INSERT INTO stat_status(status, count) VALUES ({row}.status, {sign})
+            ON CONFLICT(status) DO UPDATE SET count = count + excluded.count;
+        INSERT INTO stat_assignee(assignee_id, open_count) SELECT {row}.assignee_id, {sign}
+            WHERE {row}.status <> '{DONE}'
+            ON CONFLICT(assignee_id) DO UPDATE SET open_count = open_count + excluded.open_count;
+        INSERT INTO stat_day(day, created) VALUES ({row}.create_at, {sign})
+            ON CONFLICT(day) DO UPDATE SET created = created + excluded.created;
+        INSERT INTO stat_equipment(equipment_id, fault_type, count)
+            VALUES ({row}.equipment_id, {row}.fault_type, {sign})
+            ON CONFLICT(equipment_id, fault_type) DO UPDATE SET count = count + excluded.count;
+    """
+
+
+def _completed(where):
+    return f"""
+        INSERT INTO stat_day(day, completed) SELECT date('now', 'localtime'), 1 WHERE {where}
+            ON CONFLICT(day) DO UPDATE SET completed = completed + 1;
+    """
+
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_request_ai AFTER INSERT ON request BEGIN
+        {_bump("new", 1)}
+        {_completed(f"new.status = '{DONE}'")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_request_ad AFTER DELETE ON request BEGIN
+        {_bump("old", -1)}
+    END
+    """,
+    # только если поменялось то, что учитывается в счётчиках
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_request_au AFTER UPDATE OF
+        status, assignee_id, create_at, equipment_id, fault_type ON request BEGIN
+        {_bump("old", -1)}
+        {_bump("new", 1)}
+        {_completed(f"new.status = '{DONE}' AND old.status <> '{DONE}'")}
+    END
+    """,
+]
+
+# как пересчитать каждую таблицу с нуля по request
+_REBUILD = {
+    "stat_status": "SELECT status, count(*) FROM request GROUP BY status",
+    "stat_assignee": f"SELECT assignee_id, count(*) FROM request WHERE status <> '{DONE}' GROUP BY assignee_id",
+    "stat_day": "SELECT create_at, count(*) FROM request GROUP BY create_at",
+    "stat_equipment": "SELECT equipment_id, fault_type, count(*) FROM request GROUP BY equipment_id, fault_type",
+}
+_KEYS = {
+    "stat_status": ("status", "count"),
+    "stat_assignee": ("assignee_id", "open_count"),
+    "stat_day": ("day", "created"),
+    "stat_equipment": ("equipment_id, fault_type", "count"),
+}
+
+
+def create_stats(conn):
+    """таблицы счётчиков и триггеры; счётчики заполняются по текущим заявкам"""
+    for name, columns in TABLES.items():
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} ({columns})"))
+    for ddl in _TRIGGERS:
+        conn.execute(text(ddl))
+    rebuild(conn)
+
+
+def create_archived(conn):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {ARCHIVED} ({ARCHIVED_COLUMNS})"))
+
+
+def add_archived(conn, status: str, n: int):
+    conn.execute(text(
+        f"INSERT INTO {ARCHIVED}(status, count) VALUES (:s, :n) "
+        "ON CONFLICT(status) DO UPDATE SET count = count + excluded.count"
+    ), {"s": status, "n": n})
+
+
+def rebuild(conn):
+    """пересчёт счётчиков с нуля (выполненные по дням сохраняются)"""
+    conn.execute(text("DELETE FROM stat_status"))
+    conn.execute(text("DELETE FROM stat_assignee"))
+    conn.execute(text("DELETE FROM stat_equipment"))
+    conn.execute(text("UPDATE stat_day SET created = 0"))
+    conn.execute(text(f"INSERT INTO stat_status(status, count) {_REBUILD['stat_status']}"))
+    conn.execute(text(f"INSERT INTO stat_assignee(assignee_id, open_count) {_REBUILD['stat_assignee']}"))
+    conn.execute(text(f"INSERT INTO stat_equipment(equipment_id, fault_type, count) {_REBUILD['stat_equipment']}"))
+    conn.execute(text(
+        f"INSERT INTO stat_day(day, created) {_REBUILD['stat_day']} "
+        "ON CONFLICT(day) DO UPDATE SET created = excluded.created"
+    ))
+
+
+def snapshot(engine, top: int = 10) -> dict:
+    """всё для панели статистики: чтение готовых счётчиков, без скана request"""
+    with engine.connect() as conn:
+        def rows(sql):
+            return [tuple(r) for r in conn.execute(text(sql), {"top": top})]
+        return {
+            "status": dict(rows("SELECT status, count FROM stat_status WHERE count > 0 ORDER BY count DESC")),
+            "assignee": rows(
+                f"SELECT {lookups.name_sql('assigned_to', 's')}, open_count FROM stat_assignee s "
+                "WHERE open_count > 0 ORDER BY open_count DESC LIMIT :top"
+            ),
+            "days": rows(
+                "SELECT day, created, completed FROM stat_day "
+                "WHERE created > 0 OR completed > 0 ORDER BY day DESC LIMIT :top"
+            ),
+            "equipment": rows(
+                f"SELECT {lookups.name_sql('equipment', 's')}, fault_type, count FROM stat_equipment s "
+                "WHERE count > 0 ORDER BY count DESC LIMIT :top"
+            ),
+            "archived": dict(rows(f"SELECT status, count FROM {ARCHIVED} WHERE count > 0 ORDER BY count DESC")),
+        }
+
+
+def status_count(engine, status: str) -> int:
+    """заявки со статусом вместе с перенесёнными в архив"""
+    with engine.connect() as conn:
+        count = conn.execute(text(
+            "SELECT coalesce((SELECT count FROM stat_status WHERE status = :s), 0) "
+            f"+ coalesce((SELECT count FROM {ARCHIVED} WHERE status = :s), 0)"
+        ), {"s": status}).scalar()
+    return count or 0
+
+
+def check(engine) -> dict:
+    """
+    сверка счётчиков с пересчётом по request.
+    {таблица: [(ключ, в счётчике, по заявкам)]} — пусто, если всё сходится.
+    """
+    diff = {}
+    with engine.connect() as conn:
+        for table, sql in _REBUILD.items():
+            key, value = _KEYS[table]
+            width = len(key.split(","))
+            stored = {tuple(r[:width]): r[width] for r in conn.execute(text(f"SELECT {key}, {value} FROM {table}"))}
+            actual = {tuple(r[:width]): r[width] for r in conn.execute(text(sql))}
+            bad = [
+                (k if width > 1 else k[0], stored.get(k, 0), actual.get(k, 0))
+                for k in stored.keys() | actual.keys()
+                if stored.get(k, 0) != actual.get(k, 0)
+            ]
+            if bad:
+                diff[table] = sorted(bad, key=str)
+    return diff
@@ -0,0 +1,91 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlmodel import create_engine
+
+# ===================== STORAGE PROFILES =====================
+# Профиль хранилища выбирается переменной окружения DB_PROFILE и задаёт
+# PRAGMA, которые выставляются на каждом новом соединении, и размер пула.
+# DB_URL переопределяет путь к базе.
+# К каждому соединению подключается (ATTACH) файл архива рядом с базой:
+# database.db -> database.archive.db, схема archive (см. archive.py).
+DEFAULT_URL = "sqlite:///database.db"
+DEFAULT_PROFILE = "wal"
+ARCHIVE = "archive"
+
+PROFILES = {
+    # как было: rollback-журнал и fsync на каждый коммит, читатели блокируют писателя
+    "legacy": {
+        "pragmas": {"journal_mode": "DELETE", "synchronous": "FULL"},
+        "pool": {"pool_size": 5, "max_overflow": 10},
+    },
+    # WAL: читатели не мешают писателю, fsync только на чекпоинте
+    "wal": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -32000,  # КиБ, т.е. ~32 МБ на соединение
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+        "pool": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30},
+    },
+    # WAL, но с fsync на каждый коммит — для машин без ИБП
+    "durable": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "cache_size": -32000,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+        "pool": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30},
+    },
+}
+
+
+def is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def archive_path(url: str):
+    """файл архива для базы; у базы в памяти архива нет"""
+    if is_memory(url):
+        return None
+    root, ext = os.path.splitext(make_url(url).database)
+    return f"{root}.{ARCHIVE}{ext or '.db'}"
+
+
+def make_engine(url: str = None, profile: str = None, **kwargs):
+    """engine с PRAGMA и пулом выбранного профиля"""
+    url = url or os.environ.get("DB_URL", DEFAULT_URL)
+    profile = profile or os.environ.get("DB_PROFILE", DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Неизвестный профиль хранилища: {profile} (есть: {', '.join(PROFILES)})")
+    settings = PROFILES[profile]
+
+    options = {"connect_args": {"check_same_thread": False}}
+    if not is_memory(url):
+        # у базы в памяти свой пул на поток, размер ему не задаётся
+        options.update(settings["pool"])
+    options.update(kwargs)
+    engine = create_engine(url, **options)
+
+    pragmas = settings["pragmas"]
+    archive = archive_path(url)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        # SQLite проверяет внешние ключи только если включить их на каждом соединении
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+        for name, value in pragmas.items():
+            dbapi_connection.execute(f"PRAGMA {name} = {value}")
+        if archive:
+            dbapi_connection.execute(f"ATTACH DATABASE ? AS {ARCHIVE}", (archive,))
+            # журнал и синхронизация задаются для каждого файла отдельно
+            for name in ("journal_mode", "synchronous"):
+                dbapi_connection.execute(f"PRAGMA {ARCHIVE}.{name} = {pragmas[name]}")
+
+    return engine
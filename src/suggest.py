@@ -0,0 +1,234 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import text
+
+import live
+import lookups
+
+# ===================== AUTOCOMPLETE =====================
+# Подсказки для полей оборудования, типа неисправности, клиента и
+# исполнителя: известные значения, самые частые первыми, — чтобы диспетчер
+# выбирал уже заведённое имя, а не набирал похожее (дубли дробят статистику
+# и поиск). Отвечает память: на нажатие клавиши запроса к базе нет.
+#
+# Индекс поля — отсортированный массив ключей (имя в нижнем регистре с
+# начала каждого слова: «think» находит «Ноутбук Lenovo ThinkPad»). Префикс —
+# диапазон массива (bisect), а самые частые в диапазоне даёт дерево
+# максимумов частоты над массивом — без перебора диапазона, даже когда
+# префиксу «ооо» соответствуют все клиенты.
+#
+# Частоты ведутся по живым изменениям (live.py): новая заявка и правка
+# прибавляют новым значениям. Старые значения правки в событии не видны —
+# их частоты поправит перечитывание из базы (раз в REFRESH_SECONDS, после
+# импорта и архива, или когда новых имён накопилось больше FRESH_LIMIT).
+# Перечитывание идёт в фоне, до его конца отвечает прежний индекс.
+FIELDS = ("equipment", "fault_type", "client", "assigned_to")
+SUGGESTIONS = 8
+REFRESH_SECONDS = 600
+FRESH_LIMIT = 256  # новых имён вне массива; их перебираем при каждом запросе
+
+# поле -> (имя, частота); оборудование и типы неисправностей — из счётчиков stats.py
+_COUNTS = {
+    "equipment": "SELECT e.name, coalesce(sum(s.count), 0) FROM equipment e "
+                 "LEFT JOIN stat_equipment s ON s.equipment_id = e.id GROUP BY e.id",
+    "fault_type": "SELECT fault_type, sum(count) FROM stat_equipment GROUP BY fault_type",
+    "client": "SELECT c.name, count(r.id) FROM client c LEFT JOIN request r ON r.client_id = c.id GROUP BY c.id",
+    # исполнители: все, у кого есть заявки, и активные не-админы (пусть и без заявок)
+    "assigned_to": "SELECT name, sum(n) FROM ("
+                   "SELECT p.name, count(r.id) AS n FROM person p JOIN request r ON r.assignee_id = p.id "
+                   "WHERE p.id <> :none GROUP BY p.id "
+                   "UNION ALL SELECT username, 0 FROM \"user\" WHERE is_active AND role <> 'admin'"
+                   ") GROUP BY name",
+}
+
+log = logging.getLogger("suggest")
+
+
+def _keys(name) -> list:
+    """ключи имени: оно само и хвосты с начала каждого следующего слова, в нижнем регистре"""
+    key = name.casefold()
+    return [key[i:] for i in range(len(key))
+            if i == 0 or (key[i].isalnum() and not key[i - 1].isalnum())]
+
+
+class PrefixIndex:
+    """имена одного поля с частотами"""
+
+    def __init__(self, counts: dict):
+        self.names = [name for name in counts if name]
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        entries = sorted((key, i) for i, name in enumerate(self.names) for key in _keys(name))
+        self._keys = [key for key, _ in entries]
+        self._owner = [i for _, i in entries]  # запись массива -> имя
+        self._entries = [[] for _ in self.names]  # имя -> его записи
+        for position, i in enumerate(self._owner):
+            self._entries[i].append(position)
+        self._size = 1
+        while self._size < len(entries):
+            self._size *= 2
+        # дерево максимумов: листья — частоты записей, узел — максимум детей
+        self._tree = [0] * (2 * self._size)
+        for position, i in enumerate(self._owner):
+            self._tree[self._size + position] = counts[self.names[i]]
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+        self.fresh = {}  # новые имена после сборки -> частота
+        self._fresh_keys = {}
+
+    def add(self, name, delta=1):
+        i = self._ids.get(name)
+        if i is None:
+            self.fresh[name] = self.fresh.get(name, 0) + delta
+            self._fresh_keys.setdefault(name, _keys(name))
+            return
+        tree = self._tree
+        for position in self._entries[i]:
+            node = self._size + position
+            tree[node] = max(0, tree[node] + delta)
+            node //= 2
+            while node:
+                tree[node] = max(tree[2 * node], tree[2 * node + 1])
+                node //= 2
+
+    def complete(self, prefix, limit=SUGGESTIONS) -> list:
+        """до limit имён, у которых с prefix начинается имя или слово в нём: самые частые, затем по алфавиту"""
+        key = prefix.casefold()
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + chr(0x10FFFF), lo)
+        found = self._top(lo, hi, limit)
+        found += [(-count, name) for name, count in self.fresh.items()
+                  if any(k.startswith(key) for k in self._fresh_keys[name])]
+        return [name for _, name in sorted(found)[:limit]]
+
+    def _top(self, lo, hi, limit):
+        """(-частота, имя) самых частых разных имён среди записей [lo, hi)"""
+        tree, size = self._tree, self._size
+        heap = []
+        # узлы, которые вместе покрывают ровно [lo, hi)
+        left, right = lo + size, hi + size
+        while left < right:
+            if left & 1:
+                heap.append((-tree[left], left))
+                left += 1
+            if right & 1:
+                right -= 1
+                heap.append((-tree[right], right))
+            left //= 2
+            right //= 2
+        heapq.heapify(heap)
+        found, seen = [], set()
+        # лучший узел раскрываем до листа: каждый следующий лист — не реже предыдущих
+        while heap and len(found) < limit:
+            count, node = heapq.heappop(heap)
+            if node >= size:
+                i = self._owner[node - size]
+                if i not in seen:  # имя попадает в диапазон несколькими словами
+                    seen.add(i)
+                    found.append((count, self.names[i]))
+            else:
+                heapq.heappush(heap, (-tree[2 * node], 2 * node))
+                heapq.heappush(heap, (-tree[2 * node + 1], 2 * node + 1))
+        return found
+
+
+class Autocomplete:
+    """подсказки одной базы: PrefixIndex на каждое поле из FIELDS"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._indexes = {}    # поле -> PrefixIndex; пусто, пока не собран первый раз
+        self._replay = None   # значения из событий во время сборки: после неё прибавить заново
+        self._stale = True
+        self._loaded_at = 0.0
+        self.builds = 0
+        self.build_ms = 0.0
+        self._subscription = live.broker.subscribe(engine, self._on_change)
+        with self._lock:
+            self._schedule()
+
+    # ---------- синхронизация ----------
+    def _on_change(self):
+        # зовётся из потока писателя сразу после коммита
+        with self._lock:
+            for event in self._subscription.drain():
+                if event["op"] == live.RELOAD:
+                    self._stale = True
+                    continue
+                values = event.get("row") or event.get("fields", {})
+                if self._replay is not None:
+                    self._replay.append(values)
+                self._apply(self._indexes, values)
+
+    def _apply(self, indexes, values):
+        for field, index in indexes.items():
+            if values.get(field):
+                index.add(values[field])
+                if len(index.fresh) > FRESH_LIMIT:
+                    self._stale = True
+
+    def refresh(self):
+        """перечитать значения и частоты из базы; прежний индекс отвечает, пока строится новый"""
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            counts = {
+                field: dict(conn.execute(text(sql), {"none": lookups.NO_ASSIGNEE}).all())
+                for field, sql in _COUNTS.items()
+            }
+        indexes = {field: PrefixIndex(counts[field]) for field in FIELDS}
+        with self._lock:
+            for values in self._replay or ():
+                self._apply(indexes, values)
+            self._indexes = indexes
+            self._replay = None
+            self._loaded_at = time.monotonic()
+            self.builds += 1
+            self.build_ms = (time.perf_counter() - start) * 1000
+
+    def _schedule(self):
+        # под блокировкой; одна сборка за раз
+        if self._replay is not None:
+            return
+        self._replay = []
+        self._stale = False
+        threading.Thread(target=self._build, name="suggest", daemon=True).start()
+
+    def _build(self):
+        try:
+            self.refresh()
+        except Exception:
+            log.exception("подсказки не собраны")
+            with self._lock:
+                self._replay = None
+                self._stale = True
+
+    # ---------- подсказки ----------
+    def complete(self, field, prefix, limit=SUGGESTIONS) -> list:
+        """имена для поля field по набранному prefix; [] до первой сборки индекса"""
+        if field not in FIELDS:
+            raise ValueError(f"Нет подсказок для поля: {field}")
+        with self._lock:
+            if self._stale or time.monotonic() - self._loaded_at > REFRESH_SECONDS:
+                self._schedule()
+            index = self._indexes.get(field)
+            return index.complete(prefix, limit) if index else []
+
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self._indexes)
+
+
+_autocompletes = {}  # engine.url -> Autocomplete
+_autocompletes_lock = threading.Lock()
+
+
+def autocomplete(engine) -> Autocomplete:
+    """подсказки базы engine (одни на процесс); первый вызов запускает сборку в фоне"""
+    with _autocompletes_lock:
+        if engine.url not in _autocompletes:
+            _autocompletes[engine.url] = Autocomplete(engine)
+        return _autocompletes[engine.url]
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+
+# ===================== WORKER POOLS =====================
+# Блокирующая работа уходит из цикла событий Flet в ограниченные пулы.
+# bcrypt и SQLite отпускают GIL, поэтому потоков достаточно. Пулы раздельные:
+# десяток одновременных входов не должен занимать потоки, нужные запросам к базе.
+DB_WORKERS = int(os.environ.get("DB_WORKERS", 8))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", max(2, (os.cpu_count() or 2) // 2)))
+
+db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+
+
+def _call(pool, category, func, args, kwargs, submitted):
+    """в потоке пула: сколько задача ждала свободный поток и сколько шла"""
+    start = time.perf_counter()
+    perf.record("pool", pool, (start - submitted) * 1000)
+    if category is None:
+        return func(*args, **kwargs)
+    with perf.timer(category, getattr(func, "__qualname__", repr(func))):
+        return func(*args, **kwargs)
+
+
+async def run_db(func, *args, **kwargs):
+    """запрос к базе в пуле db (время запросов считают хуки SQL)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        db_pool, _call, "db", None, func, args, kwargs, time.perf_counter()
+    )
+
+
+async def run_hash(func, *args, **kwargs):
+    """хеширование/проверка пароля в пуле hash"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        hash_pool, _call, "hash", "hash", func, args, kwargs, time.perf_counter()
+    )
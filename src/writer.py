@@ -0,0 +1,155 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import text
+
+import perf
+
+# ===================== GROUP COMMIT =====================
+# Необязательный единственный писатель (GROUP_COMMIT=1): новые заявки,
+# комментарии и правки из сервисов встают в очередь, фоновый поток забирает
+# накопившееся и проводит одной транзакцией. Утренний наплыв заявок платит
+# один коммит (и fsync в профилях legacy/durable) на пачку, а не на каждую,
+# и вызовы не выстраиваются в очередь за блокировкой записи SQLite.
+#
+# Пачка — не больше WRITER_BATCH операций; за первой операцией писатель ждёт
+# попутные не дольше WRITER_WAIT_MS, так что задержка ограничена сверху.
+# Каждая операция идёт в своей точке сохранения (SAVEPOINT): ошибка одной
+# откатывает только её. Вызывающий ждёт свой результат (номер заявки, id
+# комментария) или своё исключение; кэш и живые изменения — после коммита
+# пачки. Без GROUP_COMMIT сервисы, как и раньше, коммитят каждый вызов сами.
+GROUP_COMMIT = os.environ.get("GROUP_COMMIT", "0") == "1"
+WRITER_BATCH = int(os.environ.get("WRITER_BATCH", 64))
+WRITER_WAIT_MS = float(os.environ.get("WRITER_WAIT_MS", 2))
+
+log = logging.getLogger("writer")
+
+_STOP = object()
+
+
+class Writer:
+    """фоновый поток записи одной базы"""
+
+    def __init__(self, engine, batch=WRITER_BATCH, wait_ms=WRITER_WAIT_MS):
+        self.engine = engine
+        self.batch = batch
+        self.wait = wait_ms / 1000
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, after=None) -> Future:
+        """
+        operation(conn) -> результат выполняется в транзакции пачки;
+        after(результат) — после её коммита (кэш, живые изменения)
+        """
+        future = Future()
+        self._queue.put((operation, after, future))
+        return future
+
+    def call(self, operation, after=None):
+        """submit и ожидание: результат операции или её исключение"""
+        return self.submit(operation, after).result()
+
+    def close(self):
+        """дописать очередь и остановить поток"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # ---------- поток писателя ----------
+    def _take(self):
+        """следующая пачка: первая операция и попутные, пока не истёк срок или не набралось batch"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        pending = [first]
+        deadline = time.monotonic() + self.wait
+        while len(pending) < self.batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # сначала эта пачка, остановка — следующим кругом
+                break
+            pending.append(item)
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._take()
+            if pending is None:
+                return
+            start = time.perf_counter()
+            done = self._write(pending)
+            perf.record("writer", "batch", (time.perf_counter() - start) * 1000, rows=len(pending))
+            self.batches += 1
+            self.operations += len(pending)
+            for (operation, after, future), (result, error) in zip(pending, done):
+                if error is not None:
+                    future.set_exception(error)
+                    continue
+                try:
+                    if after is not None:
+                        after(result)
+                except Exception:  # запись уже в базе — вызывающему отдаём результат
+                    log.exception("ошибка после коммита пачки")
+                future.set_result(result)
+
+    def _write(self, pending):
+        """[(результат, исключение)] по операциям пачки; при сбое коммита — у всех исключение"""
+        done = []
+        try:
+            # AUTOCOMMIT отключает неявные транзакции pysqlite: BEGIN/SAVEPOINT/COMMIT ставим сами
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("BEGIN IMMEDIATE"))
+                try:
+                    for operation, _, _ in pending:
+                        conn.execute(text("SAVEPOINT operation"))
+                        try:
+                            result = operation(conn)
+                        except Exception as ex:
+                            conn.execute(text("ROLLBACK TO operation"))
+                            done.append((None, ex))
+                        else:
+                            done.append((result, None))
+                        conn.execute(text("RELEASE operation"))
+                    conn.execute(text("COMMIT"))
+                except BaseException:
+                    conn.execute(text("ROLLBACK"))
+                    raise
+        except Exception as ex:
+            return [(None, ex)] * len(pending)
+        return done
+
+
+_writers = {}  # engine.url -> Writer
+_writers_lock = threading.Lock()
+
+
+def writer(engine) -> Writer:
+    """писатель базы engine (один на процесс)"""
+    with _writers_lock:
+        if engine.url not in _writers:
+            _writers[engine.url] = Writer(engine)
+        return _writers[engine.url]
+
+
+def write(engine, operation, after=None):
+    """
+    operation(conn) в транзакции: пачкой через писателя при GROUP_COMMIT,
+    иначе своей транзакцией сразу; after(результат) — после коммита
+    """
+    if GROUP_COMMIT:
+        return writer(engine).call(operation, after)
+    with engine.begin() as conn:
+        result = operation(conn)
+    if after is not None:
+        after(result)
+    return result